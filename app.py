@@ -1,9 +1,8 @@
 import streamlit as st
-import base64
-import firebase_admin
 import re
-from firebase_admin import credentials
-from firebase_admin import auth
+from nutriusher import bootstrap, ui
+from nutriusher.assets import asset_url, build_assets
+from nutriusher.sessions import SessionError
 
 # Set the page config
 st.set_page_config(page_title="NutriUsher")
@@ -12,24 +11,29 @@ if 'go_to_login' in st.session_state and st.session_state.go_to_login:
     del st.session_state.go_to_login
     st.session_state.page = 'Login' 
 
-# Initialize Firebase
-if not firebase_admin._apps:
-    cred = credentials.Certificate('firebase-adminsdk.json')
-    firebase_admin.initialize_app(cred)
+# Firebase is initialized by nutriusher.bootstrap on first use (login/sign up)
 
-# Convert image to Base64 string
-def image_to_base64(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode()
+# One session manager per process, so the signing keys are fetched once
+# and refreshed in the background for every session
+@st.cache_resource
+def get_session_manager():
+    return bootstrap.session_manager(ui.firebase_api_key())
 
-# Set the background image for the entire page
-def set_background_image(image_path):
-    base64_image = image_to_base64(image_path)
-    st.markdown(
-        f"""
+# Build the downscaled WebP assets under static/ once per process
+@st.cache_resource
+def prepare_assets():
+    return build_assets(only_stale=True)
+
+prepare_assets()
+
+# Background CSS for an image, built once per image
+@st.cache_data
+def background_style(image_path):
+    image_url = asset_url(image_path)
+    return f"""
         <style>
         .stApp {{
-            background: url('data:image/jpeg;base64,{base64_image}');
+            background: url('{image_url}');
             background-size: 100% 100%;
             background-position: center; 
             height: 100vh;
@@ -90,25 +94,21 @@ def set_background_image(image_path):
             transform: scale(1);
         }}
         </style>
-        """, unsafe_allow_html=True
-    )
+        """
 
-# Sidebar function
-def sidebar():
-    # Get and encode logo
-    def get_base64_logo():
-        with open("logo.png", "rb") as f:
-            return base64.b64encode(f.read()).decode()
-
-    logo_base64 = get_base64_logo()
+# Set the background image for the entire page
+def set_background_image(image_path):
+    st.markdown(background_style(image_path), unsafe_allow_html=True)
 
-    # Apply logo and styling
-    st.sidebar.markdown(
-    f"""
+# Sidebar logo and button CSS, built once
+@st.cache_data
+def sidebar_style():
+    logo_url = asset_url("logo.png")
+    return f"""
     <style>
     [data-testid="stSidebar"]::before {{
         content: "";
-        background-image: url('data:image/png;base64,{logo_base64}');
+        background-image: url('{logo_url}');
         background-size: contain;
         background-repeat: no-repeat;
         background-position: center;
@@ -140,9 +140,12 @@ def sidebar():
         border-color: #004080 !important;
     }}
     </style>
-    """,
-    unsafe_allow_html=True
-)
+    """
+
+# Sidebar function
+def sidebar():
+    # Apply logo and styling
+    st.sidebar.markdown(sidebar_style(), unsafe_allow_html=True)
 
     # Add navigation buttons with spacing
     st.sidebar.markdown('<div style="margin-top: 40px;"></div>', unsafe_allow_html=True)
@@ -184,8 +187,8 @@ def home():
         </style>
     """, unsafe_allow_html=True)
 
-    # Convert logo to base64
-    logo_base64 = image_to_base64("logo.png")
+    # Logo served from static/ (or inlined if not built)
+    logo_url = asset_url("logo.png")
 
     # Container for content with flex layout
     st.markdown(
@@ -193,7 +196,7 @@ def home():
         <div class="main-content">
             <div class="flex-container">
                 <div class="logo-container">
-                    <img src="data:image/png;base64,{logo_base64}" class="logo-image">
+                    <img src="{logo_url}" class="logo-image">
                 </div>
                 <div class="content-container">
                     <h1>Smart Diet Planning for a Healthier Tomorrow.</h1>
@@ -297,25 +300,20 @@ def login():
 
     # Login button functionality
     if st.button('Login', key="login_button"):
-        if email and password:
-            try:
-                # Authenticate the user with Firebase
-                user = auth.get_user_by_email(email)
-                if user:
-                    # Set user session state with details
-                    st.session_state.user = {
-                        'uid': user.uid,
-                        'email': user.email,
-                        'display_name': user.display_name  # Optional if you set a display name
-                    }
-                    st.success('Logged in successfully!')
-                    st.session_state.page = 'profile'  # Redirect to DietPlan page
-                else:
-                    st.error('User not found.')
-            except auth.UserNotFoundError:
-                st.error('User not found. Please check your email or sign up.')
-        else:
+        if not (email and password):
             st.error('Please enter both email and password.')
+        elif ui.firebase_api_key() is None:
+            st.error('Login is not configured: set FIREBASE_API_KEY or firebase_api_key in secrets.toml.')
+        else:
+            try:
+                # Check the password with Firebase and verify the ID token locally
+                st.session_state.user = get_session_manager().login(email, password)
+                st.success('Logged in successfully!')
+                st.session_state.page = 'profile'  # Redirect to DietPlan page
+            except SessionError as e:
+                st.error(str(e))
+            except Exception as e:
+                st.error(f'Login failed: {e}')
     
     # Button to redirect to Sign Up page
     st.write("Don't have an account?")
@@ -453,7 +451,7 @@ def signup():
             else:
                 try:
                     # Create user in Firebase
-                    user = auth.create_user(email=email, password=password, uid=username)
+                    user = bootstrap.auth().create_user(email=email, password=password, uid=username)
                     st.success('Account created successfully!')
                     st.write('Please login using your email and password.')
                     st.balloons()
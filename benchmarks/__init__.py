@@ -0,0 +1 @@
+"""Offline benchmarks for the planning code; run from the repository root."""
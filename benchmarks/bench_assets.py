@@ -0,0 +1,81 @@
+"""
+Page payload and style build time with and without the asset pipeline.
+
+    python -m benchmarks.bench_assets
+
+"legacy" inlines every image as base64 in the page CSS/HTML on each rerun,
+as app.py did; "pipeline" builds the WebP assets once and emits static URLs.
+Payload bytes are what the browser must receive before the first paint of
+the styled page; the served image bytes are reported separately since the
+browser fetches them in parallel and caches them across reruns.
+"""
+import argparse
+import base64
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from nutriusher.assets import ASSETS, asset_url, build_assets, built_name
+
+PAGES = {
+    'home': ['mushroom-tomatoes.jpg', 'logo.png', 'logo.png'],
+    'login': ['login.jpg', 'logo.png'],
+    'signup': ['signup.jpg', 'logo.png'],
+}
+
+
+def legacy_payload(images):
+    # app.py re-read and re-encoded every image on every rerun
+    parts = []
+    for image_path in images:
+        with open(image_path, 'rb') as image_file:
+            parts.append(f"url('data:image/jpeg;base64,{base64.b64encode(image_file.read()).decode()}')")
+    return ''.join(parts)
+
+
+def pipeline_payload(images, static_dir):
+    return ''.join(f"url('{asset_url(image_path, static_dir)}')" for image_path in images)
+
+
+def timed(function, *args, runs=20):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function(*args)
+        times.append(time.perf_counter() - start)
+    return result, np.percentile(times, 50) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as static_dir:
+        start = time.perf_counter()
+        report = build_assets(static_dir=static_dir)
+        build_ms = (time.perf_counter() - start) * 1000
+        if not report:
+            raise SystemExit("Pillow is required to build the assets")
+
+        for name, (before, after) in report.items():
+            print(f"{name:<24} {before / 1024:8.0f} KiB -> {after / 1024:6.0f} KiB")
+        print(f"one-off build {build_ms:.0f} ms")
+
+        for page, images in PAGES.items():
+            legacy, legacy_ms = timed(legacy_payload, images, runs=args.runs)
+            pipeline, pipeline_ms = timed(pipeline_payload, images, static_dir, runs=args.runs)
+            served = sum(os.path.getsize(os.path.join(static_dir, built_name(name))) for name in set(images))
+            print(f"{page:<8} payload legacy {len(legacy) / 1024:8.0f} KiB {legacy_ms:7.2f} ms  "
+                  f"pipeline {len(pipeline):5d} B {pipeline_ms:6.3f} ms  "
+                  f"images served {served / 1024:5.0f} KiB (was {sum(os.path.getsize(n) for n in set(images)) / 1024:.0f} KiB)")
+
+    missing = [name for name in ASSETS if not os.path.exists(name)]
+    if missing:
+        print(f"missing sources: {', '.join(missing)}")
+
+
+if __name__ == '__main__':
+    main()
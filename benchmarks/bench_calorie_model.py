@@ -0,0 +1,50 @@
+"""
+Load time and prediction latency of an exported calorie model.
+
+    python -m benchmarks.bench_calorie_model models/calorie_model.npz --rows 100000
+
+Predicts for the rows of user_nutritional_data.csv, repeated up to
+--rows, in one batch and one user at a time, in float64 and float32.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from nutriusher.calorie_model import CalorieModel
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('model')
+    parser.add_argument('--users', default='user_nutritional_data.csv')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--single', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    for dtype in (np.float64, np.float32):
+        model = CalorieModel(args.model, dtype=dtype)
+        start = time.perf_counter()
+        model.load()
+        load_ms = (time.perf_counter() - start) * 1000
+
+        users = pd.read_csv(args.users)
+        X = users[model.features].to_numpy(dtype=float)
+        X = np.resize(X, (args.rows, X.shape[1]))
+        model.predict(X[:100])
+        start = time.perf_counter()
+        model.predict(X)
+        batch_us = (time.perf_counter() - start) / len(X) * 1e6
+
+        start = time.perf_counter()
+        for row in X[:args.single]:
+            model.predict(row)
+        single_us = (time.perf_counter() - start) / min(args.single, len(X)) * 1e6
+
+        print(f"{model.kind:<18} {np.dtype(dtype).name:<8} load {load_ms:6.2f} ms  "
+              f"batch {batch_us:7.3f} us/row  single {single_us:7.1f} us")
+
+
+if __name__ == '__main__':
+    main()
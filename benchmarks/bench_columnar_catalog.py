@@ -0,0 +1,105 @@
+"""
+Startup and per-query cost of the CSV catalog versus the columnar catalog.
+
+    python -m benchmarks.bench_columnar_catalog --sizes 10000 100000 1000000 --workers 4
+
+For each synthetic catalog size, compares reading the CSV with
+read_food_catalog and filtering with recommend_food against opening the
+ingested columnar catalog and scanning it. Memory is the tracemalloc peak
+of one open or one query mix; "scans" are the columnar filters alone,
+returning row positions. With --workers, that many processes each open
+the catalog and run the query mix, as app server workers would.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_catalog
+from nutriusher.catalog import read_food_catalog
+from nutriusher.columnar_catalog import ColumnarCatalog, ingest
+from nutriusher.planner import recommend_food
+
+QUERIES = [
+    ({'Calories': 2200, 'Diet': 'All', 'Condition': []}, 'Lunch'),
+    ({'Calories': 1800, 'Diet': 0, 'Condition': ['Diabetes']}, 'Breakfast'),
+    ({'Calories': 2500, 'Diet': 1, 'Condition': ['Hypertension', 'Heart Disease']}, 'Dinner'),
+]
+
+
+def traced(func):
+    """(result, seconds, peak KiB) of one call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024
+
+
+def query_mix(food_data):
+    for user_input, meal in QUERIES:
+        recommend_food(user_input, food_data, meal)
+
+
+def scan_mix(catalog):
+    for user_input, meal in QUERIES:
+        catalog.lookup(meal, user_input['Diet'], user_input['Condition'], user_input['Calories'] * 0.4)
+
+
+def worker(kind, path):
+    """Open the catalog and run the query mix, in a fresh process"""
+    start = time.perf_counter()
+    food_data = read_food_catalog(path) if kind == 'csv' else ColumnarCatalog(path)
+    query_mix(food_data)
+    return time.perf_counter() - start
+
+
+def run(size, workers, tmp):
+    csv_path = os.path.join(tmp, f"catalog_{size}.csv")
+    out_dir = os.path.join(tmp, f"catalog_{size}")
+    synthetic_catalog(size).to_csv(csv_path, index=False)
+    _, ingest_s, ingest_kib = traced(lambda: ingest(csv_path, out_dir))
+
+    food_data, csv_open_s, csv_open_kib = traced(lambda: read_food_catalog(csv_path))
+    catalog, col_open_s, col_open_kib = traced(lambda: ColumnarCatalog(out_dir))
+    query_mix(catalog)  # map the columns
+    _, csv_query_s, csv_query_kib = traced(lambda: query_mix(food_data))
+    _, col_query_s, col_query_kib = traced(lambda: query_mix(catalog))
+    _, scan_s, scan_kib = traced(lambda: scan_mix(catalog))
+
+    print(f"{size:>9} rows  ingest {ingest_s:7.2f} s, peak {ingest_kib / 1024:7.1f} MiB")
+    print(f"{'':>9}  csv       open {csv_open_s * 1000:9.1f} ms {csv_open_kib / 1024:8.1f} MiB   "
+          f"3 queries {csv_query_s * 1000:8.2f} ms {csv_query_kib / 1024:8.1f} MiB")
+    print(f"{'':>9}  columnar  open {col_open_s * 1000:9.1f} ms {col_open_kib / 1024:8.1f} MiB   "
+          f"3 queries {col_query_s * 1000:8.2f} ms {col_query_kib / 1024:8.1f} MiB")
+    print(f"{'':>9}  columnar  3 scans without building result frames {scan_s * 1000:8.2f} ms "
+          f"{scan_kib / 1024:8.1f} MiB")
+
+    if workers:
+        for kind, path in (('csv', csv_path), ('columnar', out_dir)):
+            start = time.perf_counter()
+            with ProcessPoolExecutor(workers) as pool:
+                per_worker = list(pool.map(worker, [kind] * workers, [path] * workers))
+            print(f"{'':>9}  {kind:<9} {workers} workers: open + queries p50 "
+                  f"{np.percentile(per_worker, 50) * 1000:8.1f} ms, wall {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[10000, 100000, 1000000])
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            run(size, args.workers, tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Plan accuracy and solve time of the macro selector as the catalog grows.
+
+    python -m benchmarks.bench_macro_selector --sizes 1000 10000 100000
+
+For each catalog, plans are generated for a few user profiles both at
+random and with optimize=True. Accuracy is the mean absolute relative
+error of each meal's calorie/protein/carb/fat totals against its targets.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_catalog
+from nutriusher.catalog import read_food_catalog
+from nutriusher.optimizer import macro_targets
+from nutriusher.sampler import MEALS, PlanSampler
+
+PROFILES = [
+    {'Calories': 1600, 'Diet': 'All', 'Condition': []},
+    {'Calories': 2200, 'Diet': 0, 'Condition': ['Diabetes']},
+    {'Calories': 2800, 'Diet': 'All', 'Condition': ['Hypertension']},
+]
+MACRO_KEYS = ['Calories', 'Proteins', 'Carbs', 'Fats']
+
+
+def plan_error(plan, user_input):
+    """Mean absolute relative error of meal totals against the targets"""
+    errors = []
+    for day_menu in plan.values():
+        for meal in MEALS:
+            items = day_menu[meal]
+            if not isinstance(items, list):
+                continue
+            totals = np.array([sum(item[key] for item in items) for key in MACRO_KEYS])
+            target = macro_targets(user_input, meal)
+            errors.append(np.abs(totals - target) / target)
+    return float(np.mean(errors)) if errors else float('nan')
+
+
+def run(food_data, label, repeats, time_budget):
+    sampler = PlanSampler(food_data)
+    for optimize in (False, True):
+        timings, errors = [], []
+        for user_input in PROFILES:
+            for seed in range(repeats):
+                start = time.perf_counter()
+                plan = sampler.generate(user_input, seed=seed, optimize=optimize,
+                                        time_budget=time_budget)
+                timings.append(time.perf_counter() - start)
+                errors.append(plan_error(plan, user_input))
+        timings = np.array(timings) * 1000
+        print(f"{label:>10} {'optimized' if optimize else 'random':>10} "
+              f"p50 {np.percentile(timings, 50):8.2f} ms  p99 {np.percentile(timings, 99):8.2f} ms  "
+              f"error {np.nanmean(errors):6.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 10000, 100000])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--time-budget', type=float, default=0.05,
+                        help="Optimizer budget per plan in seconds")
+    args = parser.parse_args()
+
+    run(read_food_catalog('food.csv'), 'food.csv', args.repeats, args.time_budget)
+    for size in args.sizes:
+        run(synthetic_catalog(size), str(size), args.repeats, args.time_budget)
+
+
+if __name__ == '__main__':
+    main()
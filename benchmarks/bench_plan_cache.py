@@ -0,0 +1,69 @@
+"""
+Hit rate and latency of the shared plan cache on real user profiles.
+
+    python -m benchmarks.bench_plan_cache --widths 0 25 50 100
+
+Replays the rows of user_nutritional_data.csv as plan requests, with diet
+and conditions drawn from a fixed popular-profile mix, through a
+PlanCache per calorie bucket width. Reports hit rate, p50 latency of hits
+and misses, entries and bytes held.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from nutriusher.batch import user_requirements_from_row
+from nutriusher.catalog import load_food_catalog
+from nutriusher.plan_cache import PlanCache
+
+# (diet, conditions, share of users)
+PROFILE_MIX = [
+    ('All', [], 0.55),
+    (0, [], 0.2),
+    (1, [], 0.1),
+    ('All', ['Diabetes'], 0.08),
+    ('All', ['Hypertension'], 0.05),
+    (0, ['Diabetes', 'Heart Disease'], 0.02),
+]
+
+
+def requests(path, limit, seed=0):
+    users = pd.read_csv(path).head(limit)
+    rng = np.random.default_rng(seed)
+    choices = rng.choice(len(PROFILE_MIX), len(users), p=[share for _, _, share in PROFILE_MIX])
+    for (_, row), choice in zip(users.iterrows(), choices):
+        diet, conditions, _ = PROFILE_MIX[choice]
+        yield user_requirements_from_row(row, diet, conditions)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', default='user_nutritional_data.csv')
+    parser.add_argument('--limit', type=int, default=2000)
+    parser.add_argument('--widths', type=int, nargs='*', default=[0, 25, 50, 100])
+    parser.add_argument('--max-mb', type=float, default=64)
+    args = parser.parse_args(argv)
+
+    food_data = load_food_catalog('food.csv')
+    workload = list(requests(args.users, args.limit))
+    for width in args.widths:
+        cache = PlanCache(bucket_width=width, max_bytes=int(args.max_mb * 2 ** 20))
+        hits, misses = [], []
+        for user_input in workload:
+            before = cache.stats()['hits']
+            start = time.perf_counter()
+            cache.generate(user_input, food_data)
+            elapsed = (time.perf_counter() - start) * 1000
+            (hits if cache.stats()['hits'] > before else misses).append(elapsed)
+
+        stats = cache.stats()
+        print(f"width {width:>4}  hit rate {stats['hit_rate']:6.1%}  "
+              f"hit p50 {np.percentile(hits, 50) if hits else float('nan'):6.3f} ms  "
+              f"miss p50 {np.percentile(misses, 50) if misses else float('nan'):6.2f} ms  "
+              f"entries {stats['entries']:5d}  {stats['size'] / 2 ** 20:6.1f} MiB  evictions {stats['evictions']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Cost of editing part of a plan versus generating a new one.
+
+    python -m benchmarks.bench_plan_edit
+
+"full" is what pressing Generate again costs: generate_four_week_plan
+plus plan_summary. The edits use one PlanEditor on a shared sampler and
+refresh_summary for the changed days. Each edit is checked to keep the
+variety window against its neighbouring days.
+"""
+import argparse
+import copy
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_catalog
+from nutriusher.catalog import read_food_catalog
+from nutriusher.plan_edit import PlanEditor
+from nutriusher.planner import generate_four_week_plan
+from nutriusher.sampler import MEALS, PlanSampler
+from nutriusher.tables import plan_summary, refresh_summary
+
+USER_INPUT = {
+    'Calories': 2200,
+    'Proteins': 82,
+    'Carbs': 302,
+    'Fats': 73,
+    'Diet': 'All',
+    'Condition': []
+}
+
+
+def window_repeats(plan, day_ids, window):
+    """Foods an edited day shares with the same meal within the window"""
+    all_days = list(plan)
+    repeats = 0
+    for day_id in day_ids:
+        slot = all_days.index(day_id)
+        neighbours = all_days[max(slot - window, 0):slot] + all_days[slot + 1:slot + window + 1]
+        for meal in MEALS:
+            if not isinstance(plan[day_id][meal], list):
+                continue
+            foods = {item['Food'] for item in plan[day_id][meal]}
+            for neighbour in neighbours:
+                if isinstance(plan[neighbour][meal], list):
+                    repeats += len(foods & {item['Food'] for item in plan[neighbour][meal]})
+    return repeats
+
+
+def p50_ms(func, repeats):
+    timings = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        func(i)
+        timings.append(time.perf_counter() - start)
+    return np.percentile(timings, 50) * 1000
+
+
+def run(name, food_data, repeats, optimize):
+    sampler = PlanSampler(food_data)
+    plan = sampler.generate(USER_INPUT, seed=1, optimize=optimize)
+    summary = plan_summary(plan)
+    editor = PlanEditor(sampler, USER_INPUT, optimize=optimize)
+    day_ids = list(plan)
+
+    def full(i):
+        plan_summary(generate_four_week_plan(USER_INPUT, food_data, seed=i, optimize=optimize))
+
+    edits = {
+        'item': lambda edited, i: editor.swap_item(edited, day_ids[i % len(day_ids)], 'Lunch', i % 3, seed=i),
+        'meal': lambda edited, i: editor.regenerate_slot(edited, day_ids[i % len(day_ids)], 'Lunch', seed=i),
+        'day': lambda edited, i: editor.regenerate_day(edited, day_ids[i % len(day_ids)], seed=i),
+        'week': lambda edited, i: editor.regenerate_week(edited, i % 4 + 1, seed=i),
+    }
+
+    full_ms = p50_ms(full, repeats)
+    print(f"{name:<12} full regeneration {full_ms:8.2f} ms")
+    for edit_name, edit in edits.items():
+        copies = [copy.deepcopy(plan) for _ in range(repeats)]
+        changed = {}
+
+        def timed_edit(i):
+            changed[i] = edit(copies[i], i)
+            refresh_summary(summary, copies[i], changed[i])
+
+        edit_ms = p50_ms(timed_edit, repeats)
+        repeats_found = sum(window_repeats(copies[i], changed[i], editor.window) for i in changed)
+        print(f"{'':<12} {edit_name:<6} {edit_ms:8.2f} ms  {edit_ms / full_ms:6.1%} of full  "
+              f"window repeats {repeats_found}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[100000])
+    parser.add_argument('--repeats', type=int, default=30)
+    parser.add_argument('--optimize', action='store_true')
+    args = parser.parse_args(argv)
+
+    run('food.csv', read_food_catalog('food.csv'), args.repeats, args.optimize)
+    for size in args.sizes:
+        run(str(size), synthetic_catalog(size), max(args.repeats // 3, 5), args.optimize)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Stored size and encode/decode time of the compact plan format.
+
+    python -m benchmarks.bench_plan_encoding
+
+Sizes use Firestore's documented storage size rules (strings and field
+names count their UTF-8 length + 1, numbers 8 bytes, blobs their length,
+plus the document name and 32 bytes of overhead) and, for reference, the
+JSON length of the same plan_data.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from nutriusher.catalog import read_food_catalog
+from nutriusher.plan_codec import decode_plan, encode_plan
+from nutriusher.sampler import PlanSampler
+
+PROFILES = [
+    {'Calories': 1600, 'Diet': 'All', 'Condition': []},
+    {'Calories': 2200, 'Diet': 0, 'Condition': ['Diabetes']},
+    {'Calories': 2800, 'Diet': 'All', 'Condition': ['Hypertension']},
+]
+
+
+def firestore_size(value):
+    """Storage size of a Firestore field value in bytes"""
+    if isinstance(value, dict):
+        return sum(len(key.encode()) + 1 + firestore_size(v) for key, v in value.items())
+    if isinstance(value, list):
+        return sum(firestore_size(v) for v in value)
+    if isinstance(value, str):
+        return len(value.encode()) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, bool) or value is None:
+        return 1
+    return 8
+
+
+def document_size(plan_data):
+    # meal_plans/<20 char id> + overhead, as Firestore counts it
+    name = len('meal_plans'.encode()) + 1 + 20 + 1 + 16
+    return name + 32 + firestore_size({'plan_data': plan_data})
+
+
+def json_size(plan_data):
+    return len(json.dumps(plan_data, default=lambda b: b.hex()).encode())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seeds', type=int, default=10, help="Plans per profile")
+    args = parser.parse_args(argv)
+
+    food_data = read_food_catalog('food.csv')
+    food_data.attrs['catalog_version'] = 'benchmark'
+    sampler = PlanSampler(food_data)
+
+    legacy_sizes, compact_sizes, legacy_json, compact_json = [], [], [], []
+    encode_times, decode_times = [], []
+    for user_input in PROFILES:
+        for seed in range(args.seeds):
+            plan = sampler.generate(user_input, seed=seed)
+
+            start = time.perf_counter()
+            encoded = encode_plan(plan, food_data)
+            encode_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            decoded = decode_plan(encoded, food_data)
+            decode_times.append(time.perf_counter() - start)
+            assert decoded == plan
+
+            legacy_sizes.append(document_size(plan))
+            compact_sizes.append(document_size(encoded))
+            legacy_json.append(json_size(plan))
+            compact_json.append(json_size(encoded))
+
+    print(f"Firestore size  legacy {np.mean(legacy_sizes):8.0f} B  compact {np.mean(compact_sizes):7.0f} B  "
+          f"reduction {np.mean(legacy_sizes) / np.mean(compact_sizes):5.1f}x")
+    print(f"JSON size       legacy {np.mean(legacy_json):8.0f} B  compact {np.mean(compact_json):7.0f} B  "
+          f"reduction {np.mean(legacy_json) / np.mean(compact_json):5.1f}x")
+    print(f"encode p50 {np.percentile(encode_times, 50) * 1000:.3f} ms  "
+          f"decode p50 {np.percentile(decode_times, 50) * 1000:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Per-login latency of the local ID token verification.
+
+    python -m benchmarks.bench_sessions
+
+Uses nutriusher.local_auth.LocalKeyPair in place of Firebase Auth and
+Google's key endpoint; ``--fetch-ms`` simulates the key endpoint's round
+trip, which is paid on the first login only. The Admin SDK lookup this
+replaces made one such round trip on every login.
+"""
+import argparse
+import time
+
+from nutriusher.local_auth import LocalKeyPair
+from nutriusher.sessions import SessionManager, SigningKeyCache, TokenVerifier, session_active
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--logins', type=int, default=500)
+    parser.add_argument('--fetch-ms', type=float, default=80.0, help="Simulated key endpoint latency")
+    args = parser.parse_args(argv)
+
+    provider = LocalKeyPair(fetch_delay=args.fetch_ms / 1000)
+    for i in range(20):
+        provider.add_user(f'user{i}@example.com', f'password-{i}')
+    keys = SigningKeyCache(provider.fetch_keys)
+    manager = SessionManager(TokenVerifier(provider.project_id, keys), provider.sign_in)
+
+    start = time.perf_counter()
+    session = manager.login('user0@example.com', 'password-0')
+    first_ms = (time.perf_counter() - start) * 1000
+    assert session_active(session)
+
+    for i in range(args.logins):
+        manager.login(f'user{i % 20}@example.com', f'password-{i % 20}')
+    keys.close()
+
+    stats = manager.latency_stats()
+    print(f"first login (cold keys) {first_ms:7.2f} ms")
+    print(f"logins {stats['logins']}  p50 {stats['p50_ms']:.2f} ms  p95 {stats['p95_ms']:.2f} ms  "
+          f"max {stats['max_ms']:.2f} ms")
+    print(f"token verification p50 {stats['verify_p50_ms']:.3f} ms  p95 {stats['verify_p95_ms']:.3f} ms")
+    print(f"key fetches {keys.fetches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Cold start and first render time of each page, with an import time report.
+
+    python -m benchmarks.bench_startup [-o startup.json]
+
+Every page runs in a fresh interpreter under ``-X importtime`` through
+Streamlit's AppTest, logged out and with no input. Reported per page:
+process wall time, first render time, the imports the page itself
+triggered (everything after Streamlit and the test harness are loaded)
+and the slowest of them. Save the JSON with each release to track cold
+start over time.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from nutriusher.assets import build_assets
+
+PAGES = ['app.py', 'pages/1_Generate_plan.py', 'pages/2_My_plans.py']
+
+# Modules whose import the bootstrap module defers
+HEAVY_MODULES = ['pandas', 'numpy', 'firebase_admin', 'google.cloud.firestore', 'jwt']
+
+MARKER = 'import time: -- page run --'
+
+RUNNER = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+sys.stderr.write({MARKER!r} + '\\n')
+sys.stderr.flush()
+start = time.perf_counter()
+app_test = AppTest.from_file(sys.argv[1], default_timeout=300)
+app_test.run()
+end = time.perf_counter()
+print(json.dumps({{
+    'first_render_s': end - start,
+    'exceptions': [str(e.value) for e in app_test.exception],
+    'loaded': sorted(name for name in {HEAVY_MODULES!r} if name in sys.modules)
+}}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Imports logged after the marker line
+
+    Returns:
+        list: (module, self µs, cumulative µs, depth) in import order
+    """
+    imports = []
+    lines = stderr.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+    for line in lines:
+        if not line.startswith('import time:') or line.endswith('imported package'):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), self_us, cumulative_us, depth))
+    return imports
+
+
+def measure_page(page, top=5):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', RUNNER, page],
+        capture_output=True, text=True, env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{page} failed:\n{result.stderr[-2000:]}")
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(result.stderr)
+    top_level = [item for item in imports if item[3] == 0]
+    report.update({
+        'page': page,
+        'process_s': wall,
+        'page_import_s': sum(item[2] for item in top_level) / 1e6,
+        'modules_imported': len(imports),
+        'slowest_imports': [
+            {'module': name, 'cumulative_ms': cumulative / 1000}
+            for name, _, cumulative, _ in sorted(top_level, key=lambda item: -item[2])[:top]
+        ]
+    })
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('pages', nargs='*', default=PAGES)
+    parser.add_argument('-o', '--output', help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    # Page images are built once per deployment, not per cold start
+    build_assets(only_stale=True)
+
+    reports = []
+    for page in args.pages:
+        report = measure_page(page)
+        reports.append(report)
+        print(f"{page:<28} process {report['process_s']:6.2f} s  first render {report['first_render_s']:6.2f} s  "
+              f"page imports {report['page_import_s']:5.2f} s ({report['modules_imported']} modules)")
+        for item in report['slowest_imports']:
+            print(f"    {item['module']:<40} {item['cumulative_ms']:8.1f} ms")
+        print(f"    loaded: {', '.join(report['loaded']) or '-'}")
+        for exception in report['exceptions']:
+            print(f"    exception: {exception}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'pages': reports}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Latency of nearest-neighbour substitutions versus a filtered linear scan.
+
+    python -m benchmarks.bench_substitutes --sizes 10000 100000
+
+For each synthetic catalog, times building the SubstitutionIndex and the
+trees for the query mix, then answers k-nearest queries for random foods
+through the index and through a brute-force scan of the same filtered
+rows, checking both return the same foods.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_catalog
+from nutriusher.catalog import read_food_catalog
+from nutriusher.substitutes import SubstitutionIndex
+
+# (meal, diet, conditions, calorie ceiling)
+QUERIES = [
+    ('Lunch', 'All', (), 880),
+    ('Breakfast', 0, ('Diabetes',), 540),
+    ('Dinner', 1, ('Hypertension', 'Heart Disease'), 750),
+]
+
+
+def brute_force(index, position, meal, diet, conditions, k, max_calories):
+    positions, _ = index.tree(meal, diet, conditions)
+    rows = positions[(positions != position) & (index.calories[positions] <= max_calories)]
+    distances = np.linalg.norm(index.features[rows] - index.features[position], axis=1)
+    order = np.argsort(distances, kind='stable')[:k]
+    return rows[order], distances[order]
+
+
+def run(label, food_data, queries, k):
+    start = time.perf_counter()
+    index = SubstitutionIndex(food_data)
+    features_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for meal, diet, conditions, _ in QUERIES:
+        index.tree(meal, diet, conditions)
+    trees_ms = (time.perf_counter() - start) * 1000
+    print(f"{label:<10} features {features_ms:8.1f} ms  {len(QUERIES)} trees {trees_ms:8.1f} ms")
+
+    rng = np.random.default_rng(0)
+    for meal, diet, conditions, max_calories in QUERIES:
+        positions, _ = index.tree(meal, diet, conditions)
+        if len(positions) < 2:
+            continue
+        sources = rng.choice(positions, queries)
+        # Tree queries first, then scans, so neither warms the other's caches
+        tree_times, answers = [], []
+        for position in sources:
+            start = time.perf_counter()
+            answers.append(index.query(position, meal, diet, conditions, k=k, max_calories=max_calories))
+            tree_times.append(time.perf_counter() - start)
+        scan_times, mismatches = [], 0
+        for position, (_, distances) in zip(sources, answers):
+            start = time.perf_counter()
+            _, expected = brute_force(index, position, meal, diet, conditions, k, max_calories)
+            scan_times.append(time.perf_counter() - start)
+            mismatches += not np.allclose(distances, expected)
+        print(f"{'':<10} {meal:<9} {len(positions):>7} foods  tree p50 {np.percentile(tree_times, 50) * 1e6:7.1f} us "
+              f"p99 {np.percentile(tree_times, 99) * 1e6:7.1f} us  scan p50 {np.percentile(scan_times, 50) * 1e6:8.1f} us  "
+              f"mismatches {mismatches}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[10000, 100000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('-k', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    run('food.csv', read_food_catalog('food.csv'), args.queries, args.k)
+    for size in args.sizes:
+        run(str(size), synthetic_catalog(size), args.queries, args.k)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Overhead of the timing hooks, off and on.
+
+    python -m benchmarks.bench_timing
+
+Times a trivial function bare and wrapped with timing.timed, outside a
+traced request (hooks off) and inside one (hooks on), then a full
+recommend_food call both ways, and prints the p50/p95/p99 the histograms
+report for it.
+"""
+import argparse
+import time
+
+from nutriusher import timing
+from nutriusher.catalog import read_food_catalog
+from nutriusher.planner import recommend_food
+
+USER_INPUT = {'Calories': 2200, 'Diet': 'All', 'Condition': ['Hypertension']}
+
+
+def noop():
+    return None
+
+
+timed_noop = timing.timed('bench.noop')(noop)
+
+
+def per_call(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    bare = per_call(noop, args.calls)
+    off = per_call(timed_noop, args.calls)
+    with timing.request('bench', force=True):
+        on = per_call(timed_noop, args.calls // 10)
+    print(f"bare call {bare * 1e9:7.0f} ns   timed, off {off * 1e9:7.0f} ns   timed, on {on * 1e9:7.0f} ns")
+
+    food_data = read_food_catalog('food.csv')
+    call = lambda: recommend_food(USER_INPUT, food_data, 'Lunch')
+    per_call(call, 50)
+    # Alternate rounds and keep the best of each, so drift does not read as overhead
+    offs, ons = [], []
+    for _ in range(5):
+        offs.append(per_call(call, 200))
+        with timing.request('bench', force=True):
+            ons.append(per_call(call, 200))
+    off, on = min(offs), min(ons)
+    print(f"recommend_food  off {off * 1e6:8.1f} us   on {on * 1e6:8.1f} us   "
+          f"overhead {(on - off) / off * 100:5.2f} %")
+    for row in timing.histogram_rows():
+        if row['stage'] == 'planner.recommend_food':
+            print(f"histogram  p50 {row['p50_ms']:.3f} ms  p95 {row['p95_ms']:.3f} ms  p99 {row['p99_ms']:.3f} ms"
+                  f"  ({row['count']} calls)")
+
+
+if __name__ == '__main__':
+    main()
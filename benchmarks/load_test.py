@@ -0,0 +1,301 @@
+"""
+Concurrent multi-session load test of one Streamlit server process.
+
+    python -m benchmarks.load_test --sessions 1 2 4 8 16 32 --iterations 3
+
+Starts the app through ``python -m nutriusher.offline`` (in-memory
+Firestore, local token signing) and drives it the
+way browsers do: every session is a websocket to /_stcore/stream speaking
+Streamlit's protobuf protocol. A session opens the home page, goes to the
+login page and logs in, then ``--iterations`` times opens the generate
+page, fills in the form, generates a plan, saves it and lists its saved
+plans. Each script run is one request, timed from sending the rerun to
+the server's script_finished message.
+
+For each session count the sessions run concurrently; reported are
+requests per second, latency percentiles over all requests, the slowest
+step, errors, and the server's resident memory per connected session.
+Requests per second that stop growing while latency climbs is where the
+single-process model saturates. Needs the ``websockets`` package.
+
+With ``--url`` an already running server (started with nutriusher.offline
+and enough ``--users``) is used; pass ``--pid`` for memory.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+
+from nutriusher.offline import offline_user
+
+# Widget value field of the WidgetState proto, per element type
+VALUE_FIELDS = {'text_input': 'string_value', 'checkbox': 'bool_value', 'toggle': 'bool_value'}
+
+
+class StreamlitSession:
+    """One browser tab: a websocket to the server and the widgets it last drew"""
+
+    def __init__(self, url):
+        self.url = url
+        self.websocket = None
+        self.pages = {}
+        self.page_hash = None
+        self.widgets = []
+        self.values = {}
+        self.errors = []
+
+    async def connect(self):
+        import websockets
+
+        stream_url = self.url.replace('http', 'ws', 1).rstrip('/') + '/_stcore/stream'
+        self.websocket = await websockets.connect(stream_url, subprotocols=['streamlit'], max_size=None)
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+
+    def find(self, kind, label=None, key=None):
+        """Proto of a widget drawn by the last run, by type and label or user key"""
+        for widget_kind, proto in self.widgets:
+            if widget_kind == kind and (label is None or proto.label == label) \
+                    and (key is None or proto.id.endswith(f"-{key}")):
+                return proto
+        raise LookupError(f"No {kind} {label or key!r} on the page")
+
+    def set(self, kind, label, value, key=None):
+        """Give a widget a value for the next rerun"""
+        from streamlit.proto.NumberInput_pb2 import NumberInput
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        proto = self.find(kind, label, key)
+        state = WidgetState(id=proto.id)
+        if kind == 'number_input':
+            if proto.data_type == NumberInput.INT:
+                state.int_value = int(value)
+            else:
+                state.double_value = float(value)
+        else:
+            setattr(state, VALUE_FIELDS[kind], value)
+        self.values[proto.id] = state
+
+    async def rerun(self, click=None, page=None):
+        """
+        Run the script once and wait for it to finish
+
+        Args:
+            click (tuple, optional): (label, key) of a button to press
+            page (str, optional): Page name to switch to, e.g. "Generate plan"
+
+        Returns:
+            float: Seconds until the server reported the run finished
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        if page is not None:
+            self.page_hash = self.pages[page]
+            self.values = {}
+        states = list(self.values.values())
+        if click is not None:
+            states.append(WidgetState(id=self.find('button', *click).id, trigger_value=True))
+        message = BackMsg()
+        message.rerun_script.widget_states.widgets.extend(states)
+        if self.page_hash is not None:
+            message.rerun_script.page_script_hash = self.page_hash
+
+        start = time.perf_counter()
+        await self.websocket.send(message.SerializeToString())
+        await self._receive_run()
+        return time.perf_counter() - start
+
+    async def _receive_run(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        widgets = []
+        while True:
+            message = ForwardMsg()
+            message.ParseFromString(await self.websocket.recv())
+            kind = message.WhichOneof('type')
+            if kind == 'new_session':
+                self.pages = {page.page_name: page.page_script_hash for page in message.new_session.app_pages}
+                self.page_hash = message.new_session.page_script_hash
+                widgets = []
+            elif kind == 'delta' and message.delta.WhichOneof('type') == 'new_element':
+                element = message.delta.new_element
+                element_kind = element.WhichOneof('type')
+                proto = getattr(element, element_kind)
+                if element_kind == 'exception':
+                    self.errors.append(proto.message)
+                elif hasattr(proto, 'id') and hasattr(proto, 'label'):
+                    widgets.append((element_kind, proto))
+            elif kind == 'script_finished':
+                status = message.script_finished
+                if status == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    self.errors.append("compile error")
+                if status in (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_WITH_COMPILE_ERROR):
+                    self.widgets = widgets
+                    return
+
+
+async def user_flow(url, user, iterations, results):
+    """Log in, then generate, save and list plans; appends (step, seconds, ok)"""
+    session = StreamlitSession(url)
+    await session.connect()
+
+    async def step(name, **kwargs):
+        errors = len(session.errors)
+        try:
+            seconds = await session.rerun(**kwargs)
+        except LookupError as e:
+            session.errors.append(str(e))
+            seconds = 0.0
+        results.append((name, seconds, len(session.errors) == errors))
+
+    email, password = offline_user(user)
+    await step('home')
+    # The sidebar's Login button draws first; the form's has key login_button
+    await step('open_login', click=('Login',))
+    try:
+        session.set('text_input', 'Email Address', email)
+        session.set('text_input', 'Password', password)
+    except LookupError as e:
+        session.errors.append(str(e))
+    await step('login', click=(None, 'login_button'))
+
+    for _ in range(iterations):
+        await step('generate_page', page='Generate plan')
+        try:
+            session.set('text_input', 'Name', f"User {user}")
+            session.set('number_input', 'Age', 30 + user % 40)
+            session.set('number_input', 'Weight (kg)', 60 + user % 30)
+            session.set('number_input', 'Height (cm)', 160 + user % 30)
+        except LookupError as e:
+            session.errors.append(str(e))
+        await step('generate', click=('Generate 4-Week Plan',))
+        await step('save', click=('💾 Save Plan',))
+        await step('list_plans', page='My plans')
+    return session
+
+
+def resident_mib(pid):
+    """Resident set size of a process, from /proc"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float('nan')
+
+
+async def run_level(url, sessions, iterations, pid):
+    results = []
+    before = resident_mib(pid) if pid else float('nan')
+    start = time.perf_counter()
+    connected = await asyncio.gather(*[user_flow(url, user, iterations, results) for user in range(sessions)])
+    wall = time.perf_counter() - start
+    # Measured while every session is still connected
+    after = resident_mib(pid) if pid else float('nan')
+    errors = [error for session in connected for error in session.errors]
+    await asyncio.gather(*[session.close() for session in connected])
+
+    latencies = np.array([seconds for _, seconds, ok in results if ok]) * 1000
+    steps = {}
+    for name, seconds, ok in results:
+        if ok:
+            steps.setdefault(name, []).append(seconds * 1000)
+    slowest = max(steps, key=lambda name: np.percentile(steps[name], 95)) if steps else None
+    return {
+        'sessions': sessions,
+        'requests': len(results),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'wall_s': wall,
+        'rps': len(results) / wall,
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+        'p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else None,
+        'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+        'steps_p50_ms': {name: float(np.percentile(values, 50)) for name, values in steps.items()},
+        'slowest_step': slowest,
+        'rss_mib': after,
+        'mib_per_session': (after - before) / sessions
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(users, port):
+    """The app with in-memory Firebase; returns the process once it is healthy"""
+    env = dict(os.environ, NUTRIUSHER_SAVE_SPOOL=tempfile.mkdtemp(prefix='nutriusher-spool-'))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'nutriusher.offline', f'--users={users}', '--server.headless=true',
+         f'--server.port={port}', '--server.address=127.0.0.1', '--browser.gatherUsageStats=false',
+         '--server.fileWatcherType=none', '--server.runOnSave=false'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.read() == b'ok':
+                    return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Streamlit server did not become healthy within 60 s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sessions', type=int, nargs='*', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--iterations', type=int, default=3, help="Generate/save/list rounds per session")
+    parser.add_argument('--url', help="Use a running server instead of starting one")
+    parser.add_argument('--pid', type=int, help="Server process for memory, with --url")
+    parser.add_argument('-o', '--output', help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        url, pid = args.url, args.pid
+    else:
+        port = free_port()
+        server = start_server(max(args.sessions), port)
+        url, pid = f"http://127.0.0.1:{port}", server.pid
+    try:
+        # Warm up: import the pages, load the catalog and fill the caches
+        asyncio.run(run_level(url, 1, 1, pid))
+        levels = []
+        print(f"{'sessions':>8} {'requests':>8} {'errors':>6} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'slowest step':>14} {'RSS MiB':>8} {'MiB/session':>11}")
+        for sessions in args.sessions:
+            level = asyncio.run(run_level(url, sessions, args.iterations, pid))
+            levels.append(level)
+            print(f"{sessions:>8} {level['requests']:>8} {level['errors']:>6} {level['rps']:>7.1f} "
+                  f"{level['p50_ms'] or 0:>8.1f} {level['p95_ms'] or 0:>8.1f} {level['p99_ms'] or 0:>8.1f} "
+                  f"{level['slowest_step'] or '-':>14} {level['rss_mib']:>8.1f} {level['mib_per_session']:>11.2f}")
+            if level['first_error']:
+                print(f"{'':>8} first error: {level['first_error'][:200]}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'url': url, 'iterations': args.iterations, 'levels': levels}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Latency and memory benchmarks for the planning and table-building paths.
+
+    python -m benchmarks.run --sizes 1000 100000 1000000 -o baseline.json
+    python -m benchmarks.run --compare baseline.json
+
+Every case runs against food.csv and against synthetic catalogs of the
+given sizes, without Streamlit or Firebase. Latency percentiles come from
+repeated timed runs; peak memory from one extra run under tracemalloc.
+With --compare, cases whose p50 latency or peak memory grew by more than
+--tolerance against the stored results are reported and the exit status
+is 1.
+"""
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_catalog
+from nutriusher.candidates import CandidateIndex
+from nutriusher.export import export_plan
+from nutriusher.catalog import read_food_catalog
+from nutriusher.plan_table import PlanTable
+from nutriusher.planner import generate_four_week_plan, generate_meal_plan, recommend_food
+from nutriusher.sampler import PlanSampler
+from nutriusher.tables import calculate_nutrition, create_meal_plan_table, create_plan_dataframe, plan_hash, plan_summary
+
+USER_INPUT = {
+    'Calories': 2200,
+    'Proteins': 82,
+    'Carbs': 302,
+    'Fats': 73,
+    'Diet': 'All',
+    'Condition': ['Hypertension']
+}
+
+
+def build_cases(food_data):
+    """Name -> zero-argument callable for one catalog"""
+    index = CandidateIndex(food_data)
+    index.recommend(USER_INPUT, 'Lunch')
+    plan = generate_four_week_plan(USER_INPUT, food_data, seed=1)
+    table = PlanSampler(food_data).generate_table(USER_INPUT, seed=1)
+    daily_plan = generate_meal_plan(USER_INPUT, food_data)
+    return {
+        'recommend_food': lambda: recommend_food(USER_INPUT, food_data, 'Lunch'),
+        'recommend_food_indexed': lambda: recommend_food(USER_INPUT, food_data, 'Lunch', index),
+        'generate_four_week_plan': lambda: generate_four_week_plan(USER_INPUT, food_data, seed=1),
+        'create_plan_dataframe': lambda: create_plan_dataframe(plan),
+        'create_meal_plan_table': lambda: create_meal_plan_table(plan),
+        'calculate_nutrition': lambda: calculate_nutrition(daily_plan),
+        'plan_summary': lambda: plan_summary(plan),
+        'plan_hash': lambda: plan_hash(plan),
+        'plan_table_from_plan': lambda: PlanTable.from_plan(plan),
+        'plan_table_rollups': lambda: [table.rollup(level) for level in ('meal', 'day', 'week', 'plan')],
+        'plan_table_summary': lambda: plan_summary(table),
+        'plan_table_to_plan': lambda: table.to_plan(),
+        'export_plan_csv': lambda: export_plan(plan, io.BytesIO(), 'csv'),
+        'export_plan_jsonl': lambda: export_plan(plan, io.BytesIO(), 'jsonl'),
+        'export_plan_xlsx': lambda: export_plan(plan, io.BytesIO(), 'xlsx'),
+    }
+
+
+def measure(func, repeats, max_seconds):
+    """Latency percentiles in milliseconds and peak traced memory in KiB"""
+    func()  # warm up
+    timings = []
+    deadline = time.perf_counter() + max_seconds
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+        if time.perf_counter() > deadline:
+            break
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = np.array(timings)
+    return {
+        'runs': len(timings),
+        'mean_ms': float(timings.mean()),
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'peak_kib': peak / 1024
+    }
+
+
+def run(sizes, repeats, max_seconds, only=None):
+    catalogs = [('food.csv', lambda: read_food_catalog('food.csv'))]
+    catalogs += [(str(size), lambda size=size: synthetic_catalog(size)) for size in sizes]
+
+    results = {}
+    for label, load in catalogs:
+        food_data = load()
+        for name, func in build_cases(food_data).items():
+            if only and name not in only:
+                continue
+            key = f"{name}@{label}"
+            results[key] = measure(func, repeats, max_seconds)
+            r = results[key]
+            print(f"{key:<40} p50 {r['p50_ms']:9.3f} ms  p95 {r['p95_ms']:9.3f} ms  "
+                  f"p99 {r['p99_ms']:9.3f} ms  peak {r['peak_kib']:10.0f} KiB")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Cases that got slower or larger than the baseline allows"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in ('p50_ms', 'peak_kib'):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{key} {metric}: {previous[metric]:.3f} -> {current[metric]:.3f} "
+                    f"(+{current[metric] / previous[metric] - 1:.0%})"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 100000, 1000000],
+                        help="Synthetic catalog sizes")
+    parser.add_argument('--repeats', type=int, default=30)
+    parser.add_argument('--max-seconds', type=float, default=10.0,
+                        help="Stop repeating a case after this long")
+    parser.add_argument('--only', nargs='*', help="Run only these cases")
+    parser.add_argument('-o', '--output', help="Write results to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeats, args.max_seconds, args.only)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'machine': platform.machine(),
+                'results': results
+            }, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
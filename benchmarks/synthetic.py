@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from nutriusher.catalog import FLAG_COLUMNS, NUTRIENT_COLUMNS, read_food_catalog
+
+
+def synthetic_catalog(n, seed=0, base_path='food.csv'):
+    """
+    Catalog of n foods shaped like food.csv
+
+    Rows are resampled from the real catalog with +/-30% noise on every
+    nutrient and freshly drawn meal and diet flags, keeping the real
+    column distributions and dtypes.
+    """
+    rng = np.random.default_rng(seed)
+    base = read_food_catalog(base_path)
+    rows = rng.integers(0, len(base), n)
+
+    food_data = pd.DataFrame({'Food_items': [f"Food {i}" for i in range(n)]})
+    for column in FLAG_COLUMNS:
+        share = base[column].astype(int).mean()
+        food_data[column] = pd.Categorical((rng.random(n) < share).astype('int8'), categories=[0, 1])
+    noise = rng.uniform(0.7, 1.3, (n, len(NUTRIENT_COLUMNS))).astype('float32')
+    nutrients = base[NUTRIENT_COLUMNS].to_numpy()[rows] * noise
+    for k, column in enumerate(NUTRIENT_COLUMNS):
+        food_data[column] = np.round(nutrients[:, k], 1)
+    food_data.attrs['catalog_version'] = f"synthetic-{n}-{seed}"
+    return food_data[base.columns]
@@ -0,0 +1 @@
+"""Shared planning, catalog and storage helpers for the NutriUsher pages."""
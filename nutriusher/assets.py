@@ -0,0 +1,108 @@
+"""
+Static image pipeline for the page backgrounds and logo.
+
+build_assets() downscales each source image to the width it is displayed
+at and re-encodes it as WebP under static/, which Streamlit serves at
+app/static/<name> when server.enableStaticServing is on. asset_url()
+returns that URL, or a base64 data URI of the original file when the
+built asset is missing or older than its source (e.g. Pillow is not
+installed). Both results are memoized per file version.
+"""
+import argparse
+import base64
+import importlib.util
+import mimetypes
+import os
+from functools import lru_cache
+
+STATIC_DIR = 'static'
+STATIC_URL = 'app/static'
+
+# Source image -> widest size it is displayed at (2x for the logo)
+ASSETS = {
+    'mushroom-tomatoes.jpg': 1920,
+    'login.jpg': 1920,
+    'signup.jpg': 1920,
+    'logo.png': 400
+}
+
+
+def built_name(image_path):
+    return os.path.splitext(os.path.basename(image_path))[0] + '.webp'
+
+
+def build_asset(image_path, max_width, static_dir=STATIC_DIR, quality=80):
+    """
+    Downscale and re-encode one image as WebP
+
+    Returns:
+        tuple: (source bytes, built bytes)
+    """
+    from PIL import Image
+
+    os.makedirs(static_dir, exist_ok=True)
+    target = os.path.join(static_dir, built_name(image_path))
+    with Image.open(image_path) as image:
+        if image.width > max_width:
+            height = round(image.height * max_width / image.width)
+            image = image.resize((max_width, height), Image.LANCZOS)
+        image.save(target, 'WEBP', quality=quality, method=6)
+    return os.path.getsize(image_path), os.path.getsize(target)
+
+
+def build_assets(source_dir='.', static_dir=STATIC_DIR, assets=None, quality=80, only_stale=False):
+    """
+    Build every asset; returns {source name: (source bytes, built bytes)}
+
+    With only_stale, assets that are already newer than their source are
+    skipped. Without Pillow nothing is built and pages fall back to data URIs.
+    """
+    if importlib.util.find_spec('PIL') is None:
+        return {}
+
+    report = {}
+    for name, max_width in (assets or ASSETS).items():
+        source = os.path.join(source_dir, name)
+        if not os.path.exists(source):
+            continue
+        if only_stale and _is_built(source, static_dir):
+            continue
+        report[name] = build_asset(source, max_width, static_dir, quality)
+    return report
+
+
+def _is_built(image_path, static_dir=STATIC_DIR):
+    target = os.path.join(static_dir, built_name(image_path))
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(image_path)
+
+
+@lru_cache(maxsize=32)
+def _data_uri(image_path, mtime):
+    mime = mimetypes.guess_type(image_path)[0] or 'application/octet-stream'
+    with open(image_path, 'rb') as image_file:
+        return f"data:{mime};base64,{base64.b64encode(image_file.read()).decode()}"
+
+
+def asset_url(image_path, static_dir=STATIC_DIR):
+    """URL to use for an image in page CSS/HTML"""
+    if _is_built(image_path, static_dir):
+        return f"{STATIC_URL}/{built_name(image_path)}"
+    return _data_uri(image_path, os.path.getmtime(image_path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the downscaled WebP page assets")
+    parser.add_argument('--source-dir', default='.')
+    parser.add_argument('--static-dir', default=STATIC_DIR)
+    parser.add_argument('--quality', type=int, default=80)
+    args = parser.parse_args(argv)
+
+    report = build_assets(args.source_dir, args.static_dir, quality=args.quality)
+    if not report:
+        raise SystemExit("Nothing built; install Pillow to build assets")
+    for name, (before, after) in report.items():
+        print(f"{name:<24} {before / 1024:8.0f} KiB -> {after / 1024:6.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+Generate four-week plans offline for every user in a CSV file.
+
+    python -m nutriusher.batch user_nutritional_data.csv -o plans.jsonl --workers 8
+
+Each row's requirements come from its Gender, Age, Height, Weight and
+Physical exercise columns through build_user_requirements. The input is
+read in chunks, plans are generated in a process pool and results are
+streamed to JSON Lines or, for a ``.parquet`` output, to Parquet (needs
+pyarrow). Only a bounded number of chunks is in flight at any time, so
+memory stays flat on large inputs.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from nutriusher.catalog import load_food_catalog, plan_sampler
+from nutriusher.planner import build_user_requirements
+
+# Encodings used in user_nutritional_data.csv
+GENDERS = {0: 'Male', 1: 'Female'}
+ACTIVITY_LEVELS = {
+    0: 'Sedentary',
+    1: 'Light Exercise',
+    2: 'Moderate Exercise',
+    3: 'Heavy Exercise',
+    4: 'Very Heavy Exercise'
+}
+
+INPUT_COLUMNS = ['Gender', 'Age', 'Height', 'Weight', 'Physical exercise']
+
+# Per-process state set up by _init_worker
+_sampler = None
+_options = None
+
+
+def user_requirements_from_row(row, diet='All', conditions=()):
+    """Requirements for one row of user_nutritional_data.csv"""
+    gender = row['Gender']
+    activity = row['Physical exercise']
+    # Optional per-row columns; conditions are separated by ';'
+    if isinstance(row.get('Diet'), str):
+        diet = row['Diet']
+    if isinstance(row.get('Condition'), str):
+        conditions = [c.strip() for c in row['Condition'].split(';') if c.strip()]
+    return build_user_requirements(
+        float(row['Weight']), float(row['Height']), int(row['Age']),
+        GENDERS.get(gender, gender),
+        ACTIVITY_LEVELS.get(activity, activity),
+        diet=diet,
+        conditions=conditions
+    )
+
+
+def _init_worker(catalog_path, options):
+    global _sampler, _options
+    _sampler = plan_sampler(load_food_catalog(catalog_path))
+    _options = options
+
+
+def _plan_chunk(first_row, records):
+    """Generate plans for one chunk, returned as JSON lines"""
+    lines = []
+    for offset, row in enumerate(records):
+        user_input = user_requirements_from_row(row, _options['diet'], _options['conditions'])
+        seed = _options['seed']
+        plan = _sampler.generate(
+            user_input,
+            seed=None if seed is None else seed + first_row + offset,
+            optimize=_options['optimize']
+        )
+        lines.append(json.dumps({
+            'row': first_row + offset,
+            'user_requirements': user_input,
+            'plan': plan
+        }))
+    return lines
+
+
+class JsonLinesWriter:
+    def __init__(self, path):
+        self._file = open(path, 'w') if path != '-' else sys.stdout
+
+    def write(self, first_row, lines):
+        self._file.write('\n'.join(lines) + '\n')
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class ParquetWriter:
+    """Writes one row group per chunk with the record stored as JSON"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output requires pyarrow: pip install pyarrow")
+        self._pa = pa
+        self._schema = pa.schema([('row', pa.int64()), ('record', pa.string())])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, first_row, lines):
+        rows = list(range(first_row, first_row + len(lines)))
+        table = self._pa.table({'row': rows, 'record': lines}, schema=self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        self._writer.close()
+
+
+def read_chunks(path, chunk_size):
+    """Yield (first row number, list of row dicts) from the input CSV"""
+    first_row = 0
+    for frame in pd.read_csv(path, chunksize=chunk_size):
+        missing = [column for column in INPUT_COLUMNS if column not in frame.columns]
+        if missing:
+            raise SystemExit(f"Input is missing columns: {', '.join(missing)}")
+        records = frame.to_dict('records')
+        yield first_row, records
+        first_row += len(records)
+
+
+def run_batch(input_path, output_path, catalog_path='food.csv', workers=None, chunk_size=500,
+              diet='All', conditions=(), seed=None, optimize=False, report=sys.stderr):
+    """
+    Generate plans for every row of input_path
+
+    Returns:
+        dict: Row count, elapsed seconds and rows per second
+    """
+    workers = workers or os.cpu_count() or 1
+    options = {'diet': diet, 'conditions': list(conditions), 'seed': seed, 'optimize': optimize}
+    writer = ParquetWriter(output_path) if output_path.endswith('.parquet') else JsonLinesWriter(output_path)
+    start = time.perf_counter()
+    rows = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(catalog_path, options)) as executor:
+        max_in_flight = 2 * workers
+        pending = deque()
+        try:
+            for first_row, records in read_chunks(input_path, chunk_size):
+                pending.append((first_row, executor.submit(_plan_chunk, first_row, records)))
+                # Write finished chunks in input order
+                while len(pending) >= max_in_flight or (pending and pending[0][1].done()):
+                    chunk_start, future = pending.popleft()
+                    lines = future.result()
+                    writer.write(chunk_start, lines)
+                    rows += len(lines)
+            while pending:
+                chunk_start, future = pending.popleft()
+                lines = future.result()
+                writer.write(chunk_start, lines)
+                rows += len(lines)
+        finally:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    stats = {'rows': rows, 'seconds': elapsed, 'rows_per_second': rows / elapsed if elapsed else 0.0}
+    if report is not None:
+        print(f"{rows} plans in {elapsed:.1f}s ({stats['rows_per_second']:.0f} rows/s)", file=report)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('input', help="CSV with Gender, Age, Height, Weight and Physical exercise")
+    parser.add_argument('-o', '--output', default='-', help="JSONL path, .parquet path or - for stdout")
+    parser.add_argument('--catalog', default='food.csv')
+    parser.add_argument('--workers', type=int, default=None, help="Default: one per CPU")
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--diet', default='All', help="Used when the input has no Diet column")
+    parser.add_argument('--condition', action='append', default=[],
+                        help="Health condition; repeat for several")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Base seed; row N uses seed + N. Default reproduces the app's plans")
+    parser.add_argument('--optimize', action='store_true', help="Match meals to macro targets")
+    args = parser.parse_args(argv)
+
+    run_batch(args.input, args.output, args.catalog, args.workers, args.chunk_size,
+              args.diet, args.condition, args.seed, args.optimize)
+
+
+if __name__ == '__main__':
+    main()
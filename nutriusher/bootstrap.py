@@ -0,0 +1,165 @@
+"""
+Shared, lazy initialization of Firebase and Firestore.
+
+Importing firebase_admin.firestore takes about half a second, so the
+pages no longer import it at module level. Each accessor here imports
+and initializes on first call, once per process, and records how long
+that took in ``timings``:
+
+    from nutriusher import bootstrap
+    db = bootstrap.firestore_client()
+
+pandas is kept off the My Plans import path the same way, by importing
+the catalog modules inside the functions that need them.
+``python -m benchmarks.bench_startup`` reports import time and first
+render time per page. ``install`` swaps in fakes (MemoryFirestore,
+local_auth) for offline runs.
+"""
+import atexit
+import importlib
+import os
+import threading
+import time
+
+# Service account key; FIREBASE_CREDENTIALS overrides the path
+CREDENTIALS_PATH = 'firebase-adminsdk.json'
+
+_lock = threading.RLock()
+_resources = {}
+
+# API key the session_manager() in _resources was built with; None when
+# none was built here or an installed one replaced it
+_session_api_key = None
+
+# Resource name -> seconds spent importing/initializing it
+timings = {}
+
+
+def _once(name, factory):
+    resource = _resources.get(name)
+    if resource is not None:
+        return resource
+    with _lock:
+        if name not in _resources:
+            start = time.perf_counter()
+            _resources[name] = factory()
+            timings[name] = time.perf_counter() - start
+        return _resources[name]
+
+
+def _initialize_firebase():
+    import firebase_admin
+    from firebase_admin import credentials
+
+    if firebase_admin._apps:
+        return firebase_admin.get_app()
+    cred = credentials.Certificate(os.environ.get('FIREBASE_CREDENTIALS', CREDENTIALS_PATH))
+    return firebase_admin.initialize_app(cred)
+
+
+def firebase_app():
+    """The default Firebase app, initialized on first use"""
+    return _once('firebase_app', _initialize_firebase)
+
+
+def firestore_client():
+    """Firestore client shared by every page and session"""
+    def create():
+        from firebase_admin import firestore
+        return firestore.client(firebase_app())
+    return _once('firestore', create)
+
+
+def auth():
+    """firebase_admin.auth, with the app initialized"""
+    def load():
+        firebase_app()
+        return importlib.import_module('firebase_admin.auth')
+    return _once('auth', load)
+
+
+def plan_repository():
+    """CachedPlanRepository over Firestore, shared by every page and session"""
+    def create():
+        from nutriusher.plan_store import CachedPlanRepository, PlanRepository
+        return CachedPlanRepository(PlanRepository(firestore_client()))
+    return _once('plan_repository', create)
+
+
+def _flush_plan_repository():
+    # Commit the writes the shared repository still has queued at exit
+    repository = _resources.get('plan_repository')
+    if repository is not None:
+        repository.flush()
+
+
+atexit.register(_flush_plan_repository)
+
+
+def plan_saver():
+    """Background SaveWorker writing plans through plan_repository()"""
+    def create():
+        from nutriusher.save_worker import PlanWriter, SaveWorker, spool_dir
+        return SaveWorker(PlanWriter(plan_repository(), firestore_client()), spool_dir())
+    return _once('plan_saver', create)
+
+
+def firebase_api_key():
+    """
+    Web API key used for password sign-in (Project settings > General)
+
+    From FIREBASE_API_KEY, or None; the pages also look in secrets.toml
+    (ui.firebase_api_key).
+    """
+    return os.environ.get('FIREBASE_API_KEY') or None
+
+
+def session_manager(api_key):
+    """
+    SessionManager verifying ID tokens for the Firebase project
+
+    Signs in with sessions.sign_in_with_password and ``api_key``; offline
+    runs and load tests ``install`` their own instead.
+
+    Raises:
+        ValueError: If the manager was already built with another key
+    """
+    def create():
+        from functools import partial
+
+        from nutriusher.sessions import SessionManager, SigningKeyCache, TokenVerifier, sign_in_with_password
+        global _session_api_key
+        _session_api_key = api_key
+        return SessionManager(TokenVerifier(firebase_app().project_id, SigningKeyCache()),
+                              partial(sign_in_with_password, api_key))
+    manager = _once('session_manager', create)
+    if _session_api_key is not None and _session_api_key != api_key:
+        raise ValueError("The session manager already signs in with another API key")
+    return manager
+
+
+def install(name, resource):
+    """
+    Use ``resource`` instead of initializing ``name``
+
+    For offline runs and load tests, e.g. ``install('firestore',
+    MemoryFirestore())``; resources already built from the replaced one
+    are dropped.
+    """
+    global _session_api_key
+    with _lock:
+        _resources[name] = resource
+        timings[name] = 0.0
+        if name == 'firestore':
+            _resources.pop('plan_repository', None)
+        if name == 'session_manager':
+            _session_api_key = None
+        if name in ('firestore', 'plan_repository'):
+            saver = _resources.pop('plan_saver', None)
+            if saver is not None:
+                saver.stop()
+
+
+def loaded():
+    """Names of the resources initialized so far"""
+    return sorted(_resources)
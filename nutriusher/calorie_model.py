@@ -0,0 +1,207 @@
+"""
+NumPy-only serving of the calorie models trained in Shiva_raj.ipynb.
+
+A model is exported once, where scikit-learn or TensorFlow is installed,
+to a single ``.npz`` file: the feature names, the StandardScaler mean and
+scale, and the weights and biases of each dense layer. LinearRegression
+is one layer; MLPRegressor and the Keras Sequential model are hidden
+layers with one activation (ReLU in the notebook) and a linear output
+layer:
+
+    from nutriusher.calorie_model import export_sklearn, export_keras
+    export_sklearn(model, scaler, list(X.columns), 'models/calorie_mlp.npz')
+    export_keras(model, scaler, list(X.columns), 'models/calorie_keras.npz')
+
+Serving needs only numpy. The file is read on the first prediction, not
+on import, and ``predict`` takes a whole (rows x features) batch:
+
+    model = CalorieModel('models/calorie_mlp.npz')
+    calories = model.predict(features)
+"""
+import os
+import threading
+
+import numpy as np
+
+# App inputs -> the codes used in user_nutritional_data.csv
+# (the inverse of batch.GENDERS and batch.ACTIVITY_LEVELS)
+GENDER_CODES = {'Male': 0, 'Female': 1}
+ACTIVITY_CODES = {
+    'Sedentary': 0,
+    'Light Exercise': 1,
+    'Moderate Exercise': 2,
+    'Heavy Exercise': 3,
+    'Very Heavy Exercise': 4
+}
+
+# Where the app looks for an exported model; NUTRIUSHER_CALORIE_MODEL overrides it
+DEFAULT_MODEL_PATH = 'models/calorie_model.npz'
+
+ACTIVATIONS = {
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'tanh': lambda x: np.tanh(x, out=x),
+    'logistic': lambda x: np.divide(1, 1 + np.exp(-x)),
+    'identity': lambda x: x
+}
+
+# Keras activation name -> ACTIVATIONS name
+KERAS_ACTIVATIONS = {'relu': 'relu', 'tanh': 'tanh', 'sigmoid': 'logistic', 'linear': 'identity'}
+
+
+def model_path():
+    return os.environ.get('NUTRIUSHER_CALORIE_MODEL', DEFAULT_MODEL_PATH)
+
+
+def save_model(path, features, mean, scale, layers, activation='relu', kind=''):
+    """
+    Write an exported model
+
+    Args:
+        features (list): Feature names, in column order
+        mean, scale: StandardScaler mean_ and scale_ (None for no scaling)
+        layers (list): (weights (in x out), bias (out,)) per dense layer
+        activation (str): Activation of the hidden layers
+        kind (str): Model type, for information only
+    """
+    if activation not in ACTIVATIONS:
+        raise ValueError(f"Unsupported activation {activation!r}")
+    n = len(features)
+    arrays = {
+        'features': np.asarray(features, dtype=str),
+        'mean': np.zeros(n) if mean is None else np.asarray(mean, dtype=float),
+        'scale': np.ones(n) if scale is None else np.asarray(scale, dtype=float),
+        'activation': np.asarray(activation),
+        'kind': np.asarray(kind)
+    }
+    for i, (weights, bias) in enumerate(layers):
+        weights = np.asarray(weights, dtype=float)
+        arrays[f'W{i}'] = weights.reshape(len(weights), -1)
+        arrays[f'b{i}'] = np.asarray(bias, dtype=float).reshape(-1)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    np.savez(path, **arrays)
+
+
+def export_sklearn(model, scaler, features, path):
+    """Export a fitted LinearRegression or MLPRegressor and its StandardScaler"""
+    if hasattr(model, 'coefs_'):
+        if getattr(model, 'activation', 'relu') not in ACTIVATIONS:
+            raise ValueError(f"Unsupported activation {model.activation!r}")
+        layers = list(zip(model.coefs_, model.intercepts_))
+        activation = model.activation
+    elif hasattr(model, 'coef_'):
+        layers = [(np.reshape(model.coef_, (-1, 1)), np.reshape(model.intercept_, -1))]
+        activation = 'identity'
+    else:
+        raise ValueError(f"Cannot export {type(model).__name__}")
+    save_model(path, features, getattr(scaler, 'mean_', None), getattr(scaler, 'scale_', None),
+               layers, activation, kind=type(model).__name__)
+
+
+def export_keras(model, scaler, features, path):
+    """Export a fitted Keras Sequential model of Dense layers and its StandardScaler"""
+    layers, activations = [], []
+    for layer in model.layers:
+        weights = layer.get_weights()
+        if len(weights) != 2:
+            raise ValueError(f"Cannot export layer {layer.name!r}")
+        layers.append(weights)
+        activations.append(KERAS_ACTIVATIONS.get(layer.get_config().get('activation', 'linear')))
+    hidden = set(activations[:-1]) or {'identity'}
+    if activations[-1] != 'identity' or len(hidden) > 1 or None in hidden:
+        raise ValueError("Only Dense layers with one hidden activation and a linear output are supported")
+    save_model(path, features, getattr(scaler, 'mean_', None), getattr(scaler, 'scale_', None),
+               layers, hidden.pop(), kind='Sequential')
+
+
+class CalorieModel:
+    def __init__(self, path, dtype=np.float64):
+        """
+        Args:
+            path (str): Exported ``.npz`` file, read on first use
+            dtype: Float type to compute in; float32 runs the hidden
+                layers over twice as fast
+        """
+        self.path = path
+        self.dtype = dtype
+        self._lock = threading.Lock()
+        self._params = None
+
+    def load(self):
+        """Read the exported arrays, once"""
+        if self._params is None:
+            with self._lock:
+                if self._params is None:
+                    with np.load(self.path) as data:
+                        n_layers = sum(1 for name in data.files if name.startswith('W'))
+                        self._params = {
+                            'features': data['features'].tolist(),
+                            'mean': data['mean'].astype(self.dtype),
+                            'scale': data['scale'].astype(self.dtype),
+                            'activation': str(data['activation']),
+                            'kind': str(data['kind']),
+                            'layers': [(data[f'W{i}'].astype(self.dtype), data[f'b{i}'].astype(self.dtype))
+                                       for i in range(n_layers)]
+                        }
+        return self._params
+
+    @property
+    def features(self):
+        return self.load()['features']
+
+    @property
+    def kind(self):
+        return self.load()['kind']
+
+    def predict(self, X):
+        """
+        Predicted daily calories
+
+        Args:
+            X (array-like): (rows x features) in ``features`` order, or a
+                DataFrame with those columns
+
+        Returns:
+            numpy.ndarray: One prediction per row
+        """
+        params = self.load()
+        if hasattr(X, 'columns'):
+            X = X[params['features']].to_numpy(dtype=self.dtype)
+        X = np.atleast_2d(np.asarray(X, dtype=self.dtype))
+        if X.shape[1] != len(params['features']):
+            raise ValueError(f"Expected {len(params['features'])} features, got {X.shape[1]}")
+
+        hidden = ACTIVATIONS[params['activation']]
+        out = (X - params['mean']) / params['scale']
+        for i, (weights, bias) in enumerate(params['layers']):
+            out = out @ weights
+            out += bias
+            if i < len(params['layers']) - 1:
+                out = hidden(out)
+        return out[:, 0].astype(float)
+
+    def user_features(self, weight, height, age, gender, activity_level, bmr):
+        """
+        Feature row for one user of the plan generator
+
+        Raises:
+            ValueError: If the model needs a feature the app does not ask
+                for (the notebook's Carbs/Proteins/Fats are derived from
+                the calorie target itself)
+        """
+        known = {
+            'Gender': GENDER_CODES.get(gender, gender),
+            'Age': age,
+            'Height': height,
+            'Weight': weight,
+            'BMR': bmr,
+            'BMI': weight / (height / 100) ** 2,
+            'Physical exercise': ACTIVITY_CODES.get(activity_level, activity_level)
+        }
+        missing = [name for name in self.features if name not in known]
+        if missing:
+            raise ValueError(f"Calorie model needs inputs the app does not collect: {', '.join(missing)}")
+        return np.array([[known[name] for name in self.features]], dtype=float)
+
+    def predict_user(self, weight, height, age, gender, activity_level, bmr):
+        """Predicted daily calories for one user"""
+        return float(self.predict(self.user_features(weight, height, age, gender, activity_level, bmr))[0])
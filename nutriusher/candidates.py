@@ -0,0 +1,77 @@
+import numpy as np
+
+# Share of the daily calories allowed for each meal
+MEAL_CALORIE_SHARES = {
+    'Breakfast': 0.3,
+    'Lunch': 0.4,
+    'Dinner': 0.3
+}
+
+# Health condition -> (nutrient column, exclusive upper limit)
+CONDITION_LIMITS = {
+    'Diabetes': ('Sugars', 5),
+    'Heart Disease': ('Fats', 10),
+    'Hypertension': ('Sodium', 500)
+}
+
+
+def condition_key(conditions):
+    """Normalize a list of health conditions to a hashable key"""
+    return frozenset(c for c in (conditions or []) if c in CONDITION_LIMITS)
+
+
+def diet_flag(diet):
+    """Map the dietary preference to the value expected in the 'Diet' column"""
+    if diet == 'All':
+        return None
+    return 1 if diet == 'Non-Veg' else 0
+
+
+class CandidateIndex:
+    """
+    Pre-filtered candidate lists for one loaded food catalog.
+
+    Each (meal, diet, conditions) bucket is filtered once and stored as row
+    positions sorted by calories, so a calorie ceiling is a binary search
+    instead of another pass over the DataFrame.
+    """
+
+    def __init__(self, food_data):
+        self.food_data = food_data
+        self._calories = food_data['Calories'].to_numpy(dtype=float)
+        self._buckets = {}
+
+    def _bucket(self, meal, diet, conditions):
+        key = (meal, diet_flag(diet), condition_key(conditions))
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            meal_name, flag, condition_set = key
+            mask = self.food_data[meal_name].to_numpy() == 1
+            if flag is not None:
+                mask &= self.food_data['Diet'].to_numpy() == flag
+            for condition in condition_set:
+                column, limit = CONDITION_LIMITS[condition]
+                mask &= self.food_data[column].to_numpy() < limit
+
+            positions = np.flatnonzero(mask)
+            order = np.argsort(self._calories[positions], kind='stable')
+            bucket = (positions[order], self._calories[positions][order])
+            self._buckets[key] = bucket
+        return bucket
+
+    def lookup(self, meal, diet, conditions, max_calories):
+        """
+        Row positions matching the filters with calories <= max_calories
+
+        Returns:
+            numpy.ndarray: Positions in catalog order
+        """
+        positions, calories = self._bucket(meal, diet, conditions)
+        end = np.searchsorted(calories, max_calories, side='right')
+        return np.sort(positions[:end])
+
+    def recommend(self, user_input, meal):
+        """Same result as recommend_food, served from the index"""
+        max_calories = user_input['Calories'] * MEAL_CALORIE_SHARES[meal]
+        positions = self.lookup(meal, user_input['Diet'], user_input['Condition'], max_calories)
+        return self.food_data.iloc[positions]
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+from nutriusher.lru import LRUCache
+
+FLAG_COLUMNS = ['Breakfast', 'Lunch', 'Dinner', 'Diet']
+NUTRIENT_COLUMNS = [
+    'Calories', 'Fats', 'Proteins', 'Iron', 'Calcium', 'Sodium', 'Potassium',
+    'Carbohydrates', 'Fibre', 'VitaminD', 'Sugars'
+]
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_food_catalog(path):
+    """Read the food catalog CSV into compact dtypes"""
+    dtypes = {column: 'float32' for column in NUTRIENT_COLUMNS}
+    dtypes.update({column: 'int8' for column in FLAG_COLUMNS})
+    food_data = pd.read_csv(path, dtype=dtypes)
+    for column in FLAG_COLUMNS:
+        food_data[column] = food_data[column].astype('category')
+    # Some names carry trailing spaces, e.g. "Aloo Matar "
+    food_data['Food_items'] = food_data['Food_items'].str.strip()
+    return food_data
+
+
+class CatalogCache:
+    """
+    Process-wide cache of parsed catalog files.
+
+    A file is parsed on first use and served from memory afterwards. Each
+    lookup only stats the file; if the mtime or size changed the contents
+    are hashed, and the file is re-parsed only when the hash differs too.
+    The cached DataFrames are shared between sessions and must not be
+    modified by callers.
+    """
+
+    def __init__(self, reader=read_food_catalog):
+        self._reader = reader
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry['signature'] == signature:
+                self.hits += 1
+                return entry['data']
+
+            digest = file_digest(path)
+            if entry is not None and entry['digest'] == digest:
+                # Touched but unchanged
+                entry['signature'] = signature
+                self.hits += 1
+                return entry['data']
+
+            data = self._reader(path)
+            data.attrs['catalog_version'] = digest[:12]
+            self._entries[path] = {'signature': signature, 'digest': digest, 'data': data}
+            self.misses += 1
+            return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit and miss counters for the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'files': len(self._entries)
+            }
+
+
+catalog_cache = CatalogCache()
+
+
+def load_food_catalog(path='food.csv'):
+    """Food catalog from the shared cache"""
+    return catalog_cache.get(path)
+
+
+def catalog_version(food_data):
+    """Content version of a catalog loaded through the cache"""
+    return food_data.attrs.get('catalog_version')
+
+
+# PlanSampler per catalog version, shared by every plan generated from it
+_samplers = LRUCache(max_entries=4)
+_samplers_lock = threading.Lock()
+
+
+def plan_sampler(food_data):
+    """
+    PlanSampler (nutrient matrix and candidate index) for a loaded catalog
+
+    Built once per catalog version and shared by every caller and session,
+    like the parsed catalog itself. Catalogs without a version (not loaded
+    through load_food_catalog) get a new sampler on every call; callers
+    that only filter should use candidate_index instead.
+    """
+    from nutriusher.sampler import PlanSampler
+
+    version = catalog_version(food_data)
+    if version is None:
+        return PlanSampler(food_data)
+    # A ColumnarCatalog of the same file filters by scanning its own columns
+    key = (version, hasattr(food_data, 'item_matrix'))
+    sampler = _samplers.get(key)
+    if sampler is None:
+        with _samplers_lock:
+            sampler = _samplers.get(key)
+            if sampler is None:
+                sampler = PlanSampler(food_data)
+                _samplers.put(key, sampler)
+    return sampler
+
+
+def candidate_index(food_data):
+    """
+    Candidate filter for a loaded catalog, as used by recommend_food
+
+    The shared sampler's index for a versioned catalog. An unversioned
+    DataFrame gets a new CandidateIndex, which filters only the buckets it
+    is asked for, rather than a whole PlanSampler with its item matrix.
+    """
+    if catalog_version(food_data) is None:
+        from nutriusher.candidates import CandidateIndex
+        return CandidateIndex(food_data)
+    return plan_sampler(food_data).index
@@ -0,0 +1,272 @@
+"""
+Columnar, memory-mapped food catalog for catalogs too large for read_csv.
+
+    python -m nutriusher.columnar_catalog food.csv catalog/
+
+Ingestion converts the catalog CSV, read in chunks, into a directory with
+one ``.npy`` file per column (int8 flags, float32 nutrients), the food
+names as one newline-terminated UTF-8 blob plus an offsets array, and ``meta.json`` with the
+row count and the source file's digest. Opening a catalog reads only
+``meta.json``; columns are memory mapped on first use, so the operating
+system pages in just the parts a query touches and worker processes
+opening the same directory share those pages.
+
+Meal, diet, condition and calorie filters run as chunked scans over only
+the columns they need, so the memory a query takes is bounded by the
+chunk size and its result, not by the catalog:
+
+    catalog = open_catalog('catalog/')
+    positions = catalog.lookup('Lunch', 'Veg', ['Diabetes'], 700)
+    foods = catalog.frame(positions)
+
+A ColumnarCatalog can stand in for the food DataFrame and the
+CandidateIndex of a PlanSampler, and for the food data of recommend_food.
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from nutriusher.candidates import CONDITION_LIMITS, MEAL_CALORIE_SHARES, condition_key, diet_flag
+from nutriusher.catalog import FLAG_COLUMNS, NUTRIENT_COLUMNS, file_digest
+from nutriusher.sampler import ITEM_COLUMNS
+
+FORMAT_VERSION = 1
+COLUMN_DTYPES = {**{column: 'int8' for column in FLAG_COLUMNS},
+                 **{column: 'float32' for column in NUTRIENT_COLUMNS}}
+
+# Rows per scan chunk: 64K rows of one float32 column is 256 KiB
+CHUNK_ROWS = 1 << 16
+
+
+def ingest(csv_path, out_dir, chunk_rows=CHUNK_ROWS):
+    """
+    Convert a catalog CSV into a columnar catalog directory
+
+    The CSV is read twice in chunks, once to count the rows and once to
+    fill the column files, so memory stays flat on large inputs. The
+    directory is written next to ``out_dir`` and renamed into place.
+
+    Returns:
+        dict: The catalog's meta.json
+    """
+    start = time.perf_counter()
+    n_rows = sum(len(chunk) for chunk in pd.read_csv(csv_path, usecols=['Calories'], chunksize=chunk_rows))
+
+    tmp_dir = f"{out_dir.rstrip(os.sep)}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    columns = {
+        column: np.lib.format.open_memmap(os.path.join(tmp_dir, f"{column}.npy"), mode='w+',
+                                          dtype=dtype, shape=(n_rows,))
+        for column, dtype in COLUMN_DTYPES.items()
+    }
+    offsets = np.lib.format.open_memmap(os.path.join(tmp_dir, 'names_offsets.npy'), mode='w+',
+                                        dtype='int64', shape=(n_rows + 1,))
+    offsets[0] = 0
+
+    row = 0
+    with open(os.path.join(tmp_dir, 'names.bin'), 'wb') as names:
+        for chunk in pd.read_csv(csv_path, dtype=COLUMN_DTYPES, chunksize=chunk_rows):
+            end = row + len(chunk)
+            for column in COLUMN_DTYPES:
+                columns[column][row:end] = chunk[column].to_numpy()
+            # Some names carry trailing spaces, e.g. "Aloo Matar "; each
+            # name ends in a newline so a batch decodes with one split
+            encoded = [(name.strip().replace('\n', ' ') + '\n').encode()
+                       for name in chunk['Food_items'].astype(str).tolist()]
+            names.write(b''.join(encoded))
+            offsets[row + 1:end + 1] = offsets[row] + np.cumsum([len(name) for name in encoded])
+            row = end
+    for array in (*columns.values(), offsets):
+        array.flush()
+    del columns, offsets
+
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'rows': n_rows,
+        'columns': COLUMN_DTYPES,
+        'source': os.path.basename(csv_path),
+        'catalog_version': file_digest(csv_path)[:12],
+        'ingest_seconds': time.perf_counter() - start
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    # Swap the new directory in; readers that already opened the old one
+    # keep their mappings
+    old_dir = f"{out_dir.rstrip(os.sep)}.old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+
+class NameColumn:
+    """Food names decoded from the UTF-8 blob only for the positions asked for"""
+
+    def __init__(self, data, offsets):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, positions):
+        if np.ndim(positions) == 0:
+            start, end = self._offsets[positions], self._offsets[positions + 1]
+            return bytes(self._data[start:end - 1]).decode()
+        positions = np.asarray(positions, dtype=np.intp)
+        names = np.empty(len(positions), dtype=object)
+        if len(positions):
+            # Gather every requested name (with its newline) in one take,
+            # then decode and split once
+            starts = self._offsets[positions]
+            lengths = self._offsets[positions + 1] - starts
+            shifts = np.repeat(starts - np.r_[0, np.cumsum(lengths)[:-1]], lengths)
+            gathered = self._data[np.arange(len(shifts)) + shifts]
+            names[:] = gathered.tobytes().decode().split('\n')[:-1]
+        return names
+
+    def tolist(self):
+        return self[np.arange(len(self))].tolist()
+
+
+class ColumnarCatalog:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported catalog format {self.meta.get('format_version')} in {path}")
+        self.attrs = {'catalog_version': self.meta['catalog_version']}
+        self._columns = {}
+        self._names = None
+        self._item_matrix = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.meta['rows']
+
+    # Only the path crosses process boundaries; workers map the files themselves
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def column(self, name):
+        """Memory-mapped column, mapped on first use"""
+        array = self._columns.get(name)
+        if array is None:
+            if name not in self.meta['columns']:
+                raise KeyError(name)
+            array = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode='r')
+            self._columns[name] = array
+        return array
+
+    @property
+    def names(self):
+        if self._names is None:
+            self._names = NameColumn(
+                np.memmap(os.path.join(self.path, 'names.bin'), dtype=np.uint8, mode='r')
+                if os.path.getsize(os.path.join(self.path, 'names.bin')) else np.zeros(0, dtype=np.uint8),
+                np.load(os.path.join(self.path, 'names_offsets.npy'), mmap_mode='r'))
+        return self._names
+
+    def scan(self, meal, diet='All', conditions=(), max_calories=None, chunk_rows=CHUNK_ROWS):
+        """
+        Row positions passing the filters, in catalog order
+
+        Each chunk is tested on the meal flag first, then diet, condition
+        limits and calories, touching only those columns.
+        """
+        flag = diet_flag(diet)
+        limits = [CONDITION_LIMITS[condition] for condition in sorted(condition_key(conditions))]
+        matches = []
+        for start in range(0, len(self), chunk_rows):
+            end = min(start + chunk_rows, len(self))
+            mask = self.column(meal)[start:end] == 1
+            if flag is not None:
+                mask &= self.column('Diet')[start:end] == flag
+            for column, limit in limits:
+                mask &= self.column(column)[start:end] < limit
+            if max_calories is not None:
+                # Compare in float64, as CandidateIndex does
+                mask &= self.column('Calories')[start:end].astype(np.float64) <= max_calories
+            matches.append(np.flatnonzero(mask) + start)
+        return np.concatenate(matches) if matches else np.zeros(0, dtype=np.intp)
+
+    def lookup(self, meal, diet, conditions, max_calories):
+        """CandidateIndex.lookup, as a column scan"""
+        return self.scan(meal, diet, conditions, max_calories)
+
+    def frame(self, positions, columns=None):
+        """DataFrame of the given rows, shaped like read_food_catalog's, indexed by position"""
+        positions = np.asarray(positions, dtype=np.intp)
+        data = {'Food_items': self.names[positions]}
+        for column in columns or self.meta['columns']:
+            values = self.column(column)[positions]
+            data[column] = pd.Categorical(values, categories=[0, 1]) if column in FLAG_COLUMNS else values
+        return pd.DataFrame(data, index=pd.Index(positions))
+
+    def recommend(self, user_input, meal):
+        """Same rows as recommend_food on the CSV catalog"""
+        max_calories = user_input['Calories'] * MEAL_CALORIE_SHARES[meal]
+        return self.frame(self.lookup(meal, user_input['Diet'], user_input['Condition'], max_calories))
+
+    def item_matrix(self):
+        """
+        Names and nutrient matrix for PlanSampler, like sampler.item_matrix
+
+        The nutrient matrix (six float64 columns) is materialized once per
+        catalog; names stay memory mapped.
+        """
+        with self._lock:
+            if self._item_matrix is None:
+                nutrients = np.column_stack([
+                    self.column(column).astype(np.float64) for column in ITEM_COLUMNS.values()
+                ])
+                self._item_matrix = (self.names, np.round(nutrients, 4))
+        return self._item_matrix
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def open_catalog(path):
+    """
+    Process-wide ColumnarCatalog for a directory
+
+    Re-ingesting replaces meta.json, so a changed modification time opens
+    the new catalog.
+    """
+    path = os.path.abspath(path)
+    signature = os.stat(os.path.join(path, 'meta.json')).st_mtime_ns
+    with _catalogs_lock:
+        entry = _catalogs.get(path)
+        if entry is None or entry[0] != signature:
+            entry = _catalogs[path] = (signature, ColumnarCatalog(path))
+        return entry[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('csv')
+    parser.add_argument('out_dir')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+    meta = ingest(args.csv, args.out_dir, args.chunk_rows)
+    print(f"{meta['rows']} rows, version {meta['catalog_version']}, {meta['ingest_seconds']:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
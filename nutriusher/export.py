@@ -0,0 +1,380 @@
+"""
+Streaming export of meal plans to CSV, JSON Lines and XLSX.
+
+    python -m nutriusher.export --credentials firebase-adminsdk.json plans.zip --format csv
+
+A plan is exported in the create_meal_plan_table layout, one row per
+meal (Week, Day, Meal, Foods and the meal's totals). Rows are generated
+one at a time and written straight to the output, so an export never
+holds more than the plan being written:
+
+    with open('plan.xlsx', 'wb') as f:
+        export_plan(plan, f, 'xlsx')
+
+export_all pages through the whole meal_plans collection and writes one
+zip archive, each row prefixed with the plan's ID, owner and creation
+time; XLSX exports are split into several workbooks of at most one full
+sheet each. Each page of documents is the only chunk in
+memory, so memory stays flat however many plans there are. Compact plans
+are read from their catalog ids and never rebuilt into item dicts.
+"""
+import argparse
+import csv
+import io
+import json
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from nutriusher.lru import LRUCache
+from nutriusher.plan_codec import day_ids, is_compact
+from nutriusher.plan_table import parse_day_id
+from nutriusher.sampler import item_matrix
+from nutriusher.tables import SUMMARY_COLUMNS, TABLE_FORMATS
+
+# Columns of create_meal_plan_table
+PLAN_COLUMNS = ['Week', 'Day', 'Meal', 'Foods'] + list(SUMMARY_COLUMNS.values())
+# Extra leading columns of a bulk export
+BULK_COLUMNS = ['plan_id', 'user_id', 'created_at']
+
+MIME_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+# Decimals kept for each total in JSON and XLSX, as TABLE_FORMATS shows them
+DECIMALS = {column: 0 if fmt == "{:.0f}" else 1 for column, fmt in TABLE_FORMATS.items()}
+
+
+def _meal_row(day_id, meal, names, totals):
+    week, day = parse_day_id(day_id)
+    return [f"Week {week}", f"Day {day}", meal, "\n".join([f"• {name}" for name in names]), *totals]
+
+
+def plan_rows(plan):
+    """Rows of a 'Week N Day M' -> meal -> items plan, meals without items skipped"""
+    for day_id, day_meals in plan.items():
+        for meal, items in day_meals.items():
+            if isinstance(items, list) and items:
+                yield _meal_row(day_id, meal, [item['Food'] for item in items],
+                                [sum(item[key] for item in items) for key in SUMMARY_COLUMNS])
+
+
+def compact_rows(plan_data, names, nutrients):
+    """
+    Rows of a plan in the plan_codec compact format
+
+    ``names`` and ``nutrients`` are sampler.item_matrix of the catalog the
+    plan was encoded with; totals are summed from it the same way
+    plan_rows sums item dicts.
+    """
+    counts = np.frombuffer(plan_data['counts'], dtype='u1')
+    ids = np.frombuffer(plan_data['items'], dtype='<u4').astype(np.intp)
+    slots = np.repeat(np.arange(len(counts)), counts)
+    totals = np.column_stack([
+        np.bincount(slots, weights=nutrients[ids, column], minlength=len(counts))
+        for column in range(len(SUMMARY_COLUMNS))
+    ]).tolist()
+    food_names = names[ids].tolist()
+    ends = np.cumsum(counts).tolist()
+    meals = plan_data['meals']
+    slot = 0
+    for day_id in day_ids(plan_data['weeks'], plan_data['days_per_week']):
+        for meal in meals:
+            if counts[slot]:
+                yield _meal_row(day_id, meal, food_names[ends[slot] - counts[slot]:ends[slot]], totals[slot])
+            slot += 1
+
+
+class CsvWriter:
+    """Totals formatted as create_meal_plan_table formats them"""
+
+    def __init__(self, stream, columns):
+        self._text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        self._writer = csv.writer(self._text, lineterminator='\n')
+        self._formats = [TABLE_FORMATS.get(column) for column in columns]
+        self._writer.writerow(columns)
+
+    def write_row(self, values):
+        self._writer.writerow([value if fmt is None else fmt.format(value)
+                               for value, fmt in zip(values, self._formats)])
+
+    def close(self):
+        self._text.flush()
+        self._text.detach()
+
+
+class JsonLinesWriter:
+    def __init__(self, stream, columns):
+        self._stream = stream
+        self._columns = columns
+        self._decimals = [DECIMALS.get(column) for column in columns]
+
+    def write_row(self, values):
+        values = [value if places is None else round(value, places)
+                  for value, places in zip(values, self._decimals)]
+        self._stream.write(json.dumps(dict(zip(self._columns, values)), ensure_ascii=False).encode() + b"\n")
+
+    def close(self):
+        pass
+
+
+# Characters XML 1.0 does not allow, even escaped
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Meal plan" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>')
+}
+
+
+class XlsxWriter:
+    """
+    Single-sheet workbook written as a stream
+
+    The sheet XML is deflated into the zip as rows arrive, with strings
+    inline rather than in a shared string table, so nothing accumulates.
+    """
+
+    # Rows per sheet in Excel, header included
+    MAX_ROWS = 1048576
+
+    def __init__(self, stream, columns):
+        self._zip = zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED)
+        for name, content in _XLSX_PARTS.items():
+            self._zip.writestr(name, content)
+        self._sheet = io.TextIOWrapper(self._zip.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True),
+                                       encoding='utf-8')
+        self._sheet.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                          '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                          '<sheetData>')
+        self._decimals = [DECIMALS.get(column) for column in columns]
+        self._rows = 0
+        self.write_row(columns, header=True)
+
+    def write_row(self, values, header=False):
+        if self._rows == self.MAX_ROWS:
+            raise ValueError(f"XLSX sheets hold at most {self.MAX_ROWS} rows; export CSV or JSON Lines")
+        self._rows += 1
+        cells = []
+        for value, places in zip(values, self._decimals):
+            if places is not None and not header:
+                cells.append(f'<c><v>{round(value, places)!r}</v></c>')
+            else:
+                text = escape(_XML_INVALID.sub('', str(value)))
+                cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+        self._sheet.write(f'<row>{"".join(cells)}</row>')
+
+    def close(self):
+        self._sheet.write('</sheetData></worksheet>')
+        self._sheet.close()
+        self._zip.close()
+
+
+WRITERS = {'csv': CsvWriter, 'jsonl': JsonLinesWriter, 'xlsx': XlsxWriter}
+
+
+def open_writer(stream, fmt, columns=PLAN_COLUMNS):
+    """Row writer for a format, writing to a binary stream"""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(WRITERS)}")
+    return WRITERS[fmt](stream, columns)
+
+
+def export_plan(plan, stream, fmt='csv'):
+    """
+    Write one plan to a binary stream
+
+    Args:
+        plan (dict): 'Week N Day M' -> meal -> items plan
+        fmt (str): 'csv', 'jsonl' or 'xlsx'
+
+    Returns:
+        int: Rows written, header excluded
+    """
+    writer = open_writer(stream, fmt)
+    rows = 0
+    for row in plan_rows(plan):
+        writer.write_row(row)
+        rows += 1
+    writer.close()
+    return rows
+
+
+def export_file(plan, fmt='csv'):
+    """
+    The plan exported as bytes, for st.download_button
+
+    Streamlit only accepts str, bytes and a few stream types as download
+    data; one plan is a few tens of kilobytes in any format.
+    """
+    out = io.BytesIO()
+    export_plan(plan, out, fmt)
+    return out.getvalue()
+
+
+class CatalogResolver:
+    """
+    item_matrix of the catalog a compact plan refers to
+
+    The current catalog serves its own version; older versions are
+    rebuilt from the 'catalogs' collection and kept in a small LRU.
+    """
+
+    def __init__(self, db, food_data, max_catalogs=8):
+        from nutriusher.catalog import catalog_version
+
+        self.db = db
+        self._matrices = LRUCache(max_entries=max_catalogs)
+        self._matrices.put(catalog_version(food_data), item_matrix(food_data))
+
+    def __call__(self, version):
+        """(names, nutrients), or None if no snapshot of the version was stored"""
+        from nutriusher.plan_codec import load_catalog_snapshot
+
+        matrix = self._matrices.get(version)
+        if matrix is None:
+            food_data = load_catalog_snapshot(self.db, version)
+            if food_data is None:
+                return None
+            matrix = item_matrix(food_data)
+            self._matrices.put(version, matrix)
+        return matrix
+
+
+def _created_at(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _member_name(fmt, part):
+    return f"meal_plans.{fmt}" if part == 1 else f"meal_plans-{part}.{fmt}"
+
+
+def export_all(db, food_data, stream, fmt='csv', page_size=500):
+    """
+    Export every stored plan into one zip archive
+
+    Pages through meal_plans in document-id order, like
+    migrate_plans.migrate_plans. The archive holds ``meal_plans.<fmt>``,
+    written as the pages are read. An XLSX sheet holds XlsxWriter.MAX_ROWS
+    rows, so an XLSX export continues in ``meal_plans-2.xlsx`` and so on
+    when one fills up; a plan's rows are never split between files.
+
+    Returns:
+        dict: Counts of exported plans, rows written, files in the archive
+            and plans skipped because their catalog snapshot is missing
+    """
+    stats = {'plans': 0, 'rows': 0, 'files': 0, 'skipped': 0}
+    resolve = CatalogResolver(db, food_data)
+    query = db.collection('meal_plans').order_by('__name__').limit(page_size)
+    # Data rows per file, the header taking one row of the format's limit
+    max_rows = getattr(WRITERS.get(fmt), 'MAX_ROWS', None)
+    max_rows = max_rows - 1 if max_rows is not None else None
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        # XLSX is itself a zip; store it without deflating twice
+        compression = zipfile.ZIP_STORED if fmt == 'xlsx' else zipfile.ZIP_DEFLATED
+
+        def next_file():
+            stats['files'] += 1
+            info = zipfile.ZipInfo(_member_name(fmt, stats['files']))
+            info.compress_type = compression
+            member = archive.open(info, 'w', force_zip64=True)
+            return member, open_writer(member, fmt, BULK_COLUMNS + PLAN_COLUMNS)
+
+        member = writer = None
+        member_rows = 0
+        last = None
+        try:
+            while True:
+                page = list((query.start_after(last) if last is not None else query).stream())
+                if not page:
+                    break
+                for doc in page:
+                    document = doc.to_dict()
+                    plan_data = document.get('plan_data') or {}
+                    if is_compact(plan_data):
+                        matrix = resolve(plan_data['catalog_version'])
+                        if matrix is None:
+                            stats['skipped'] += 1
+                            continue
+                        rows = list(compact_rows(plan_data, *matrix))
+                    else:
+                        rows = list(plan_rows(plan_data))
+                    if writer is None or (max_rows is not None and member_rows + len(rows) > max_rows):
+                        if writer is not None:
+                            writer.close()
+                            member.close()
+                        member, writer = next_file()
+                        member_rows = 0
+                    prefix = [doc.id, document.get('user_id'), _created_at(document.get('created_at'))]
+                    for row in rows:
+                        writer.write_row(prefix + row)
+                    member_rows += len(rows)
+                    stats['rows'] += len(rows)
+                    stats['plans'] += 1
+                last = page[-1]
+            if writer is None:
+                # No plans: still one file, with the header
+                member, writer = next_file()
+            writer.close()
+        finally:
+            if member is not None:
+                member.close()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('output', help="Zip archive to write")
+    parser.add_argument('--format', choices=list(WRITERS), default='csv')
+    parser.add_argument('--credentials', default='firebase-adminsdk.json')
+    parser.add_argument('--catalog', default='food.csv')
+    parser.add_argument('--page-size', type=int, default=500)
+    args = parser.parse_args(argv)
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    from nutriusher.catalog import load_food_catalog
+
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(args.credentials))
+    with open(args.output, 'wb') as f:
+        stats = export_all(firestore.client(), load_food_catalog(args.catalog), f, args.format, args.page_size)
+    print(f"exported {stats['plans']} plans, {stats['rows']} rows in {stats['files']} files, "
+          f"skipped {stats['skipped']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Local stand-in for Firebase Auth's token issuing and Google's key endpoint.
+
+LocalKeyPair generates an RSA key pair, publishes its public key through
+``fetch_keys`` (same shape as sessions.fetch_google_keys) and signs ID
+tokens with the same claims Firebase puts in them, so the session code can
+be exercised offline in benchmarks and load tests.
+"""
+import secrets
+import threading
+import time
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from nutriusher.sessions import SessionError
+
+
+class LocalKeyPair:
+    def __init__(self, project_id='nutriusher-local', kid=None, max_age=3600, fetch_delay=0.0):
+        self.project_id = project_id
+        self.kid = kid or secrets.token_hex(20)
+        self.max_age = max_age
+        self.fetch_delay = fetch_delay
+        self._private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self._users = {}
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def fetch_keys(self):
+        """Published keys, like sessions.fetch_google_keys"""
+        if self.fetch_delay:
+            # Simulate the round trip to Google's key endpoint
+            time.sleep(self.fetch_delay)
+        with self._lock:
+            self.fetches += 1
+        return {self.kid: self._private_key.public_key()}, self.max_age
+
+    def rotate(self):
+        """Replace the signing key, as Google does every few hours"""
+        self.kid = secrets.token_hex(20)
+        self._private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def add_user(self, email, password, uid=None, display_name=None):
+        uid = uid or secrets.token_hex(14)
+        with self._lock:
+            self._users[email] = (password, uid, display_name)
+        return uid
+
+    def mint_token(self, uid, email=None, lifetime=3600, issued_at=None, **claims):
+        """Signed ID token with Firebase's claim layout"""
+        now = int(issued_at if issued_at is not None else time.time())
+        payload = {
+            'iss': f'https://securetoken.google.com/{self.project_id}',
+            'aud': self.project_id,
+            'auth_time': now,
+            'user_id': uid,
+            'sub': uid,
+            'iat': now,
+            'exp': now + lifetime,
+            'firebase': {'sign_in_provider': 'password'}
+        }
+        if email is not None:
+            payload['email'] = email
+        payload.update(claims)
+        return jwt.encode(payload, self._private_key, algorithm='RS256', headers={'kid': self.kid})
+
+    def sign_in(self, email, password):
+        """ID token for a registered user, like sessions.sign_in_with_password"""
+        with self._lock:
+            user = self._users.get(email)
+        if user is None:
+            raise SessionError('User not found. Please check your email or sign up.')
+        expected, uid, display_name = user
+        if not secrets.compare_digest(expected, password):
+            raise SessionError('Incorrect email or password.')
+        claims = {'name': display_name} if display_name else {}
+        return self.mint_token(uid, email, **claims)
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with an optional time-to-live and hit/miss counters.
+
+    ``max_entries`` bounds the number of entries; with ``sizeof`` the bound
+    is instead the sum of sizeof(value) over all entries (``max_size``).
+    """
+
+    def __init__(self, max_entries=1024, ttl=None, max_size=None, sizeof=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires, size = entry
+                if expires is None or expires > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            size = self.sizeof(value) if self.sizeof is not None else 1
+            expires = self._clock() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (value, expires, size)
+            self._size += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or (self.max_size is not None and self._size > self.max_size)):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._size -= size
+
+    def pop(self, key):
+        with self._lock:
+            if key in self._entries:
+                value = self._entries[key][0]
+                self._remove(key)
+                return value
+            return None
+
+    def discard_where(self, predicate):
+        """Remove every entry whose key matches predicate"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'size': self._size,
+                'evictions': self.evictions
+            }
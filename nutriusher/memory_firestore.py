@@ -0,0 +1,254 @@
+"""
+In-memory stand-in for the parts of the Firestore client the app uses.
+
+Supports collection/document references (and subcollections), set/update/delete, batches,
+equality and comparison filters, order_by, select projections, limit and
+start_after cursors, so code written against ``firestore.client()`` can
+run offline in benchmarks and load tests. Values equal to Firestore's
+SERVER_TIMESTAMP sentinel are replaced with the current UTC time.
+"""
+import copy
+import secrets
+import threading
+from datetime import datetime, timezone
+
+ASCENDING = 'ASCENDING'
+DESCENDING = 'DESCENDING'
+
+_OPERATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a is not None and a < b,
+    '<=': lambda a, b: a is not None and a <= b,
+    '>': lambda a, b: a is not None and a > b,
+    '>=': lambda a, b: a is not None and a >= b,
+    'in': lambda a, b: a in b,
+    'array_contains': lambda a, b: isinstance(a, list) and b in a,
+}
+
+
+class _ServerTimestamp:
+    def __repr__(self):
+        return 'SERVER_TIMESTAMP'
+
+
+SERVER_TIMESTAMP = _ServerTimestamp()
+
+
+def _is_server_timestamp(value):
+    return value is SERVER_TIMESTAMP or 'server timestamp' in repr(value).lower()
+
+
+def _resolve(data):
+    return {key: datetime.now(timezone.utc) if _is_server_timestamp(value) else value
+            for key, value in data.items()}
+
+
+def _order_key(value):
+    # Firestore orders None before numbers before strings, etc.
+    return (value is not None, value)
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class DocumentReference:
+    def __init__(self, client, collection, document_id):
+        self._client = client
+        self._collection = collection
+        self.id = document_id
+
+    @property
+    def path(self):
+        return f"{self._collection}/{self.id}"
+
+    def get(self, field_paths=None):
+        self._client.reads += 1
+        data = self._client._read(self._collection, self.id)
+        if data is not None:
+            if field_paths is not None:
+                data = {key: value for key, value in data.items() if key in field_paths}
+        return DocumentSnapshot(self, data)
+
+    def set(self, data, merge=False):
+        self._client._write(self._collection, self.id, _resolve(data), merge)
+
+    def update(self, data):
+        if self._client._read(self._collection, self.id) is None:
+            raise KeyError(f"No document to update: {self.path}")
+        self._client._write(self._collection, self.id, _resolve(data), True)
+
+    def delete(self):
+        self._client._delete(self._collection, self.id)
+
+    def collection(self, name):
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+
+class Query:
+    def __init__(self, client, collection, filters=(), orders=(), fields=None, limit=None, cursor=None):
+        self._client = client
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._fields = fields
+        self._limit = limit
+        self._cursor = cursor
+
+    def _copy(self, **changes):
+        state = dict(filters=self._filters, orders=self._orders, fields=self._fields,
+                     limit=self._limit, cursor=self._cursor)
+        state.update(changes)
+        return Query(self._client, self._collection, **state)
+
+    def where(self, field, op, value):
+        return self._copy(filters=self._filters + ((field, _OPERATORS[op], value),))
+
+    def order_by(self, field, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((field, direction),))
+
+    def select(self, fields):
+        return self._copy(fields=list(fields))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, cursor):
+        return self._copy(cursor=cursor)
+
+    def stream(self):
+        documents = list(self._client._documents(self._collection).items())
+        matches = [
+            (document_id, data) for document_id, data in documents
+            if all(op(data.get(field), value) for field, op, value in self._filters)
+        ]
+        # Stable multi-key sort, last key first
+        matches.sort(key=lambda item: item[0])
+        for index in reversed(range(len(self._orders))):
+            field, direction = self._orders[index]
+            matches.sort(
+                key=lambda item: _order_key(item[0] if field == '__name__' else item[1].get(field)),
+                reverse=direction == DESCENDING
+            )
+
+        if self._cursor is not None:
+            if isinstance(self._cursor, DocumentSnapshot):
+                cursor_id = self._cursor.id
+                position = next((i for i, (document_id, _) in enumerate(matches) if document_id == cursor_id), None)
+                matches = matches[position + 1:] if position is not None else matches
+            else:
+                matches = [item for item in matches if self._after_values(item, self._cursor)]
+
+        if self._limit is not None:
+            matches = matches[:self._limit]
+
+        self._client.reads += max(len(matches), 1)
+        for document_id, data in matches:
+            data = copy.deepcopy(data)
+            if self._fields is not None:
+                data = {key: value for key, value in data.items() if key in self._fields}
+            yield DocumentSnapshot(DocumentReference(self._client, self._collection, document_id), data)
+
+    def _after_values(self, item, cursor):
+        document_id, data = item
+        for field, direction in self._orders:
+            if field not in cursor:
+                break
+            value = _order_key(document_id if field == '__name__' else data.get(field))
+            bound = _order_key(cursor[field])
+            if value != bound:
+                return value > bound if direction == ASCENDING else value < bound
+        return False
+
+    def get(self):
+        return list(self.stream())
+
+
+class CollectionReference(Query):
+    def __init__(self, client, collection):
+        super().__init__(client, collection)
+        self.id = collection
+
+    def document(self, document_id=None):
+        return DocumentReference(self._client, self._collection, document_id or secrets.token_hex(10))
+
+    def add(self, data):
+        reference = self.document()
+        reference.set(data)
+        return None, reference
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._operations = []
+
+    def set(self, reference, data, merge=False):
+        self._operations.append(lambda: reference.set(data, merge))
+
+    def update(self, reference, data):
+        self._operations.append(lambda: reference.update(data))
+
+    def delete(self, reference):
+        self._operations.append(reference.delete)
+
+    def commit(self):
+        with self._client._lock:
+            for operation in self._operations:
+                operation()
+        self._client.commits += 1
+        self._operations = []
+
+
+class MemoryFirestore:
+    """Thread-safe in-memory Firestore client with read/write counters"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.RLock()
+        self.reads = 0
+        self.writes = 0
+        self.commits = 0
+
+    def _documents(self, collection):
+        with self._lock:
+            return dict(self._data.get(collection, {}))
+
+    def _read(self, collection, document_id):
+        with self._lock:
+            data = self._data.get(collection, {}).get(document_id)
+            return copy.deepcopy(data) if data is not None else None
+
+    def _write(self, collection, document_id, data, merge):
+        with self._lock:
+            documents = self._data.setdefault(collection, {})
+            if merge and document_id in documents:
+                documents[document_id] = {**documents[document_id], **copy.deepcopy(data)}
+            else:
+                documents[document_id] = copy.deepcopy(data)
+            self.writes += 1
+
+    def _delete(self, collection, document_id):
+        with self._lock:
+            self._data.get(collection, {}).pop(document_id, None)
+            self.writes += 1
+
+    def collection(self, name):
+        return CollectionReference(self, name)
+
+    def batch(self):
+        return WriteBatch(self)
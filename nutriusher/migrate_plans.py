@@ -0,0 +1,69 @@
+"""
+Re-encode stored meal plans in the compact plan format.
+
+    python -m nutriusher.migrate_plans --credentials firebase-adminsdk.json [--dry-run]
+
+Pages through the whole meal_plans collection in document-id order and
+rewrites every legacy plan_data in batched updates. Plans that cannot be
+encoded against the current catalog are left untouched and counted.
+"""
+import argparse
+
+from nutriusher.catalog import load_food_catalog
+from nutriusher.plan_codec import is_compact, migrate_plan_data, store_catalog_snapshot
+
+
+def migrate_plans(db, food_data, page_size=300, dry_run=False):
+    """
+    Migrate every legacy plan in the meal_plans collection
+
+    Returns:
+        dict: Counts of migrated, already compact and skipped plans
+    """
+    stats = {'migrated': 0, 'compact': 0, 'skipped': 0}
+    if not dry_run:
+        store_catalog_snapshot(db, food_data)
+
+    query = db.collection('meal_plans').order_by('__name__').limit(page_size)
+    last = None
+    while True:
+        page = list((query.start_after(last) if last is not None else query).stream())
+        if not page:
+            break
+        batch = db.batch()
+        for doc in page:
+            plan_data = doc.to_dict().get('plan_data')
+            if is_compact(plan_data):
+                stats['compact'] += 1
+                continue
+            encoded = migrate_plan_data(plan_data, food_data)
+            if encoded is None:
+                stats['skipped'] += 1
+                continue
+            batch.update(doc.reference, {'plan_data': encoded})
+            stats['migrated'] += 1
+        if not dry_run:
+            batch.commit()
+        last = page[-1]
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--credentials', default='firebase-adminsdk.json')
+    parser.add_argument('--catalog', default='food.csv')
+    parser.add_argument('--page-size', type=int, default=300)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args(argv)
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(args.credentials))
+    stats = migrate_plans(firestore.client(), load_food_catalog(args.catalog), args.page_size, args.dry_run)
+    print(f"migrated {stats['migrated']}, already compact {stats['compact']}, skipped {stats['skipped']}")
+
+
+if __name__ == '__main__':
+    main()
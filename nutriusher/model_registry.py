@@ -0,0 +1,85 @@
+"""
+Local registry of trained calorie models.
+
+Each model lives in its own directory under the registry root:
+
+    <root>/<model_id>/model.npz    weights, in the calorie_model export format
+    <root>/<model_id>/meta.json    parameters, data fingerprint and metrics
+
+``model_id`` is derived from the model type, its parameters and the
+fingerprint of the data it was trained on, so training the same model on
+the same data again finds the existing entry. ``promote`` copies a model
+to where the app loads it from (calorie_model.model_path()).
+"""
+import hashlib
+import json
+import os
+import shutil
+
+from nutriusher.calorie_model import model_path
+
+DEFAULT_REGISTRY = 'models/registry'
+
+
+def model_id(kind, params, fingerprint):
+    """Stable id for a model type and parameters trained on one dataset"""
+    encoded = json.dumps(params, sort_keys=True, default=str)
+    return f"{kind}-{hashlib.sha1(encoded.encode()).hexdigest()[:10]}-{fingerprint[:10]}"
+
+
+class ModelRegistry:
+    def __init__(self, root=DEFAULT_REGISTRY):
+        self.root = root
+
+    def model_dir(self, model_id):
+        return os.path.join(self.root, model_id)
+
+    def weights_path(self, model_id):
+        return os.path.join(self.model_dir(model_id), 'model.npz')
+
+    def get(self, model_id):
+        """meta.json of a registered model, or None"""
+        path = os.path.join(self.model_dir(model_id), 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def register(self, model_id, meta):
+        """
+        Record a model whose weights were written to weights_path(model_id)
+
+        meta.json is written last, through a temporary file, so a model is
+        only listed once it is complete.
+        """
+        if not os.path.exists(self.weights_path(model_id)):
+            raise ValueError(f"No weights written for {model_id}")
+        meta = {**meta, 'model_id': model_id}
+        path = os.path.join(self.model_dir(model_id), 'meta.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+        os.replace(path + '.tmp', path)
+        return meta
+
+    def list(self):
+        """meta of every registered model"""
+        if not os.path.isdir(self.root):
+            return []
+        models = [self.get(name) for name in sorted(os.listdir(self.root))]
+        return [meta for meta in models if meta is not None]
+
+    def best(self, metric='val_rmse', fingerprint=None):
+        """Registered model with the lowest ``metric``, optionally for one dataset"""
+        models = [meta for meta in self.list()
+                  if fingerprint is None or meta.get('fingerprint') == fingerprint]
+        return min(models, key=lambda meta: meta['metrics'][metric], default=None)
+
+    def promote(self, model_id, path=None):
+        """Copy a model's weights to where the app loads its calorie model"""
+        path = path or model_path()
+        if self.get(model_id) is None:
+            raise ValueError(f"Unknown model {model_id}")
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        shutil.copyfile(self.weights_path(model_id), path + '.tmp')
+        os.replace(path + '.tmp', path)
+        return path
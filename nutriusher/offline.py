@@ -0,0 +1,68 @@
+"""
+In-memory stand-ins for Firebase, for running the app offline.
+
+    python -m nutriusher.offline --users 20 [streamlit run options]
+
+Starts ``streamlit run app.py`` in this process after install_fakes has
+replaced bootstrap's resources: Firestore becomes a MemoryFirestore and
+login goes through a local_auth.LocalKeyPair, so tokens are signed and
+verified exactly as in production, just with a local key. ``--users N``
+registers the accounts ``offline_user(0)`` .. ``offline_user(N - 1)``, so
+login, generate, save and the saved plans list all work without a
+network; benchmarks.load_test relies on this. Everything is lost when
+the process exits. Sign up still needs Firebase.
+"""
+import argparse
+import os
+import sys
+
+
+def offline_user(i):
+    """(email, password) of the i-th registered offline account"""
+    return f"user{i}@example.com", f"password-{i}"
+
+
+def install_fakes(users=0):
+    """
+    Install the in-memory Firestore and local token signing in bootstrap
+
+    Returns:
+        LocalKeyPair: The local identity provider, to register more users
+    """
+    from nutriusher import bootstrap
+    from nutriusher.local_auth import LocalKeyPair
+    from nutriusher.memory_firestore import SERVER_TIMESTAMP, MemoryFirestore
+    from nutriusher.plan_store import CachedPlanRepository, PlanRepository
+    from nutriusher.sessions import SessionManager, SigningKeyCache, TokenVerifier
+
+    provider = LocalKeyPair()
+    for i in range(users):
+        provider.add_user(*offline_user(i))
+
+    db = MemoryFirestore()
+    bootstrap.install('firestore', db)
+    bootstrap.install('plan_repository', CachedPlanRepository(PlanRepository(db, SERVER_TIMESTAMP)))
+    verifier = TokenVerifier(provider.project_id, SigningKeyCache(provider.fetch_keys))
+    bootstrap.install('session_manager', SessionManager(verifier, provider.sign_in))
+    return provider
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=0, help="Offline accounts to register")
+    parser.add_argument('--app', default='app.py')
+    args, streamlit_args = parser.parse_known_args(argv)
+
+    install_fakes(args.users)
+    # The login page refuses to sign in without a web API key; the fake
+    # session manager never uses it
+    os.environ.setdefault('FIREBASE_API_KEY', 'offline')
+
+    from streamlit.web import cli
+
+    sys.argv = ['streamlit', 'run', args.app, *streamlit_args]
+    sys.exit(cli.main())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import time
+
+import numpy as np
+
+from nutriusher.candidates import MEAL_CALORIE_SHARES
+
+# Columns of the selector's nutrient matrix
+MACRO_COLUMNS = ['Calories', 'Proteins', 'Carbohydrates', 'Fats']
+
+
+def macro_targets(user_input, meal):
+    """
+    Calorie and macro targets for one meal
+
+    Daily macros come from the user requirements when present, otherwise
+    from the 15/55/30 protein/carb/fat split used in main(). The meal gets
+    the same share of each as of the calories.
+    """
+    daily_calories = user_input['Calories']
+    daily = np.array([
+        daily_calories,
+        user_input.get('Proteins', daily_calories * 0.15 / 4),
+        user_input.get('Carbs', daily_calories * 0.55 / 4),
+        user_input.get('Fats', daily_calories * 0.30 / 9)
+    ], dtype=float)
+    return daily * MEAL_CALORIE_SHARES[meal]
+
+
+class MacroSelector:
+    """
+    Picks each meal's items to minimize the deviation from its targets.
+
+    The objective is the weighted sum of squared relative errors of the
+    meal's calorie, protein, carb and fat totals. A greedy solution is
+    always computed first; the exact search over every 2- and 3-item
+    combination then runs in chunks and stops at the deadline, keeping the
+    best combination seen so far. Candidate sets larger than ``shortlist``
+    are first cut down to the items that best fit a share of the target.
+    """
+
+    def __init__(self, nutrients, weights=(1.0, 1.0, 1.0, 1.0), time_budget=0.05,
+                 shortlist=80):
+        self.nutrients = np.asarray(nutrients, dtype=float)
+        self.weights = np.asarray(weights, dtype=float)
+        self.time_budget = time_budget
+        self.shortlist = shortlist
+        self.stats = {'exact': 0, 'greedy': 0}
+
+    def _cost(self, totals, target):
+        errors = (totals - target) / np.maximum(target, 1e-9)
+        return (errors ** 2) @ self.weights
+
+    def _greedy(self, values, target, min_items, max_items):
+        chosen = []
+        totals = np.zeros(values.shape[1])
+        best_cost = np.inf
+        for step in range(min(max_items, len(values))):
+            costs = self._cost(totals + values, target)
+            costs[chosen] = np.inf
+            pick = int(np.argmin(costs))
+            if step >= min_items and costs[pick] >= best_cost:
+                break
+            chosen.append(pick)
+            totals += values[pick]
+            best_cost = costs[pick]
+        return chosen, best_cost
+
+    def _exhaustive(self, values, target, min_items, max_items, deadline, best, best_cost):
+        n = len(values)
+        complete = True
+        if min_items <= 2 <= max_items and n >= 2:
+            i, j = np.triu_indices(n, 1)
+            costs = self._cost(values[i] + values[j], target)
+            k = int(np.argmin(costs))
+            if costs[k] < best_cost:
+                best, best_cost = [int(i[k]), int(j[k])], costs[k]
+
+        if max_items >= 3 and n >= 3:
+            # Triples in chunks of one leading item so the deadline is honoured
+            for a in range(n - 2):
+                if time.perf_counter() > deadline:
+                    complete = False
+                    break
+                i, j = np.triu_indices(n - a - 1, 1)
+                i += a + 1
+                j += a + 1
+                costs = self._cost(values[a] + values[i] + values[j], target)
+                k = int(np.argmin(costs))
+                if costs[k] < best_cost:
+                    best, best_cost = [a, int(i[k]), int(j[k])], costs[k]
+        return best, best_cost, complete
+
+    def best_fits(self, candidates, target, size, max_items=3):
+        """Indices of the ``size`` candidates closest to an even share of the target"""
+        if len(candidates) <= size:
+            return np.arange(len(candidates))
+        fit = self._cost(self.nutrients[candidates] * max_items, target)
+        return np.argpartition(fit, size)[:size]
+
+    def select(self, candidates, target, min_items=2, max_items=3, deadline=None):
+        """
+        Choose items for one meal
+
+        Args:
+            candidates (numpy.ndarray): Row positions to choose from
+            target (numpy.ndarray): Calorie, protein, carb and fat targets
+            deadline (float, optional): time.perf_counter() value after
+                which only the greedy solution is used
+
+        Returns:
+            numpy.ndarray: Indices into ``candidates``
+        """
+        if deadline is None:
+            deadline = time.perf_counter() + self.time_budget
+        values = self.nutrients[candidates]
+
+        pool = self.best_fits(candidates, target, self.shortlist, max_items)
+
+        chosen, cost = self._greedy(values[pool], target, min_items, max_items)
+        complete = False
+        if time.perf_counter() < deadline:
+            chosen, cost, complete = self._exhaustive(
+                values[pool], target, min_items, max_items, deadline, chosen, cost)
+        self.stats['exact' if complete else 'greedy'] += 1
+        return pool[np.asarray(chosen, dtype=int)]
@@ -0,0 +1,85 @@
+"""
+Process-wide cache of generated four-week plans.
+
+Plans drawn with the default per-day seeds depend only on the catalog and
+the candidate lists, i.e. on the calorie limit, diet and conditions. Users
+whose calories fall in the same ``bucket_width`` band therefore share one
+plan, generated for the bottom of the band so no meal exceeds any of their
+calorie limits. Plans are held as numeric PlanTables, about an eighth
+of the size of the item dicts, and evicted least recently used once their
+size passes ``max_bytes``.
+"""
+import os
+
+from nutriusher import timing
+from nutriusher.candidates import condition_key, diet_flag
+from nutriusher.catalog import catalog_version, plan_sampler
+from nutriusher.lru import LRUCache
+from nutriusher.planner import generate_four_week_plan
+
+
+class PlanCache:
+    def __init__(self, bucket_width=50, max_bytes=64 * 2 ** 20, max_entries=4096):
+        self.bucket_width = bucket_width
+        self._plans = LRUCache(max_entries=max_entries, max_size=max_bytes, sizeof=lambda table: table.nbytes)
+
+    def calorie_bucket(self, calories):
+        if not self.bucket_width:
+            return calories
+        return int(calories // self.bucket_width * self.bucket_width)
+
+    def normalize(self, user_input):
+        """Requirements every user in the same bucket is planned with"""
+        diet = user_input['Diet']
+        return {
+            'Calories': self.calorie_bucket(user_input['Calories']),
+            'Diet': 'All' if diet_flag(diet) is None else diet,
+            'Condition': sorted(condition_key(user_input['Condition']))
+        }
+
+    def key(self, user_input, food_data, optimize=False):
+        normalized = self.normalize(user_input)
+        return (
+            catalog_version(food_data),
+            normalized['Calories'],
+            diet_flag(normalized['Diet']),
+            tuple(normalized['Condition']),
+            optimize
+        )
+
+    @timing.timed('plan_cache.table')
+    def table(self, user_input, food_data, optimize=False):
+        """
+        Cached PlanTable for the user's bucket, generated on first request
+
+        The table is shared; callers must not modify it. Catalogs not
+        loaded through catalog.load_food_catalog have no version and are
+        never cached.
+        """
+        normalized = self.normalize(user_input)
+        if catalog_version(food_data) is None:
+            return plan_sampler(food_data).generate_table(normalized, optimize=optimize)
+
+        key = self.key(user_input, food_data, optimize)
+        table = self._plans.get(key)
+        if table is None:
+            table = plan_sampler(food_data).generate_table(normalized, optimize=optimize)
+            self._plans.put(key, table)
+        return table
+
+    def generate(self, user_input, food_data, optimize=False):
+        """Four-week plan dict for the user's bucket, safe to edit"""
+        normalized = self.normalize(user_input)
+        if catalog_version(food_data) is None:
+            return generate_four_week_plan(normalized, food_data, optimize=optimize)
+        return self.table(user_input, food_data, optimize).to_plan()
+
+    def clear(self):
+        self._plans.clear()
+
+    def stats(self):
+        """Hits, misses, hit rate, entries, bytes held and evictions"""
+        return {**self._plans.stats(), 'bucket_width': self.bucket_width}
+
+
+plan_cache = PlanCache(bucket_width=int(os.environ.get('NUTRIUSHER_CALORIE_BUCKET', 50)))
@@ -0,0 +1,224 @@
+"""
+Compact, versioned storage format for saved meal plans.
+
+A generated plan is a dict of 'Week N Day M' -> meal -> list of item
+dicts, with every nutrient copied into every item. The compact format
+stores only catalog row positions plus the meal and day totals, packed
+into little-endian binary fields (Firestore stores them as Blobs):
+
+    format          PLAN_FORMAT
+    catalog_version content version of the catalog the ids refer to
+    weeks, days_per_week, meals
+    counts          uint8 per slot, number of items (0 = no suitable meal)
+    items           uint32 catalog row positions, slot by slot
+    meal_totals     float32 per slot, Calories/Proteins/Carbs/Fats
+    day_totals      float32 per day, Calories/Proteins/Carbs/Fats
+
+Documents without a 'format' field are the legacy nested dicts; they are
+passed through by decode_plan and re-encoded by migrate_plan_data.
+
+Compact plans decode against the catalog version they were encoded with.
+Each version's names and nutrients are stored once, in
+``catalogs/<version>`` and its ``chunks`` subcollection
+(store_catalog_snapshot / load_catalog_snapshot).
+"""
+import numpy as np
+import pandas as pd
+
+from nutriusher.catalog import catalog_version
+from nutriusher.plan_table import parse_day_id
+from nutriusher.sampler import ITEM_COLUMNS, MEALS, NO_MEAL_FOUND, item_matrix, make_items
+
+PLAN_FORMAT = 1
+TOTAL_FIELDS = ['Calories', 'Proteins', 'Carbs', 'Fats']
+
+# Collection of catalog snapshots, one per catalog version
+CATALOGS = 'catalogs'
+
+# Rows per snapshot chunk document; a row is a name and six numbers, so a
+# chunk stays a few hundred KiB, under Firestore's 1 MiB document limit
+SNAPSHOT_CHUNK_ROWS = 4000
+
+
+def is_compact(plan_data):
+    return isinstance(plan_data, dict) and plan_data.get('format') == PLAN_FORMAT
+
+
+def day_ids(weeks, days_per_week):
+    return [f"Week {week} Day {day}" for week in range(1, weeks + 1) for day in range(1, days_per_week + 1)]
+
+
+def plan_shape(plan):
+    """(weeks, days_per_week) of a 'Week N Day M' keyed plan"""
+    parsed = [parse_day_id(day_id) for day_id in plan]
+    weeks = max(week for week, _ in parsed)
+    days_per_week = max(day for _, day in parsed)
+    if list(plan) != day_ids(weeks, days_per_week):
+        raise ValueError("Plan days are not a complete 'Week N Day M' grid")
+    return weeks, days_per_week
+
+
+def encode_plan(plan, food_data):
+    """
+    Encode a generated plan against the catalog it was generated from
+
+    Raises:
+        ValueError: If the plan does not match the grid layout or names a
+            food that is not in the catalog
+    """
+    weeks, days_per_week = plan_shape(plan)
+    positions = {name: i for i, name in enumerate(food_data['Food_items'].tolist())}
+
+    counts, ids, meal_totals = [], [], []
+    for day_meals in plan.values():
+        for meal in MEALS:
+            items = day_meals.get(meal)
+            if not isinstance(items, list):
+                items = []
+            try:
+                # Older plans kept the catalog's trailing spaces in names
+                ids.extend(positions[item['Food'].strip()] for item in items)
+            except KeyError as e:
+                raise ValueError(f"Food not in catalog: {e}")
+            counts.append(len(items))
+            meal_totals.append([sum(item[field] for item in items) for field in TOTAL_FIELDS])
+
+    meal_totals = np.asarray(meal_totals, dtype='<f4').reshape(-1, len(MEALS), len(TOTAL_FIELDS))
+    return {
+        'format': PLAN_FORMAT,
+        'catalog_version': catalog_version(food_data),
+        'weeks': weeks,
+        'days_per_week': days_per_week,
+        'meals': list(MEALS),
+        'counts': np.asarray(counts, dtype='u1').tobytes(),
+        'items': np.asarray(ids, dtype='<u4').tobytes(),
+        'meal_totals': meal_totals.tobytes(),
+        'day_totals': meal_totals.sum(axis=1).astype('<f4').tobytes()
+    }
+
+
+def plan_totals(plan_data):
+    """
+    Precomputed totals of a compact plan, without the catalog
+
+    Returns:
+        tuple: (meal_totals of shape (days, meals, 4), day_totals of shape
+            (days, 4)), columns in TOTAL_FIELDS order
+    """
+    n_meals = len(plan_data['meals'])
+    fields = len(TOTAL_FIELDS)
+    meal_totals = np.frombuffer(plan_data['meal_totals'], dtype='<f4').reshape(-1, n_meals, fields)
+    day_totals = np.frombuffer(plan_data['day_totals'], dtype='<f4').reshape(-1, fields)
+    return meal_totals, day_totals
+
+
+def decode_plan(plan_data, food_data):
+    """
+    Rebuild the 'Week N Day M' -> meal -> items dict of a stored plan
+
+    Legacy documents are returned unchanged. ``food_data`` must be the
+    catalog version the plan was encoded with.
+    """
+    if not is_compact(plan_data):
+        return plan_data
+    if plan_data['catalog_version'] != catalog_version(food_data):
+        raise ValueError(
+            f"Plan uses catalog {plan_data['catalog_version']}, got {catalog_version(food_data)}")
+
+    names, nutrients = item_matrix(food_data)
+    counts = np.frombuffer(plan_data['counts'], dtype='u1')
+    ids = np.frombuffer(plan_data['items'], dtype='<u4').astype(np.intp)
+    ends = np.cumsum(counts)
+    meals = plan_data['meals']
+
+    plan = {}
+    slot = 0
+    for day_id in day_ids(plan_data['weeks'], plan_data['days_per_week']):
+        day_menu = {}
+        for meal in meals:
+            if counts[slot]:
+                day_menu[meal] = make_items(names, nutrients, ids[ends[slot] - counts[slot]:ends[slot]])
+            else:
+                day_menu[meal] = NO_MEAL_FOUND
+            slot += 1
+        plan[day_id] = day_menu
+    return plan
+
+
+def migrate_plan_data(plan_data, food_data):
+    """
+    Compact encoding of a legacy plan_data, or None when there is nothing
+    to migrate (already compact, or not encodable against this catalog)
+    """
+    if is_compact(plan_data):
+        return None
+    try:
+        return encode_plan(plan_data, food_data)
+    except (ValueError, KeyError, TypeError, AttributeError, IndexError):
+        return None
+
+
+def catalog_snapshot(food_data, chunk_rows=SNAPSHOT_CHUNK_ROWS):
+    """
+    Columns needed to decode plans, for storing one copy per catalog version
+
+    Returns:
+        tuple: (header, chunks); each chunk holds ``chunk_rows`` rows of
+            Food_items and the ITEM_COLUMNS nutrients
+    """
+    names, nutrients = item_matrix(food_data)
+    columns = list(ITEM_COLUMNS.values())
+    chunks = []
+    for start in range(0, len(names), chunk_rows):
+        chunk = {'Food_items': [str(name) for name in names[start:start + chunk_rows]]}
+        for j, column in enumerate(columns):
+            chunk[column] = nutrients[start:start + chunk_rows, j].tolist()
+        chunks.append(chunk)
+    header = {'catalog_version': catalog_version(food_data), 'rows': len(names), 'chunks': len(chunks)}
+    return header, chunks
+
+
+def catalog_from_snapshot(header, chunks):
+    """Catalog DataFrame rebuilt from catalog_snapshot output"""
+    columns = ['Food_items'] + list(ITEM_COLUMNS.values())
+    food_data = pd.DataFrame({column: [value for chunk in chunks for value in chunk[column]]
+                              for column in columns})
+    food_data.attrs['catalog_version'] = header['catalog_version']
+    return food_data
+
+
+def _chunk_id(i):
+    return f"{i:05d}"
+
+
+def store_catalog_snapshot(db, food_data, chunk_rows=SNAPSHOT_CHUNK_ROWS):
+    """
+    Store the catalog snapshot as ``catalogs/<version>`` unless it exists
+
+    Rows go to the document's ``chunks`` subcollection, so each document
+    stays far below Firestore's 1 MiB limit whatever the catalog size. The
+    header is written last: a snapshot whose header exists is complete.
+    """
+    header, chunks = catalog_snapshot(food_data, chunk_rows)
+    catalog_ref = db.collection(CATALOGS).document(header['catalog_version'])
+    if catalog_ref.get().exists:
+        return
+    for i, chunk in enumerate(chunks):
+        catalog_ref.collection('chunks').document(_chunk_id(i)).set(chunk)
+    catalog_ref.set(header)
+
+
+def load_catalog_snapshot(db, version):
+    """Catalog DataFrame of a stored snapshot, or None if it was never stored"""
+    catalog_ref = db.collection(CATALOGS).document(version)
+    snapshot = catalog_ref.get()
+    if not snapshot.exists:
+        return None
+    header = snapshot.to_dict()
+    chunks = []
+    for i in range(header['chunks']):
+        chunk = catalog_ref.collection('chunks').document(_chunk_id(i)).get()
+        if not chunk.exists:
+            return None
+        chunks.append(chunk.to_dict())
+    return catalog_from_snapshot(header, chunks)
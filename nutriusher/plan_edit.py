@@ -0,0 +1,155 @@
+import math
+import time
+
+import numpy as np
+
+from nutriusher.candidates import MEAL_CALORIE_SHARES
+from nutriusher.optimizer import MacroSelector, macro_targets
+from nutriusher.plan_table import parse_day_id
+from nutriusher.recency import weighted_choice
+from nutriusher.sampler import MEALS, NO_MEAL_FOUND
+
+
+class PlanEditor:
+    """
+    Regenerates one item, meal slot, day or week of an existing plan.
+
+    A new pick excludes the foods the same meal had on the surrounding days,
+    before and after (``history`` items, i.e. the sampler's variety window),
+    as well as the items it replaces, so the edited plan still satisfies
+    the window on both sides. When too few foods are left, picks are
+    weighted towards the foods used furthest away, like the sampler's
+    RecencyWindow fallback. Only the edited slots are drawn; the rest of
+    the plan and its candidate lists are reused. Plans are edited in place
+    and each method returns the day IDs it changed, for
+    tables.refresh_summary.
+    """
+
+    def __init__(self, sampler, user_input, history=21, items_per_meal=3, optimize=False,
+                 time_budget=0.002):
+        self.sampler = sampler
+        self.user_input = user_input
+        self.items_per_meal = items_per_meal
+        self.window = math.ceil(history / items_per_meal)
+        self.positions = {name: position for position, name in enumerate(sampler.names.tolist())}
+        self.selector = None
+        if optimize:
+            self.selector = MacroSelector(sampler.nutrients[:, :4], time_budget=time_budget)
+        self._candidates = {}
+
+    def candidates(self, meal):
+        """Row positions allowed for a meal, shortlisted by macro fit when optimizing"""
+        if meal not in self._candidates:
+            max_calories = self.user_input['Calories'] * MEAL_CALORIE_SHARES[meal]
+            candidates = self.sampler.index.lookup(
+                meal, self.user_input['Diet'], self.user_input['Condition'], max_calories)
+            if self.selector is not None and len(candidates):
+                target = macro_targets(self.user_input, meal)
+                candidates = np.sort(candidates[self.selector.best_fits(
+                    candidates, target, self.selector.shortlist, self.items_per_meal)])
+            self._candidates[meal] = candidates
+        return self._candidates[meal]
+
+    def _meal_positions(self, plan, day_id, meal):
+        items = plan[day_id][meal]
+        if not isinstance(items, list):
+            return []
+        return [self.positions[item['Food']] for item in items if item['Food'] in self.positions]
+
+    def _ages(self, plan, day_ids, slot, meal):
+        # Days between the slot and the nearest use of each food by this meal
+        # within the variety window, on either side; window + 1 if unused
+        ages = np.full(len(self.sampler.names), self.window + 1)
+        for neighbour in range(max(slot - self.window, 0), min(slot + self.window + 1, len(day_ids))):
+            positions = self._meal_positions(plan, day_ids[neighbour], meal)
+            ages[positions] = np.minimum(ages[positions], abs(neighbour - slot))
+        return ages
+
+    def _pick(self, meal, ages, n, rng, keep=()):
+        candidates = self.candidates(meal)
+        # Foods staying in the meal are never drawn again
+        candidates = candidates[~np.isin(candidates, keep)]
+        if len(candidates) == 0:
+            return None
+        candidate_ages = ages[candidates]
+        available = candidates[candidate_ages > self.window]
+        if len(available) < n:
+            # Same fallback as the sampler: weighted towards the least
+            # recently used instead of ignoring the window
+            if self.selector is None:
+                return candidates[weighted_choice(rng, candidate_ages + 1, n)]
+            available = candidates[np.argsort(-candidate_ages, kind='stable')[:2 * n]]
+        n = min(n, len(available))
+        if self.selector is not None and n == self.items_per_meal:
+            target = macro_targets(self.user_input, meal)
+            return available[self.selector.select(available, target, max_items=n,
+                                                  deadline=time.perf_counter() + self.selector.time_budget)]
+        return rng.choice(available, n, replace=False)
+
+    def regenerate_slot(self, plan, day_id, meal, seed=None, rng=None):
+        """Replace every item of one meal"""
+        rng = rng if rng is not None else np.random.default_rng(seed)
+        day_ids = list(plan)
+        ages = self._ages(plan, day_ids, day_ids.index(day_id), meal)
+        chosen = self._pick(meal, ages, self.items_per_meal, rng)
+        plan[day_id][meal] = self.sampler.items(chosen) if chosen is not None else NO_MEAL_FOUND
+        return [day_id]
+
+    def swap_item(self, plan, day_id, meal, item_index, seed=None):
+        """Replace one item of a meal, keeping the others"""
+        items = plan[day_id][meal]
+        if not isinstance(items, list) or not 0 <= item_index < len(items):
+            raise IndexError(f"{day_id} {meal} has no item {item_index}")
+        day_ids = list(plan)
+        ages = self._ages(plan, day_ids, day_ids.index(day_id), meal)
+        keep = [self.positions[item['Food']] for i, item in enumerate(items)
+                if i != item_index and item['Food'] in self.positions]
+        # The optimizer fits whole meals, so a single item is drawn at random
+        chosen = self._pick(meal, ages, 1, np.random.default_rng(seed), keep)
+        if chosen is not None:
+            items[item_index] = self.sampler.items(chosen)[0]
+        return [day_id]
+
+    def similar_items(self, plan, day_id, meal, item_index, index, k=5):
+        """
+        Catalog rows of the k foods most like one item, nearest first
+
+        Substitutes pass the meal's filters and calorie ceiling and are
+        outside the variety window; ``index`` is a
+        substitutes.SubstitutionIndex for the sampler's catalog.
+        """
+        items = plan[day_id][meal]
+        if not isinstance(items, list) or not 0 <= item_index < len(items):
+            raise IndexError(f"{day_id} {meal} has no item {item_index}")
+        position = self.positions.get(items[item_index]['Food'])
+        if position is None:
+            return np.zeros(0, dtype=np.intp)
+        day_ids = list(plan)
+        ages = self._ages(plan, day_ids, day_ids.index(day_id), meal)
+        rows, _ = index.query(position, meal, self.user_input['Diet'], self.user_input['Condition'], k=k,
+                              max_calories=self.user_input['Calories'] * MEAL_CALORIE_SHARES[meal],
+                              exclude=np.flatnonzero(ages <= self.window))
+        return rows
+
+    def substitute_item(self, plan, day_id, meal, item_index, index, choice=0):
+        """Replace one item with its ``choice``-th most similar food"""
+        rows = self.similar_items(plan, day_id, meal, item_index, index, k=choice + 1)
+        if len(rows) > choice:
+            plan[day_id][meal][item_index] = self.sampler.items(rows[choice:choice + 1])[0]
+        return [day_id]
+
+    def regenerate_day(self, plan, day_id, seed=None, rng=None):
+        """Replace every meal of one day"""
+        rng = rng if rng is not None else np.random.default_rng(seed)
+        for meal in MEALS:
+            if meal in plan[day_id]:
+                self.regenerate_slot(plan, day_id, meal, rng=rng)
+        return [day_id]
+
+    def regenerate_week(self, plan, week, seed=None):
+        """Replace every day of one week, in order so each day sees the new previous days"""
+        rng = np.random.default_rng(seed)
+        changed = [day_id for day_id in plan if parse_day_id(day_id)[0] == week]
+        for day_id in changed:
+            self.regenerate_day(plan, day_id, rng=rng)
+        return changed
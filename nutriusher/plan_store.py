@@ -0,0 +1,360 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+from nutriusher import timing
+from nutriusher.lru import LRUCache
+
+PLANS_COLLECTION = 'meal_plans'
+
+# Fields shown in the saved plans list; plan_data is fetched on demand
+SUMMARY_FIELDS = ['created_at', 'user_metrics']
+
+
+class PlanRepository:
+    """
+    Access to the meal_plans collection.
+
+    Works with ``firestore.client()``, the Firestore emulator (set
+    FIRESTORE_EMULATOR_HOST) or nutriusher.memory_firestore.MemoryFirestore.
+    Listing by user ordered by created_at needs a composite index on
+    (user_id ASC, created_at DESC) in Firestore.
+    """
+
+    def __init__(self, db, server_timestamp=None):
+        self.db = db
+        if server_timestamp is None:
+            from firebase_admin import firestore
+            server_timestamp = firestore.SERVER_TIMESTAMP
+        self.server_timestamp = server_timestamp
+
+    def _plans(self):
+        return self.db.collection(PLANS_COLLECTION)
+
+    @timing.timed('firestore.list_summaries')
+    def list_summaries(self, user_id, page_size=10, cursor=None):
+        """
+        One page of a user's plans, newest first, without plan_data
+
+        Args:
+            cursor: Value returned with the previous page, or None
+
+        Returns:
+            tuple: (list of {'id', 'created_at', 'user_metrics'} dicts,
+                cursor for the next page or None on the last page)
+        """
+        query = self._plans()\
+            .where('user_id', '==', user_id)\
+            .order_by('created_at', direction='DESCENDING')\
+            .select(SUMMARY_FIELDS)\
+            .limit(page_size + 1)
+        if cursor is not None:
+            query = query.start_after(cursor)
+
+        snapshots = query.get()
+        page = snapshots[:page_size]
+        next_cursor = page[-1] if len(snapshots) > page_size else None
+        return [{'id': snapshot.id, **snapshot.to_dict()} for snapshot in page], next_cursor
+
+    @timing.timed('firestore.get_plan_data')
+    def get_plan_data(self, plan_id):
+        """plan_data of one stored plan, or None if it no longer exists"""
+        snapshot = self._plans().document(plan_id).get(field_paths=['plan_data'])
+        if not snapshot.exists:
+            return None
+        return snapshot.to_dict().get('plan_data')
+
+    def new_id(self):
+        """A fresh document ID, generated client side"""
+        return self._plans().document().id
+
+    def fields(self, user_id, plan_data, user_metrics):
+        """Fields of a plan document"""
+        return {
+            'user_id': user_id,
+            'created_at': self.server_timestamp,
+            'plan_data': plan_data,
+            'user_metrics': user_metrics
+        }
+
+    def new_document(self, user_id, plan_data, user_metrics):
+        """(document ID, fields) for a new plan, without writing it"""
+        return self.new_id(), self.fields(user_id, plan_data, user_metrics)
+
+    def save(self, user_id, plan_data, user_metrics):
+        """Store a new plan and return its document ID"""
+        plan_id, document = self.new_document(user_id, plan_data, user_metrics)
+        self.put(user_id, plan_id, document)
+        return plan_id
+
+    @timing.timed('firestore.put')
+    def put(self, user_id, plan_id, document):
+        """Write a plan under a known ID; writing it again is harmless"""
+        self._plans().document(plan_id).set(document)
+
+    @timing.timed('firestore.delete')
+    def delete(self, plan_id):
+        self._plans().document(plan_id).delete()
+
+    @timing.timed('firestore.commit')
+    def commit(self, operations):
+        """
+        Apply writes in one batch commit
+
+        Args:
+            operations (list): (plan_id, fields) pairs; fields None deletes
+        """
+        batch = self.db.batch()
+        for plan_id, document in operations:
+            plan_ref = self._plans().document(plan_id)
+            if document is None:
+                batch.delete(plan_ref)
+            else:
+                batch.set(plan_ref, document)
+        batch.commit()
+
+
+class CachedPlanRepository:
+    """
+    Read-through cache and write-behind batching in front of a PlanRepository.
+
+    Summary pages are cached per (user, page) and plan_data per plan, both
+    LRU with a TTL. save() and delete() are queued and coalesced per plan,
+    then written in batch commits once ``max_batch`` writes are pending or
+    ``flush_interval`` seconds after the first queued write; put() commits
+    at once, together with anything already queued. Any read that
+    has to go to Firestore flushes first, and every write invalidates the
+    owner's cached pages, so a user always reads their own writes. A
+    write that lands while a read is at Firestore bumps the owner's or
+    plan's generation, and the read then leaves its result uncached.
+    Commits run outside the lock that guards the cache and the queue, so
+    cached reads never wait for Firestore.
+    """
+
+    # Firestore's limit on writes per batch
+    MAX_COMMIT = 500
+
+    def __init__(self, repository, ttl=60.0, max_pages=2048, max_plans=512, max_batch=50,
+                 flush_interval=1.0, max_owners=16384):
+        self.repository = repository
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._summaries = LRUCache(max_entries=max_pages, ttl=ttl)
+        self._plan_data = LRUCache(max_entries=max_plans, ttl=ttl)
+        # Plan ID -> user, to invalidate only the owner's pages on a write;
+        # a forgotten owner invalidates every user's pages instead
+        self._owners = LRUCache(max_entries=max_owners)
+        self._pending = OrderedDict()
+        # ('owner', user) / ('plan', plan ID) -> writes since the reads in
+        # flight started; _epoch counts invalidations of every owner
+        self._generations = {}
+        self._epoch = 0
+        self._fills = 0
+        self._lock = threading.RLock()
+        # Held for a whole flush, so two flushes never commit the same writes
+        self._commit_lock = threading.Lock()
+        self._timer = None
+        self.backend_reads = 0
+        self.writes = 0
+        self.coalesced = 0
+        self.commits = 0
+        self.failed_flushes = 0
+
+    def list_summaries(self, user_id, page_size=10, cursor=None):
+        key = (user_id, page_size, getattr(cursor, 'id', cursor))
+        cached = self._summaries.get(key)
+        if cached is not None:
+            return cached
+
+        generation_keys = (('owner', user_id),)
+        start = self._start_fill(generation_keys)
+        try:
+            self.flush()
+            result = self.repository.list_summaries(user_id, page_size, cursor)
+        except BaseException:
+            with self._lock:
+                self._end_fill(generation_keys, start)
+            raise
+        self.backend_reads += 1
+        for summary in result[0]:
+            self._owners.put(summary['id'], user_id)
+        with self._lock:
+            if self._end_fill(generation_keys, start):
+                self._summaries.put(key, result)
+        return result
+
+    def get_plan_data(self, plan_id):
+        with self._lock:
+            if plan_id in self._pending:
+                document = self._pending[plan_id]
+                return document['plan_data'] if document is not None else None
+        cached = self._plan_data.get(plan_id)
+        if cached is not None:
+            return cached
+
+        generation_keys = (('plan', plan_id),)
+        start = self._start_fill(generation_keys)
+        try:
+            self.flush()
+            plan_data = self.repository.get_plan_data(plan_id)
+        except BaseException:
+            with self._lock:
+                self._end_fill(generation_keys, start)
+            raise
+        self.backend_reads += 1
+        with self._lock:
+            if self._end_fill(generation_keys, start) and plan_data is not None:
+                self._plan_data.put(plan_id, plan_data)
+        return plan_data
+
+    def save(self, user_id, plan_data, user_metrics):
+        plan_id, document = self.repository.new_document(user_id, plan_data, user_metrics)
+        self._owners.put(plan_id, user_id)
+        self._enqueue(plan_id, document)
+        return plan_id
+
+    def new_id(self):
+        return self.repository.new_id()
+
+    def fields(self, user_id, plan_data, user_metrics):
+        return self.repository.fields(user_id, plan_data, user_metrics)
+
+    def put(self, user_id, plan_id, document):
+        """
+        Write a plan now, with any other queued writes
+
+        Write-through, unlike save(): for callers that spool and retry
+        themselves, such as save_worker.PlanWriter, and need to know when the
+        plan is committed. Their writes are not batched with each other;
+        the write-behind batching applies to save() and delete(). If the
+        commit fails the plan is taken off the queue again and the error
+        raised.
+        """
+        self._owners.put(plan_id, user_id)
+        with self._lock:
+            self._queue(plan_id, document)
+        try:
+            self.flush()
+        except Exception:
+            with self._lock:
+                if self._pending.get(plan_id) is document:
+                    del self._pending[plan_id]
+            raise
+
+    def delete(self, plan_id):
+        self._enqueue(plan_id, None)
+
+    def _generation(self, keys):
+        # Called with self._lock held
+        return self._epoch, tuple(self._generations.get(key, 0) for key in keys)
+
+    def _start_fill(self, keys):
+        """Generations of ``keys`` before a backend read that may fill the cache"""
+        with self._lock:
+            self._fills += 1
+            return self._generation(keys)
+
+    def _end_fill(self, keys, start):
+        """
+        True if no write touched ``keys`` since _start_fill
+
+        Called with self._lock held, so the caller's cache put cannot
+        race an invalidation.
+        """
+        fresh = self._generation(keys) == start
+        self._fills -= 1
+        if not self._fills:
+            # No read is comparing against the counters any more
+            self._generations.clear()
+        return fresh
+
+    def _bump(self, key):
+        # Called with self._lock held; only reads in flight need the count
+        if self._fills:
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def _invalidate_owner(self, plan_id):
+        user_id = self._owners.get(plan_id)
+        if user_id is None:
+            self._epoch += 1
+            self._summaries.clear()
+        else:
+            self._bump(('owner', user_id))
+            self._summaries.discard_where(lambda key: key[0] == user_id)
+
+    def _queue(self, plan_id, document):
+        # Called with self._lock held
+        if plan_id in self._pending:
+            self.coalesced += 1
+        self._pending[plan_id] = document
+        self._pending.move_to_end(plan_id)
+        self.writes += 1
+        self._bump(('plan', plan_id))
+        self._plan_data.pop(plan_id)
+        self._invalidate_owner(plan_id)
+
+    def _enqueue(self, plan_id, document):
+        with self._lock:
+            self._queue(plan_id, document)
+            if len(self._pending) >= self.max_batch:
+                flush_now = True
+            else:
+                flush_now = False
+                if self._timer is None and self.flush_interval is not None:
+                    self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if flush_now:
+            self.flush()
+
+    def _timed_flush(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception:
+            # Left queued; retried by the next write or read
+            self.failed_flushes += 1
+
+    def flush(self):
+        """Commit every queued write"""
+        with self._commit_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            while True:
+                # Writes stay queued, and readable, until their commit succeeds
+                with self._lock:
+                    operations = list(itertools.islice(self._pending.items(), self.MAX_COMMIT))
+                if not operations:
+                    return
+                self.repository.commit(operations)
+                with self._lock:
+                    self.commits += 1
+                    for plan_id, document in operations:
+                        # A write queued for the plan during the commit stays
+                        if plan_id in self._pending and self._pending[plan_id] is document:
+                            del self._pending[plan_id]
+
+    def pending(self):
+        return len(self._pending)
+
+    def metrics(self):
+        """Cache hit rate and Firestore round trips avoided"""
+        summaries = self._summaries.stats()
+        plans = self._plan_data.stats()
+        hits = summaries['hits'] + plans['hits']
+        lookups = hits + summaries['misses'] + plans['misses']
+        return {
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'summary_cache': summaries,
+            'plan_cache': plans,
+            'backend_reads': self.backend_reads,
+            'writes': self.writes,
+            'coalesced_writes': self.coalesced,
+            'commits': self.commits,
+            'pending_writes': len(self._pending),
+            'failed_flushes': self.failed_flushes,
+            'round_trips_saved': hits + max(self.writes - self.commits, 0)
+        }
@@ -0,0 +1,278 @@
+"""
+Columnar, numeric form of a generated plan.
+
+A PlanTable holds one row per plan item in a structured NumPy array:
+
+    week, day   plan week and day numbers
+    slot        ordinal of the day within the plan
+    meal        index into ``meals``
+    item        position of the item within its meal
+    food        index into ``names`` (the catalog's Food_items when built
+                by the sampler)
+    Calories, Proteins, Carbs, Fats, Sugars, Sodium
+
+Meal, day, week and plan totals are single bincount passes over it, and
+food names and labels are only turned into strings by to_plan() and
+summary(), i.e. when the plan is displayed or stored.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.recfunctions import structured_to_unstructured
+
+from nutriusher.sampler import ITEM_COLUMNS, MEALS, NO_MEAL_FOUND
+
+KEY_FIELDS = [('week', 'u2'), ('day', 'u2'), ('slot', 'u2'), ('meal', 'u1'), ('item', 'u1'), ('food', 'i4')]
+PLAN_DTYPE = np.dtype(KEY_FIELDS + [(column, 'f8') for column in ITEM_COLUMNS])
+NUTRIENTS = list(ITEM_COLUMNS)
+
+# Rollup level -> key columns
+LEVELS = {
+    'meal': ['week', 'day', 'meal'],
+    'day': ['week', 'day'],
+    'week': ['week'],
+    'plan': []
+}
+
+
+def parse_day_id(day_id):
+    """(week, day) of a 'Week N Day M' key"""
+    try:
+        _, week, _, day = day_id.split()
+        return int(week), int(day)
+    except ValueError:
+        raise ValueError(f"Not a 'Week N Day M' key: {day_id!r}")
+
+
+def as_plan_table(plan):
+    """PlanTable for a PlanTable or a plan dict"""
+    return plan if isinstance(plan, PlanTable) else PlanTable.from_plan(plan)
+
+
+def group_sum(group, values, n_groups):
+    """(n_groups x columns) sums of the rows of ``values`` by group id"""
+    return np.column_stack(
+        [np.bincount(group, weights=values[:, i], minlength=n_groups) for i in range(values.shape[1])]
+    ) if values.shape[1] else np.zeros((n_groups, 0))
+
+
+class PlanTable:
+    def __init__(self, rows, names, days, meals=MEALS, placeholders=None):
+        """
+        Args:
+            rows (numpy.ndarray): PLAN_DTYPE rows ordered by slot, meal, item
+            names (numpy.ndarray): Food names the 'food' column indexes
+            days (list): (week, day) of every slot, in plan order
+            meals (list): Meal names the 'meal' column indexes
+            placeholders (dict): (slot, meal) -> text for meals without items
+        """
+        self.rows = rows
+        self.names = names
+        self.days = list(days)
+        self.meals = list(meals)
+        self.placeholders = placeholders or {}
+
+    @classmethod
+    def from_picks(cls, picks, names, nutrients, weeks=4, days_per_week=7):
+        """Table for PlanSampler.sample_positions output, without building item dicts"""
+        days = [(week, day) for week in range(1, weeks + 1) for day in range(1, days_per_week + 1)]
+        slots, meal_ids, foods, placeholders = [], [], [], {}
+        for meal_id, meal in enumerate(MEALS):
+            for slot, positions in enumerate(picks[meal]):
+                if positions is None:
+                    placeholders[(slot, meal_id)] = NO_MEAL_FOUND
+                    continue
+                slots.append(np.full(len(positions), slot))
+                meal_ids.append(np.full(len(positions), meal_id))
+                foods.append(positions)
+
+        rows = np.zeros(sum(len(f) for f in foods), dtype=PLAN_DTYPE)
+        if len(rows):
+            slot_column = np.concatenate(slots)
+            meal_column = np.concatenate(meal_ids)
+            food_column = np.concatenate(foods)
+            # Meals were appended meal by meal; put them in plan order
+            order = np.lexsort((meal_column, slot_column))
+            rows['slot'] = slot_column[order]
+            rows['meal'] = meal_column[order]
+            rows['food'] = food_column[order]
+            calendar = np.asarray(days, dtype='u2')
+            rows['week'] = calendar[rows['slot'], 0]
+            rows['day'] = calendar[rows['slot'], 1]
+            rows['item'] = cls._item_positions(rows['slot'], rows['meal'])
+            for column, values in zip(NUTRIENTS, nutrients[rows['food']].T):
+                rows[column] = values
+        return cls(rows, names, days, MEALS, placeholders)
+
+    @classmethod
+    def from_plan(cls, plan, names=None):
+        """
+        Table for a 'Week N Day M' -> meal -> item dicts plan
+
+        Args:
+            names (numpy.ndarray, optional): Catalog food names to index;
+                by default the plan's own names are used
+
+        Raises:
+            ValueError: If a key is not 'Week N Day M' or a food is not in
+                ``names``
+        """
+        vocabulary = {name: i for i, name in enumerate(names.tolist())} if names is not None else {}
+        meals = list(MEALS)
+        days, records, placeholders = [], [], {}
+        for slot, (day_id, day_meals) in enumerate(plan.items()):
+            week, day = parse_day_id(day_id)
+            days.append((week, day))
+            for meal, items in day_meals.items():
+                if meal not in meals:
+                    meals.append(meal)
+                meal_id = meals.index(meal)
+                if not isinstance(items, list):
+                    placeholders[(slot, meal_id)] = items
+                    continue
+                for position, item in enumerate(items):
+                    food = vocabulary.get(item['Food'])
+                    if food is None:
+                        if names is not None:
+                            raise ValueError(f"Food not in catalog: {item['Food']!r}")
+                        food = vocabulary[item['Food']] = len(vocabulary)
+                    records.append((week, day, slot, meal_id, position, food,
+                                    *[item[column] for column in NUTRIENTS]))
+
+        rows = np.array(records, dtype=PLAN_DTYPE)
+        if len(rows):
+            # Meals of a day may be listed in any order
+            rows = rows[np.lexsort((rows['item'], rows['meal'], rows['slot']))]
+        if names is None:
+            names = np.array(list(vocabulary), dtype=object)
+        return cls(rows, names, days, meals, placeholders)
+
+    @staticmethod
+    def _item_positions(slots, meals):
+        # 0, 1, 2 ... within each run of equal (slot, meal)
+        if not len(slots):
+            return np.zeros(0, dtype=int)
+        starts = np.r_[True, (slots[1:] != slots[:-1]) | (meals[1:] != meals[:-1])]
+        run_ids = np.cumsum(starts) - 1
+        return np.arange(len(slots)) - np.flatnonzero(starts)[run_ids]
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def nbytes(self):
+        """Memory held by the rows (names are shared with the catalog)"""
+        return self.rows.nbytes
+
+    def nutrients(self, columns=None):
+        """(items x nutrients) float matrix"""
+        return structured_to_unstructured(self.rows[columns or NUTRIENTS], dtype=float)
+
+    def _week_ids(self):
+        # Week position of every slot, weeks in plan order
+        weeks = list(dict.fromkeys(week for week, _ in self.days))
+        return weeks, np.asarray([weeks.index(week) for week, _ in self.days], dtype=np.intp)
+
+    def _rollups(self, columns):
+        # Items are summed into meals, meals into days, days into weeks and
+        # weeks into the plan: one bincount per nutrient and level
+        n_days, n_meals = len(self.days), len(self.meals)
+        calendar = np.asarray(self.days, dtype=int).reshape(-1, 2)
+
+        # Every (slot, meal) of the grid, empty ones included
+        group = self.rows['slot'].astype(np.intp) * n_meals + self.rows['meal']
+        meal_totals = group_sum(group, self.nutrients(columns), n_days * n_meals)
+        present = np.flatnonzero(np.bincount(group, minlength=n_days * n_meals))
+        slot_of, meal_of = np.divmod(present, n_meals)
+
+        day_totals = group_sum(np.repeat(np.arange(n_days), n_meals), meal_totals, n_days)
+        weeks, slot_weeks = self._week_ids()
+        week_totals = group_sum(slot_weeks, day_totals, len(weeks))
+        plan_totals = group_sum(np.zeros(len(weeks), dtype=np.intp), week_totals, 1)
+        return {
+            'meal': ({'week': calendar[slot_of, 0], 'day': calendar[slot_of, 1], 'meal': meal_of},
+                     meal_totals[present]),
+            'day': ({'week': calendar[:, 0], 'day': calendar[:, 1]}, day_totals),
+            'week': ({'week': np.asarray(weeks, dtype=int)}, week_totals),
+            'plan': ({}, plan_totals)
+        }
+
+    def rollup(self, level='day', columns=None):
+        """
+        Nutrient totals per meal, day, week or for the whole plan
+
+        Returns:
+            pandas.DataFrame: Integer key columns for the level plus one
+                float column per nutrient. Day and week levels include
+                days without items; the meal level only meals with items.
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Unknown rollup level {level!r}; expected one of {list(LEVELS)}")
+        columns = columns or NUTRIENTS
+        keys, totals = self._rollups(columns)[level]
+        return pd.DataFrame({**keys, **dict(zip(columns, totals.T))})
+
+    def totals(self):
+        """Whole-plan nutrient totals"""
+        return self.rollup('plan').iloc[0].to_dict()
+
+    def to_plan(self):
+        """The 'Week N Day M' -> meal -> item dicts form"""
+        plan = {f"Week {week} Day {day}": {} for week, day in self.days}
+        day_ids = list(plan)
+        names = self.names[self.rows['food']].tolist()
+        values = self.nutrients().tolist()
+        slots = self.rows['slot'].tolist()
+        meal_ids = self.rows['meal'].tolist()
+
+        items = {}
+        for slot, meal_id, name, row in zip(slots, meal_ids, names, values):
+            items.setdefault((slot, meal_id), []).append({'Food': name, **dict(zip(NUTRIENTS, row))})
+        for slot, day_id in enumerate(day_ids):
+            for meal_id, meal in enumerate(self.meals):
+                if (slot, meal_id) in items:
+                    plan[day_id][meal] = items[(slot, meal_id)]
+                elif (slot, meal_id) in self.placeholders:
+                    plan[day_id][meal] = self.placeholders[(slot, meal_id)]
+        return plan
+
+    def summary(self):
+        """
+        Display tables in the tables.plan_summary layout
+
+        Returns:
+            dict: 'meals' (Week, Day, Meal, Foods and totals per meal),
+                'days' (totals indexed by Week/Day) and 'weeks' (totals by Week)
+        """
+        from nutriusher.tables import SUMMARY_COLUMNS
+
+        rollups = self._rollups(list(SUMMARY_COLUMNS))
+        (meal_keys, meal_totals), (_, day_totals), (week_keys, week_totals) = (
+            rollups['meal'], rollups['day'], rollups['week'])
+
+        # Bullet list of foods per meal, in item order
+        names = self.names[self.rows['food']].tolist()
+        starts = np.flatnonzero(self.rows['item'] == 0).tolist()
+        foods = ["\n".join([f"• {name}" for name in names[start:end]])
+                 for start, end in zip(starts, starts[1:] + [len(names)])]
+
+        columns = list(SUMMARY_COLUMNS.values())
+        meals = pd.DataFrame({
+            'Week': [f"Week {week}" for week in meal_keys['week'].tolist()],
+            'Day': [f"Day {day}" for day in meal_keys['day'].tolist()],
+            'Meal': [self.meals[meal] for meal in meal_keys['meal'].tolist()],
+            'Foods': foods,
+            **dict(zip(columns, meal_totals.T))
+        })
+        # Levels and codes are already known; from_arrays would factorize the labels
+        weeks = week_keys['week'].tolist()
+        day_numbers = list(dict.fromkeys(day for _, day in self.days))
+        day_index = pd.MultiIndex(
+            levels=[[f"Week {week}" for week in weeks], [f"Day {day}" for day in day_numbers]],
+            codes=[self._week_ids()[1], [day_numbers.index(day) for _, day in self.days]],
+            names=['Week', 'Day'], verify_integrity=False)
+        week_index = pd.Index([f"Week {week}" for week in weeks], name='Week')
+        return {
+            'meals': meals,
+            'days': pd.DataFrame(day_totals, columns=columns, index=day_index),
+            'weeks': pd.DataFrame(week_totals, columns=columns, index=week_index)
+        }
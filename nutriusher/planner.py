@@ -0,0 +1,113 @@
+import numpy as np
+
+from nutriusher import timing
+from nutriusher.catalog import candidate_index, plan_sampler
+from nutriusher.optimizer import MACRO_COLUMNS, MacroSelector, macro_targets
+
+
+def calculate_bmr(weight, height, age, gender):
+    """Calculate Basal Metabolic Rate using Mifflin-St Jeor Equation"""
+    if gender == 'Male':
+        bmr = 10 * weight + 6.25 * height - 5 * age + 5
+    else:
+        bmr = 10 * weight + 6.25 * height - 5 * age - 161
+    return bmr
+
+def calculate_calories(bmr, activity_level):
+    """Calculate daily calorie needs based on activity level"""
+    activity_multipliers = {
+        'Sedentary': 1.2,
+        'Light Exercise': 1.375,
+        'Moderate Exercise': 1.55,
+        'Heavy Exercise': 1.725,
+        'Very Heavy Exercise': 1.9
+    }
+    return bmr * activity_multipliers.get(activity_level, 1.2)
+
+def build_user_requirements(weight, height, age, gender, activity_level, diet='All', conditions=(),
+                            calorie_model=None):
+    """
+    Daily calorie and macro requirements used to generate a plan
+
+    Calories come from the activity multiplier, or from a
+    calorie_model.CalorieModel if one is given.
+    """
+    bmr = calculate_bmr(weight, height, age, gender)
+    if calorie_model is not None:
+        daily_calories = calorie_model.predict_user(weight, height, age, gender, activity_level, bmr)
+    else:
+        daily_calories = calculate_calories(bmr, activity_level)
+
+    return {
+        'Calories': daily_calories,
+        'BMR': bmr,
+        'Proteins': int(daily_calories * 0.15 / 4),
+        'Carbs': int(daily_calories * 0.55 / 4),
+        'Fats': int(daily_calories * 0.30 / 9),
+        'Diet': diet,
+        'Condition': list(conditions)
+    }
+
+# Generate meal plan
+def generate_meal_plan(user_requirements, food_data):
+    daily_plan = {
+        'Breakfast': [],
+        'Lunch': [],
+        'Dinner': []
+    }
+
+    # Pick the 2-3 items per meal closest to the meal's share of the
+    # calorie, protein, carb and fat targets
+    selector = MacroSelector(food_data[MACRO_COLUMNS].to_numpy(dtype=float))
+    for meal in daily_plan:
+        meal_items = np.flatnonzero(food_data[meal].to_numpy() == 1)
+        target = macro_targets(user_requirements, meal)
+        selected_items = meal_items[selector.select(meal_items, target)]
+        daily_plan[meal] = food_data.iloc[selected_items]
+
+    return daily_plan
+
+@timing.timed('planner.generate_four_week_plan')
+def generate_four_week_plan(user_input, food_data, seed=None, optimize=False):
+    # Sampling runs on catalog row positions; seed=None keeps the
+    # per-day week*100 + day seeds so plans stay reproducible.
+    # optimize=True picks items by fit to the meal's macro targets
+    sampler = plan_sampler(food_data)
+    return sampler.generate(user_input, weeks=4, days_per_week=7, seed=seed, optimize=optimize)
+
+@timing.timed('planner.recommend_food')
+def recommend_food(user_input, food_data, meal, index=None):
+    # Meal timing, diet, health condition and meal calorie filters are
+    # served from the catalog's shared candidate index unless the caller
+    # passes one. A columnar_catalog.ColumnarCatalog scans its columns instead
+    if index is None:
+        index = candidate_index(food_data)
+    return index.recommend(user_input, meal)
+
+def recommend_weekly_meals(user_input, food_data):
+    meals = {'Breakfast': [], 'Lunch': [], 'Dinner': []}
+    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    weekly_plan = {}
+    index = candidate_index(food_data)
+
+    for day in days:
+        daily_meals = {}
+        for meal in meals:
+            recommendations = recommend_food(user_input, food_data, meal, index)
+            if not recommendations.empty:
+                # Select 2-3 items per meal
+                meal_items = recommendations.sample(n=min(3, len(recommendations)))
+                daily_meals[meal] = [{
+                    'Food': item['Food_items'],
+                    'Calories': item['Calories'],
+                    'Proteins': item['Proteins'],
+                    'Carbs': item['Carbohydrates'],
+                    'Fats': item['Fats'],
+                    'Sugars': item['Sugars'],
+                    'Sodium': item['Sodium']
+                } for _, item in meal_items.iterrows()]
+            else:
+                daily_meals[meal] = "No suitable options found"
+        weekly_plan[day] = daily_meals
+
+    return weekly_plan
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+def weighted_choice(rng, weights, n):
+    """n distinct indices, drawn with probability proportional to ``weights``"""
+    weights = np.asarray(weights, dtype=float)
+    n = min(n, len(weights))
+    return rng.choice(len(weights), n, replace=False, p=weights / weights.sum())
+
+
+class RecencyWindow:
+    """
+    The last ``history`` items picked for one meal, over item indices 0..n-1.
+
+    ``last_used`` holds the pick counter at which each item was last
+    chosen, so a push is O(1) per item and the in-window mask is one
+    vectorized comparison. When too few items are outside the window,
+    ``sample`` draws with probability proportional to how long ago each
+    item was used, instead of forgetting the history.
+    """
+
+    NEVER = -(2 ** 62)
+
+    def __init__(self, n_items, history=21):
+        self.history = history
+        self.last_used = np.full(n_items, self.NEVER, dtype=np.int64)
+        self.tick = 0
+
+    def push(self, items):
+        """Record picked item indices, oldest first"""
+        for item in np.atleast_1d(items).tolist():
+            self.last_used[item] = self.tick
+            self.tick += 1
+
+    def mask(self):
+        """True for items used within the last ``history`` picks"""
+        return self.last_used >= self.tick - self.history
+
+    def available(self):
+        """Indices of the items outside the window"""
+        return np.flatnonzero(~self.mask())
+
+    def ages(self):
+        """Picks since each item was last used, capped at history + 1"""
+        return np.minimum(self.tick - self.last_used, self.history + 1)
+
+    def sample(self, rng, n):
+        """
+        n distinct items, weighted towards the least recently used
+
+        Items outside the window all get the top weight (history + 1); the
+        one picked last gets weight 1. ``rng`` is a numpy Generator or
+        RandomState.
+        """
+        return weighted_choice(rng, self.ages(), n)
+
+    def least_recent(self, n):
+        """The n items used longest ago (never used first)"""
+        n = min(n, len(self.last_used))
+        oldest = np.argpartition(self.last_used, n - 1)[:n]
+        return oldest[np.argsort(self.last_used[oldest], kind='stable')]
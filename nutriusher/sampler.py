@@ -0,0 +1,204 @@
+import threading
+import time
+
+import numpy as np
+
+from nutriusher import timing
+from nutriusher.candidates import CandidateIndex, MEAL_CALORIE_SHARES
+from nutriusher.optimizer import MacroSelector, macro_targets
+from nutriusher.recency import RecencyWindow
+
+MEALS = ['Breakfast', 'Lunch', 'Dinner']
+
+# Plan item key -> catalog column
+ITEM_COLUMNS = {
+    'Calories': 'Calories',
+    'Proteins': 'Proteins',
+    'Carbs': 'Carbohydrates',
+    'Fats': 'Fats',
+    'Sugars': 'Sugars',
+    'Sodium': 'Sodium'
+}
+
+NO_MEAL_FOUND = 'No suitable meal found'
+
+
+def item_matrix(food_data):
+    """Food names and the nutrient matrix behind plan items, in ITEM_COLUMNS order"""
+    if hasattr(food_data, 'item_matrix'):
+        # columnar_catalog.ColumnarCatalog
+        return food_data.item_matrix()
+    names = food_data['Food_items'].to_numpy()
+    # Round away the noise of widening float32 catalog columns
+    nutrients = np.round(food_data[list(ITEM_COLUMNS.values())].to_numpy(dtype=float), 4)
+    return names, nutrients
+
+
+def make_items(names, nutrients, positions):
+    """Plan item dicts for catalog row positions"""
+    rows = nutrients[positions].tolist()
+    return [
+        {'Food': name, **dict(zip(ITEM_COLUMNS, row))}
+        for name, row in zip(names[positions].tolist(), rows)
+    ]
+
+
+class PlanSampler:
+    """
+    Draws four-week plans as integer row positions into a nutrient matrix.
+
+    All randomness for a plan comes from one numpy Generator; each slot
+    draws its items without replacement from the candidates not used
+    recently, so memory follows the candidate set. Recency is tracked
+    per meal by a RecencyWindow; when fewer than ``items_per_meal``
+    candidates are outside it, items are drawn weighted towards the least
+    recently used instead of restarting the history. Rows are turned into
+    item dicts only when the plan is assembled, or kept numeric with
+    generate_table.
+
+    With ``seed=None`` every day is drawn the way ``DataFrame.sample`` did
+    with ``random_state=week*100 + day``, so existing plans are reproduced
+    up to the first slot where the old code trimmed its used-meal set to
+    21 items (from then on its picks depended on set iteration order).
+    With ``optimize=True`` a MacroSelector picks each meal's items towards
+    its calorie and macro targets instead, within ``time_budget`` seconds
+    for the whole plan.
+    """
+
+    def __init__(self, food_data, index=None):
+        self.names, self.nutrients = item_matrix(food_data)
+        if index is None:
+            # A ColumnarCatalog filters by scanning its columns
+            index = food_data if hasattr(food_data, 'item_matrix') else CandidateIndex(food_data)
+        self.index = index
+        # Samplers are shared between sessions (catalog.plan_sampler), so
+        # the reseeded legacy RandomState is one per thread
+        self._local = threading.local()
+
+    def _legacy_state(self, seed):
+        state = getattr(self._local, 'legacy_state', None)
+        if state is None:
+            state = self._local.legacy_state = np.random.RandomState()
+        state.seed(seed)
+        return state
+
+    def _legacy_pick(self, seed, available, n):
+        # DataFrame.sample(n, random_state=seed) == RandomState(seed).permutation(len)[:n]
+        return available[self._legacy_state(seed).permutation(len(available))[:n]]
+
+    @timing.timed('sampler.sample_positions')
+    def sample_positions(self, user_input, weeks=4, days_per_week=7, items_per_meal=3,
+                         seed=None, history=21, optimize=False, time_budget=0.05):
+        """
+        Pick catalog row positions for every meal slot
+
+        Args:
+            user_input (dict): Requirements with 'Calories', 'Diet' and 'Condition'
+            seed (int, optional): Seed for a numpy Generator; None reproduces
+                the per-day ``week*100 + day`` pandas seeds
+            history (int): Number of recent picks per meal excluded from sampling
+            optimize (bool): Choose items by macro fit instead of at random
+            time_budget (float): Seconds the optimizer may spend on the plan
+
+        Returns:
+            dict: meal -> list of position arrays, one per day
+        """
+        n_days = weeks * days_per_week
+        rng = np.random.default_rng(seed) if seed is not None else None
+        picks = {}
+
+        selector = None
+        if optimize:
+            # First four nutrient columns are calories, proteins, carbs, fats
+            selector = MacroSelector(self.nutrients[:, :4], time_budget=time_budget)
+            deadline = time.perf_counter() + time_budget
+            slots_left = n_days * len(MEALS)
+
+        for meal in MEALS:
+            max_calories = user_input['Calories'] * MEAL_CALORIE_SHARES[meal]
+            candidates = self.index.lookup(meal, user_input['Diet'], user_input['Condition'], max_calories)
+            if len(candidates) == 0:
+                picks[meal] = [None] * n_days
+                if selector is not None:
+                    slots_left -= n_days
+                continue
+
+            if selector is not None:
+                # The targets are the same every day, so shortlist once,
+                # leaving room for the items excluded by the variety window
+                target = macro_targets(user_input, meal)
+                candidates = np.sort(candidates[selector.best_fits(
+                    candidates, target, selector.shortlist + history, items_per_meal)])
+
+            window = RecencyWindow(len(candidates), history)
+            meal_picks = []
+
+            for slot in range(n_days):
+                available = window.available()
+                n = min(items_per_meal, len(candidates))
+                exhausted = len(available) < items_per_meal
+
+                if selector is not None:
+                    # Even share of the remaining budget for this slot
+                    now = time.perf_counter()
+                    slot_deadline = now + max(deadline - now, 0) / slots_left
+                    slots_left -= 1
+                    if exhausted:
+                        # Fit among the least recently used instead
+                        available = window.least_recent(2 * items_per_meal)
+                    chosen = available[selector.select(
+                        candidates[available], target,
+                        max_items=items_per_meal, deadline=slot_deadline)]
+                elif rng is None:
+                    week, day = divmod(slot, days_per_week)
+                    seed = (week + 1) * 100 + day + 1
+                    if exhausted:
+                        chosen = window.sample(self._legacy_state(seed), n)
+                    else:
+                        chosen = self._legacy_pick(seed, available, n)
+                elif exhausted:
+                    chosen = window.sample(rng, n)
+                else:
+                    chosen = rng.choice(available, n, replace=False)
+
+                window.push(chosen)
+                meal_picks.append(candidates[chosen])
+            picks[meal] = meal_picks
+
+        return picks
+
+    def items(self, positions):
+        """Turn catalog row positions into plan item dicts"""
+        return make_items(self.names, self.nutrients, positions)
+
+    @timing.timed('sampler.to_plan')
+    def to_plan(self, picks, weeks=4, days_per_week=7):
+        """Assemble sampled positions into the 'Week N Day M' plan dict"""
+        full_plan = {}
+        for week in range(1, weeks + 1):
+            for day in range(1, days_per_week + 1):
+                slot = (week - 1) * days_per_week + day - 1
+                full_plan[f"Week {week} Day {day}"] = {
+                    meal: (self.items(picks[meal][slot]) if picks[meal][slot] is not None else NO_MEAL_FOUND)
+                    for meal in MEALS
+                }
+        return full_plan
+
+    def generate(self, user_input, weeks=4, days_per_week=7, seed=None, optimize=False,
+                 time_budget=0.05):
+        picks = self.sample_positions(user_input, weeks, days_per_week, seed=seed,
+                                      optimize=optimize, time_budget=time_budget)
+        return self.to_plan(picks, weeks, days_per_week)
+
+    @timing.timed('sampler.to_table')
+    def to_table(self, picks, weeks=4, days_per_week=7):
+        """Sampled positions as a numeric plan_table.PlanTable"""
+        from nutriusher.plan_table import PlanTable
+        return PlanTable.from_picks(picks, self.names, self.nutrients, weeks, days_per_week)
+
+    def generate_table(self, user_input, weeks=4, days_per_week=7, seed=None, optimize=False,
+                       time_budget=0.05):
+        """generate, as a PlanTable instead of item dicts"""
+        picks = self.sample_positions(user_input, weeks, days_per_week, seed=seed,
+                                      optimize=optimize, time_budget=time_budget)
+        return self.to_table(picks, weeks, days_per_week)
@@ -0,0 +1,325 @@
+"""
+Background plan saves with retries and a local spool.
+
+Saving a plan used to encode it, store the catalog snapshot and write the
+document inside the Streamlit script, so the user waited for Firestore
+and a transient failure lost the plan. Now a save is submitted to a
+SaveWorker: the job is written to a spool directory and queued, and
+submit returns the plan's document ID straight away. One worker thread
+writes queued jobs in order. A failed write is retried with exponential
+backoff and jitter, up to ``max_attempts``; jobs that still fail are
+moved to the spool's ``failed/`` directory and can be requeued with
+retry_failed. Jobs left in the spool by a stopped process are queued
+again when the next worker starts:
+
+    worker = SaveWorker(PlanWriter(repository, db), '.cache/save_spool')
+    plan_id = worker.submit({'id': repository.new_id(), ...})
+    worker.status(plan_id)['state']   # queued, saving, retrying, saved, failed
+"""
+import copy
+import heapq
+import itertools
+import logging
+import os
+import pickle
+import random
+import threading
+import time
+
+from nutriusher.lru import LRUCache
+
+logger = logging.getLogger('nutriusher.save_worker')
+
+# Spool directory; NUTRIUSHER_SAVE_SPOOL overrides it
+DEFAULT_SPOOL_DIR = '.cache/save_spool'
+
+
+def spool_dir():
+    return os.environ.get('NUTRIUSHER_SAVE_SPOOL', DEFAULT_SPOOL_DIR)
+
+
+class SaveQueueFull(RuntimeError):
+    """Raised by submit when ``max_pending`` saves are already waiting"""
+
+
+class PlanWriter:
+    """
+    Writes one plan save job: {'id', 'user_id', 'plan_data', 'user_metrics'}
+
+    Plans generated from the current catalog are stored in the compact
+    format, after the catalog snapshot their ids refer to; other plans
+    keep the nested format. Encoding happens here rather than at submit,
+    so it is off the request path too.
+    """
+
+    def __init__(self, repository, db, catalog_path='food.csv'):
+        self.repository = repository
+        self.db = db
+        self.catalog_path = catalog_path
+        # Catalog versions already stored in the 'catalogs' collection
+        self._saved_catalog_versions = set()
+
+    def save_catalog_snapshot(self, food_data):
+        """Store the catalog columns compact plans refer to, once per version"""
+        from nutriusher.catalog import catalog_version
+        from nutriusher.plan_codec import store_catalog_snapshot
+
+        version = catalog_version(food_data)
+        if version in self._saved_catalog_versions:
+            return
+        store_catalog_snapshot(self.db, food_data)
+        self._saved_catalog_versions.add(version)
+
+    def stored_plan(self, plan_data):
+        from nutriusher.catalog import load_food_catalog
+        from nutriusher.plan_codec import encode_plan
+
+        food_data = load_food_catalog(self.catalog_path)
+        try:
+            stored = encode_plan(plan_data, food_data)
+        except ValueError:
+            return plan_data
+        self.save_catalog_snapshot(food_data)
+        return stored
+
+    def __call__(self, job):
+        document = self.repository.fields(job['user_id'], self.stored_plan(job['plan_data']),
+                                          job['user_metrics'])
+        self.repository.put(job['user_id'], job['id'], document)
+
+
+class SaveWorker:
+    """
+    Bounded queue of save jobs written by one background thread.
+
+    ``write(job)`` performs one save and raises on failure; jobs are dicts
+    with a unique 'id'. With ``spool`` set, every queued job is also
+    pickled to ``<spool>/<id>.pkl`` until it is written.
+    """
+
+    def __init__(self, write, spool=None, max_pending=256, max_attempts=6, base_delay=0.5,
+                 max_delay=60.0, max_statuses=4096):
+        self.write = write
+        self.spool = spool
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._jobs = {}
+        self._ready = []
+        self._order = itertools.count()
+        self._finished = LRUCache(max_entries=max_statuses)
+        self._condition = threading.Condition()
+        self._stopping = False
+        self.submitted = 0
+        self.saved = 0
+        self.retries = 0
+        self.failures = 0
+        self.recovered = 0
+        self.last_error = None
+        if spool:
+            os.makedirs(os.path.join(spool, 'failed'), exist_ok=True)
+            self._recover()
+        self._thread = threading.Thread(target=self._run, name='nutriusher-save-worker', daemon=True)
+        self._thread.start()
+
+    def _spool_path(self, job_id, failed=False):
+        return os.path.join(self.spool, 'failed' if failed else '', f"{job_id}.pkl")
+
+    def _write_spool(self, job):
+        path = self._spool_path(job['id'])
+        try:
+            with open(f"{path}.tmp", 'wb') as f:
+                pickle.dump(job, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            try:
+                os.remove(f"{path}.tmp")
+            except FileNotFoundError:
+                pass
+            raise
+        os.replace(f"{path}.tmp", path)
+
+    def _recover(self):
+        """Queue the jobs a previous process left in the spool, oldest first"""
+        paths = [os.path.join(self.spool, name) for name in os.listdir(self.spool) if name.endswith('.pkl')]
+        for path in sorted(paths, key=os.path.getmtime):
+            try:
+                with open(path, 'rb') as f:
+                    job = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError) as e:
+                logger.warning("Skipping unreadable spooled save %s: %s", path, e)
+                continue
+            self._queue(job)
+            self.recovered += 1
+
+    def _queue(self, job, ready_at=0.0, attempts=0):
+        self._jobs[job['id']] = {'job': job, 'state': 'queued', 'attempts': attempts, 'error': None}
+        heapq.heappush(self._ready, (ready_at, next(self._order), job['id']))
+
+    def submit(self, job):
+        """
+        Queue a save and return its ID without waiting for the write
+
+        Raises:
+            SaveQueueFull: If ``max_pending`` saves are waiting
+            OSError: If the job cannot be written to the spool
+        """
+        # The plan as it is now: pages keep editing their plan dict in place
+        # (plan_edit.PlanEditor) while the job waits or retries
+        job = copy.deepcopy(job)
+        with self._condition:
+            if len(self._jobs) >= self.max_pending:
+                raise SaveQueueFull(f"{len(self._jobs)} saves are already waiting")
+            # Reserve the slot; the worker picks the job up once it is spooled
+            entry = self._jobs[job['id']] = {'job': job, 'state': 'queued', 'attempts': 0, 'error': None}
+        # Pickling a plan takes a moment; the worker keeps running meanwhile
+        if self.spool:
+            try:
+                self._write_spool(job)
+            except Exception:
+                with self._condition:
+                    if self._jobs.get(job['id']) is entry:
+                        del self._jobs[job['id']]
+                    self._condition.notify_all()
+                raise
+        with self._condition:
+            heapq.heappush(self._ready, (0.0, next(self._order), job['id']))
+            self.submitted += 1
+            self._condition.notify()
+        return job['id']
+
+    def retry_failed(self):
+        """Queue the jobs in the spool's failed/ directory again"""
+        requeued = 0
+        failed_dir = os.path.join(self.spool, 'failed')
+        for name in sorted(os.listdir(failed_dir)):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(failed_dir, name)
+            try:
+                with open(path, 'rb') as f:
+                    job = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError) as e:
+                logger.warning("Skipping unreadable failed save %s: %s", path, e)
+                continue
+            os.replace(path, self._spool_path(job['id']))
+            with self._condition:
+                # Its failed status is gone after a restart or an eviction
+                self._finished.pop(job['id'])
+                self._queue(job)
+                self._condition.notify()
+            requeued += 1
+        return requeued
+
+    def _next_job(self):
+        with self._condition:
+            while True:
+                if self._stopping:
+                    return None
+                if self._ready:
+                    wait = self._ready[0][0] - time.monotonic()
+                    if wait <= 0:
+                        _, _, job_id = heapq.heappop(self._ready)
+                        entry = self._jobs[job_id]
+                        entry['state'] = 'saving'
+                        return entry
+                    self._condition.wait(wait)
+                else:
+                    self._condition.wait()
+
+    def _backoff(self, attempts):
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return random.uniform(delay / 2, delay)
+
+    def _run(self):
+        while True:
+            entry = self._next_job()
+            if entry is None:
+                return
+            job = entry['job']
+            try:
+                self.write(job)
+            except Exception as e:
+                self._failed(entry, e)
+                continue
+            if self.spool:
+                try:
+                    os.remove(self._spool_path(job['id']))
+                except FileNotFoundError:
+                    pass
+            with self._condition:
+                del self._jobs[job['id']]
+                self._finished.put(job['id'], {'state': 'saved', 'attempts': entry['attempts'] + 1,
+                                               'error': None})
+                self.saved += 1
+                self._condition.notify_all()
+
+    def _failed(self, entry, error):
+        job = entry['job']
+        attempts = entry['attempts'] + 1
+        # Move the job to failed/ before drain() and status() can see it as failed
+        if attempts >= self.max_attempts and self.spool:
+            try:
+                os.replace(self._spool_path(job['id']), self._spool_path(job['id'], failed=True))
+            except FileNotFoundError:
+                pass
+        with self._condition:
+            self.last_error = f"{type(error).__name__}: {error}"
+            if attempts < self.max_attempts:
+                delay = self._backoff(attempts)
+                logger.warning("Save %s failed (attempt %d), retrying in %.1f s: %s",
+                               job['id'], attempts, delay, error)
+                self._queue(job, time.monotonic() + delay, attempts)
+                self._jobs[job['id']].update(state='retrying', error=str(error))
+                self.retries += 1
+                return
+            logger.error("Save %s failed after %d attempts: %s", job['id'], attempts, error)
+            del self._jobs[job['id']]
+            self._finished.put(job['id'], {'state': 'failed', 'attempts': attempts, 'error': str(error)})
+            self.failures += 1
+            self._condition.notify_all()
+
+    def status(self, job_id):
+        """{'state', 'attempts', 'error'} of a job, or None if unknown"""
+        with self._condition:
+            entry = self._jobs.get(job_id)
+            if entry is not None:
+                return {key: entry[key] for key in ('state', 'attempts', 'error')}
+        return self._finished.get(job_id)
+
+    def depth(self):
+        """Saves queued, retrying or being written"""
+        return len(self._jobs)
+
+    def drain(self, timeout=None):
+        """Wait until no save is queued; True if the queue emptied in time"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._jobs:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def stop(self, timeout=None):
+        """Stop the worker thread; jobs still queued stay in the spool"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def metrics(self):
+        """Queue depth and save/retry/failure counters"""
+        with self._condition:
+            states = [entry['state'] for entry in self._jobs.values()]
+        return {
+            'queue_depth': len(states),
+            'retrying': states.count('retrying'),
+            'submitted': self.submitted,
+            'saved': self.saved,
+            'retries': self.retries,
+            'failures': self.failures,
+            'recovered': self.recovered,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,289 @@
+"""
+Login sessions backed by Firebase ID tokens.
+
+A login exchanges the email and password for an ID token through the
+Identity Toolkit REST API (the same call the Firebase web SDK makes),
+then verifies the token locally: RS256 signature against Google's
+published signing keys, audience, issuer and expiry. The keys are cached
+for as long as Google's Cache-Control allows and refreshed by a background
+timer before they expire, so verification normally makes no network call.
+The resulting session records the token's expiry, and pages only check
+that timestamp. PyJWT and cryptography are imported on the first login so
+pages that only check a session do not pay for them.
+"""
+import json
+import logging
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+
+GOOGLE_KEYS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+SIGN_IN_URL = 'https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={api_key}'
+
+# Identity Toolkit error codes -> messages shown on the login page
+SIGN_IN_ERRORS = {
+    'EMAIL_NOT_FOUND': 'User not found. Please check your email or sign up.',
+    'INVALID_PASSWORD': 'Incorrect email or password.',
+    'INVALID_LOGIN_CREDENTIALS': 'Incorrect email or password.',
+    'USER_DISABLED': 'This account has been disabled.',
+    'TOO_MANY_ATTEMPTS_TRY_LATER': 'Too many attempts. Please try again later.'
+}
+
+logger = logging.getLogger(__name__)
+
+
+class SessionError(ValueError):
+    """Login failed or the ID token is not valid"""
+
+
+def _max_age(cache_control, default=3600):
+    match = re.search(r'max-age=(\d+)', cache_control or '')
+    return int(match.group(1)) if match else default
+
+
+def fetch_google_keys(url=GOOGLE_KEYS_URL, timeout=10):
+    """
+    Google's current token signing keys
+
+    Returns:
+        tuple: ({key ID: public key}, seconds the keys may be cached)
+    """
+    from cryptography.x509 import load_pem_x509_certificate
+
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        certificates = json.load(response)
+        max_age = _max_age(response.headers.get('Cache-Control'))
+    keys = {
+        kid: load_pem_x509_certificate(pem.encode()).public_key()
+        for kid, pem in certificates.items()
+    }
+    return keys, max_age
+
+
+class SigningKeyCache:
+    """
+    Signing keys cached until their max-age, refreshed in the background.
+
+    A timer refetches the keys ``refresh_ahead`` seconds before they expire.
+    If that fails the old keys stay in use and the refresh is retried every
+    ``min_refetch`` seconds; a lookup only fetches synchronously when the
+    keys have expired or the key ID is unknown (Google rotated its keys).
+    """
+
+    def __init__(self, fetch=fetch_google_keys, refresh_ahead=300, min_refetch=30, clock=time.time):
+        self.fetch = fetch
+        self.refresh_ahead = refresh_ahead
+        self.min_refetch = min_refetch
+        self._clock = clock
+        self._keys = {}
+        self._expires = 0.0
+        self._fetched = None
+        self._lock = threading.Lock()
+        self._timer = None
+        self.fetches = 0
+        self.failed_refreshes = 0
+
+    def get(self, kid):
+        """Public key for a key ID, or None if Google does not publish it"""
+        now = self._clock()
+        with self._lock:
+            key = self._keys.get(kid)
+            fresh = now < self._expires
+            may_refetch = self._fetched is None or now - self._fetched >= self.min_refetch
+        if key is not None and fresh:
+            return key
+        if key is None and not may_refetch:
+            return None
+        self.refresh()
+        with self._lock:
+            return self._keys.get(kid)
+
+    def refresh(self):
+        keys, max_age = self.fetch()
+        now = self._clock()
+        with self._lock:
+            self._keys = keys
+            self._expires = now + max_age
+            self._fetched = now
+            self.fetches += 1
+        self._schedule(max(max_age - self.refresh_ahead, self.min_refetch))
+
+    def _schedule(self, delay):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._background_refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            # Keep the current keys until they expire and try again later
+            self.failed_refreshes += 1
+            logger.warning("Signing key refresh failed", exc_info=True)
+            self._schedule(self.min_refetch)
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+class TokenVerifier:
+    """Checks Firebase ID tokens for one project without calling Firebase"""
+
+    def __init__(self, project_id, keys, leeway=60):
+        self.project_id = project_id
+        self.keys = keys
+        self.leeway = leeway
+
+    def verify(self, id_token):
+        """
+        Verify an ID token and return its claims
+
+        Raises:
+            SessionError: If the token is malformed, signed with an unknown
+                key, expired or issued for another project
+        """
+        import jwt
+
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except jwt.InvalidTokenError as e:
+            raise SessionError(f"Malformed ID token: {e}") from e
+        if header.get('alg') != 'RS256':
+            raise SessionError(f"Unexpected ID token algorithm {header.get('alg')!r}")
+
+        key = self.keys.get(header.get('kid'))
+        if key is None:
+            raise SessionError("ID token signed with an unknown key")
+
+        try:
+            claims = jwt.decode(
+                id_token,
+                key,
+                algorithms=['RS256'],
+                audience=self.project_id,
+                issuer=f'https://securetoken.google.com/{self.project_id}',
+                leeway=self.leeway,
+                options={'require': ['exp', 'iat', 'aud', 'iss', 'sub']}
+            )
+        except jwt.InvalidTokenError as e:
+            raise SessionError(f"Invalid ID token: {e}") from e
+
+        if not claims['sub']:
+            raise SessionError("ID token has an empty subject")
+        if claims.get('auth_time', 0) > time.time() + self.leeway:
+            raise SessionError("ID token auth_time is in the future")
+        return claims
+
+
+def sign_in_with_password(api_key, email, password, timeout=10):
+    """
+    Exchange an email and password for a Firebase ID token
+
+    Raises:
+        SessionError: With a message for the login page if Firebase
+            rejects the credentials
+    """
+    request = urllib.request.Request(
+        SIGN_IN_URL.format(api_key=api_key),
+        data=json.dumps({'email': email, 'password': password, 'returnSecureToken': True}).encode(),
+        headers={'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)['idToken']
+    except urllib.error.HTTPError as e:
+        try:
+            code = json.load(e)['error']['message']
+        except (ValueError, KeyError):
+            code = str(e)
+        # Codes may carry a detail suffix, e.g. "TOO_MANY_ATTEMPTS_TRY_LATER : ..."
+        code = code.split(' ')[0]
+        raise SessionError(SIGN_IN_ERRORS.get(code, f"Login failed: {code}")) from e
+
+
+def session_from_claims(claims):
+    """Session stored in st.session_state.user"""
+    return {
+        'uid': claims.get('user_id', claims['sub']),
+        'email': claims.get('email'),
+        'display_name': claims.get('name'),
+        'expires_at': claims['exp']
+    }
+
+
+def session_active(user, clock=time.time):
+    """True if the session exists and has not expired"""
+    return bool(user) and user.get('expires_at', 0) > clock()
+
+
+def active_user(session_state, clock=time.time):
+    """The logged-in user, or None; an expired session is logged out"""
+    user = session_state.get('user')
+    if user is not None and not session_active(user, clock):
+        session_state.pop('user', None)
+        return None
+    return user
+
+
+class SessionManager:
+    """
+    Logs users in and records how long each login takes.
+
+    ``sign_in(email, password)`` returns an ID token; in the app it is
+    sign_in_with_password bound to the web API key, and in benchmarks and
+    load tests nutriusher.local_auth.LocalKeyPair.sign_in.
+    """
+
+    def __init__(self, verifier, sign_in, history=1000):
+        self.verifier = verifier
+        self.sign_in = sign_in
+        self.latencies = deque(maxlen=history)
+        self.failures = 0
+
+    def login(self, email, password):
+        """
+        Sign in and verify the token
+
+        Returns:
+            dict: Session for st.session_state.user
+        """
+        start = time.perf_counter()
+        try:
+            id_token = self.sign_in(email, password)
+            signed_in = time.perf_counter()
+            session = session_from_claims(self.verifier.verify(id_token))
+        except SessionError:
+            self.failures += 1
+            raise
+        end = time.perf_counter()
+
+        self.latencies.append((end - start, end - signed_in))
+        logger.info("login uid=%s total_ms=%.1f verify_ms=%.2f",
+                    session['uid'], (end - start) * 1000, (end - signed_in) * 1000)
+        return session
+
+    def latency_stats(self):
+        """p50/p95/max login and token verification time in milliseconds"""
+        import numpy as np
+
+        if not self.latencies:
+            return {'logins': 0, 'failures': self.failures}
+        total, verify = np.array(self.latencies).T * 1000
+        return {
+            'logins': len(total),
+            'failures': self.failures,
+            'p50_ms': float(np.percentile(total, 50)),
+            'p95_ms': float(np.percentile(total, 95)),
+            'max_ms': float(total.max()),
+            'verify_p50_ms': float(np.percentile(verify, 50)),
+            'verify_p95_ms': float(np.percentile(verify, 95))
+        }
@@ -0,0 +1,113 @@
+"""
+Nearest-neighbour food substitutions over the catalog's nutrient columns.
+
+Every nutrient is log-scaled (log1p, the columns are heavily skewed) and
+standardized over the whole catalog, so no single column such as Sodium
+dominates the distance. Foods allowed for one (meal, diet, conditions)
+combination, the same filters recommend_food applies, get their own
+KD-tree, built on first use; a query is then a tree search, with the
+meal's calorie ceiling and excluded foods filtered from the nearest
+answers.
+
+An index belongs to one loaded catalog; callers keep one per
+catalog_version so it is rebuilt when the catalog changes.
+"""
+import threading
+
+import numpy as np
+
+from nutriusher.candidates import CONDITION_LIMITS, condition_key, diet_flag
+from nutriusher.catalog import NUTRIENT_COLUMNS, catalog_version
+
+
+def catalog_column(food_data, name):
+    """One column of a DataFrame or a columnar_catalog.ColumnarCatalog as an array"""
+    if hasattr(food_data, 'item_matrix'):
+        return np.asarray(food_data.column(name))
+    return food_data[name].to_numpy()
+
+
+def nutrient_features(food_data, columns=NUTRIENT_COLUMNS):
+    """(foods x nutrients) matrix of standardized log1p nutrient values"""
+    values = np.log1p(np.column_stack([
+        np.clip(catalog_column(food_data, column).astype(np.float64), 0, None) for column in columns
+    ]))
+    scale = values.std(axis=0)
+    scale[scale == 0] = 1.0
+    return (values - values.mean(axis=0)) / scale
+
+
+class SubstitutionIndex:
+    def __init__(self, food_data, columns=NUTRIENT_COLUMNS, leafsize=16):
+        self.version = catalog_version(food_data)
+        self.food_data = food_data
+        self.features = nutrient_features(food_data, columns)
+        self.calories = catalog_column(food_data, 'Calories').astype(np.float64)
+        self.leafsize = leafsize
+        self._trees = {}
+        self._lock = threading.Lock()
+
+    def _mask(self, meal, flag, conditions):
+        mask = catalog_column(self.food_data, meal) == 1
+        if flag is not None:
+            mask &= catalog_column(self.food_data, 'Diet') == flag
+        for condition in sorted(conditions):
+            column, limit = CONDITION_LIMITS[condition]
+            mask &= catalog_column(self.food_data, column) < limit
+        return mask
+
+    def tree(self, meal, diet='All', conditions=()):
+        """(catalog positions, KD-tree over their features) for one filter combination"""
+        key = (meal, diet_flag(diet), condition_key(conditions))
+        entry = self._trees.get(key)
+        if entry is None:
+            from scipy.spatial import cKDTree
+
+            with self._lock:
+                entry = self._trees.get(key)
+                if entry is None:
+                    positions = np.flatnonzero(self._mask(*key))
+                    entry = (positions, cKDTree(self.features[positions], leafsize=self.leafsize))
+                    self._trees[key] = entry
+        return entry
+
+    def prebuild(self, meals, diets=('All',), conditions=((),)):
+        """Build the trees for these combinations up front"""
+        for meal in meals:
+            for diet in diets:
+                for condition_set in conditions:
+                    self.tree(meal, diet, condition_set)
+
+    def query(self, position, meal, diet='All', conditions=(), k=5, max_calories=None, exclude=()):
+        """
+        The k foods most similar to the food at ``position``
+
+        Args:
+            position (int): Catalog row of the food to replace
+            meal, diet, conditions: Filters the substitutes must pass
+            max_calories (float, optional): Calorie ceiling, as in recommend_food
+            exclude (iterable): Catalog rows not to suggest
+
+        Returns:
+            tuple: (catalog positions, distances), nearest first; fewer than
+                k if not enough foods pass the filters
+        """
+        positions, tree = self.tree(meal, diet, conditions)
+        if len(positions) == 0:
+            return np.zeros(0, dtype=np.intp), np.zeros(0)
+        excluded = set(np.atleast_1d(exclude).tolist()) | {int(position)}
+        query_k = k + len(excluded)
+        while True:
+            distances, found = tree.query(self.features[position], min(query_k, len(positions)))
+            distances, found = np.atleast_1d(distances), np.atleast_1d(found)
+            keep = found < len(positions)
+            rows = positions[found[keep]]
+            distances = distances[keep]
+            # Few rows and few exclusions: a set lookup beats np.isin here
+            allowed = np.fromiter((row not in excluded for row in rows.tolist()), dtype=bool, count=len(rows))
+            if max_calories is not None:
+                allowed &= self.calories[rows] <= max_calories
+            # Widen the search until k pass, or the whole tree was searched
+            if allowed.sum() >= k or query_k >= len(positions):
+                return rows[allowed][:k], distances[allowed][:k]
+            query_k *= 4
@@ -0,0 +1,125 @@
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from nutriusher.plan_table import NUTRIENTS, as_plan_table, parse_day_id
+
+# Plan item keys -> display column names of the plan tables
+SUMMARY_COLUMNS = {
+    'Calories': 'Calories',
+    'Proteins': 'Proteins (g)',
+    'Carbs': 'Carbs (g)',
+    'Fats': 'Fats (g)'
+}
+
+
+# Display format of each total in create_meal_plan_table
+TABLE_FORMATS = {'Calories': "{:.0f}", 'Proteins (g)': "{:.1f}", 'Carbs (g)': "{:.1f}", 'Fats (g)': "{:.1f}"}
+
+
+def create_plan_dataframe(meal_plan):
+    """One row per plan item; ``meal_plan`` is a plan dict or a PlanTable"""
+    table = as_plan_table(meal_plan)
+    if not len(table):
+        return pd.DataFrame([])
+    rows = table.rows
+    day_ids = np.array([f"Week {week} Day {day}" for week, day in table.days], dtype=object)
+    return pd.DataFrame({
+        'Day': day_ids[rows['slot']],
+        'Meal': np.array(table.meals, dtype=object)[rows['meal']],
+        'Food': table.names[rows['food']],
+        **{column: rows[column] for column in NUTRIENTS}
+    })
+
+def calculate_nutrition(meal_plan):
+    total_nutrition = {
+        'Calories': 0,
+        'Proteins': 0,
+        'Carbs': 0,
+        'Fats': 0
+    }
+    
+    for meal, items in meal_plan.items():
+        totals = items[['Calories', 'Proteins', 'Carbohydrates', 'Fats']].to_numpy(dtype=float).sum(axis=0)
+        total_nutrition['Calories'] += totals[0]
+        total_nutrition['Proteins'] += totals[1]
+        total_nutrition['Carbs'] += totals[2]
+        total_nutrition['Fats'] += totals[3]
+    
+    return total_nutrition
+
+def create_meal_plan_table(four_week_plan):
+    # Totals stay numeric in plan_summary; they are only formatted here
+    meals = plan_summary(four_week_plan)['meals']
+    if meals.empty:
+        return pd.DataFrame([])
+    return meals.assign(**{
+        column: [fmt.format(value) for value in meals[column].tolist()]
+        for column, fmt in TABLE_FORMATS.items()
+    })
+
+def plan_hash(four_week_plan):
+    """Stable key for a plan's contents, for caching what is rendered from it"""
+    encoded = json.dumps(four_week_plan, sort_keys=True, default=float, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+def plan_summary(four_week_plan):
+    """
+    Meal, day and week totals of a plan, computed in one pass
+
+    Same rows as create_meal_plan_table, but with numeric totals.
+    ``four_week_plan`` is a plan dict or a plan_table.PlanTable.
+
+    Returns:
+        dict: 'meals' (Week, Day, Meal, Foods and totals per meal),
+            'days' (totals indexed by Week/Day) and 'weeks' (totals by Week)
+    """
+    return as_plan_table(four_week_plan).summary()
+
+def refresh_summary(summary, four_week_plan, day_ids):
+    """
+    plan_summary after the given days of the plan changed
+
+    Only the meal rows of those days are recomputed; their day totals are
+    replaced and week totals adjusted by the difference. Falls back to a
+    full plan_summary if a day gained or lost a meal.
+    """
+    columns = list(SUMMARY_COLUMNS.values())
+    meals = summary['meals']
+    labels = list(zip(meals['Week'].to_numpy(), meals['Day'].to_numpy(), meals['Meal'].to_numpy()))
+    foods = meals['Foods'].tolist()
+    meal_totals = np.column_stack([meals[column].to_numpy(dtype=float) for column in columns])
+    day_totals = summary['days'].to_numpy(dtype=float, copy=True)
+    week_totals = summary['weeks'].to_numpy(dtype=float, copy=True)
+
+    meal_rows = {label: row for row, label in enumerate(labels)}
+    day_rows = {label: row for row, label in enumerate(summary['days'].index)}
+    week_rows = {label: row for row, label in enumerate(summary['weeks'].index)}
+
+    for day_id in day_ids:
+        week_num, day_num = parse_day_id(day_id)
+        week, day = f"Week {week_num}", f"Day {day_num}"
+        rows = []
+        for meal_type, items in four_week_plan[day_id].items():
+            if isinstance(items, list):
+                row = meal_rows.get((week, day, meal_type))
+                if row is None:
+                    return plan_summary(four_week_plan)
+                foods[row] = "\n".join([f"• {item['Food']}" for item in items])
+                meal_totals[row] = [sum(item[key] for item in items) for key in SUMMARY_COLUMNS]
+                rows.append(row)
+        if len(rows) != sum(1 for label in labels if label[:2] == (week, day)):
+            return plan_summary(four_week_plan)
+
+        new_total = meal_totals[rows].sum(axis=0)
+        week_totals[week_rows[week]] += new_total - day_totals[day_rows[(week, day)]]
+        day_totals[day_rows[(week, day)]] = new_total
+
+    return {
+        # Week/Day/Meal columns are reused as they are
+        'meals': meals.assign(Foods=foods, **dict(zip(columns, meal_totals.T))),
+        'days': pd.DataFrame(day_totals, columns=columns, index=summary['days'].index),
+        'weeks': pd.DataFrame(week_totals, columns=columns, index=summary['weeks'].index)
+    }
@@ -0,0 +1,259 @@
+"""
+Per-stage timing spans, latency histograms and optional cProfile capture.
+
+A page run is wrapped in ``request``; stages inside it are timed with
+``span`` or the ``timed`` decorator:
+
+    with timing.request('generate_plan', uid=uid) as trace:
+        with timing.span('load_data'):
+            food_data = load_data()
+
+    @timing.timed('recommend_food')
+    def recommend_food(...):
+
+Each finished span is added to the process-wide histogram of its name
+(p50/p95/p99 from ``percentiles``) and to the request's trace; when the
+request ends one JSON line with the per-stage breakdown is logged to the
+``nutriusher.timing`` logger. Requests are traced when NUTRIUSHER_TIMING=1
+or when the caller passes ``force=True`` (the pages' debug panel).
+
+Outside a traced request a span is a context variable lookup returning a
+shared no-op context manager, so the hooks cost well under a microsecond
+when timing is off. The trace lives in a context variable, so concurrent
+script runs on different threads never see each other's spans.
+"""
+import contextlib
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import logging
+import math
+import os
+import pstats
+import threading
+import time
+
+logger = logging.getLogger('nutriusher.timing')
+
+# Trace every request, not only those the debug panel asks for
+enabled = os.environ.get('NUTRIUSHER_TIMING') == '1'
+
+# Functions listed in a request's cProfile capture
+PROFILE_LINES = 30
+
+_current = contextvars.ContextVar('nutriusher_trace', default=None)
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram with bounded memory
+
+    Bucket edges grow by ``2 ** (1 / 8)`` (about 9%) from one microsecond,
+    so percentiles are within that resolution whatever the sample count.
+    """
+
+    GROWTH = 2 ** (1 / 8)
+    MIN_SECONDS = 1e-6
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        bucket = max(0, int(math.log(max(seconds, self.MIN_SECONDS) / self.MIN_SECONDS, self.GROWTH)))
+        with self._lock:
+            self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def percentiles(self, quantiles=(0.5, 0.95, 0.99)):
+        """Seconds at each quantile, from the bucket midpoints"""
+        with self._lock:
+            buckets = sorted(self._buckets.items())
+            count = self.count
+        results = []
+        for quantile in quantiles:
+            if not count:
+                results.append(0.0)
+                continue
+            rank = quantile * count
+            seen = 0
+            for bucket, bucket_count in buckets:
+                seen += bucket_count
+                if seen >= rank:
+                    break
+            results.append(min(self.MIN_SECONDS * self.GROWTH ** (bucket + 0.5), self.max))
+        return results
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def histogram(name):
+    """Process-wide histogram of one stage"""
+    result = _histograms.get(name)
+    if result is None:
+        with _histograms_lock:
+            result = _histograms.setdefault(name, LatencyHistogram())
+    return result
+
+
+def histogram_rows():
+    """One dict per stage: count, p50/p95/p99, mean and max in milliseconds"""
+    # Other sessions may add histograms meanwhile
+    with _histograms_lock:
+        histograms = sorted(_histograms.items())
+    rows = []
+    for name, stats in histograms:
+        p50, p95, p99 = stats.percentiles()
+        rows.append({
+            'stage': name,
+            'count': stats.count,
+            'p50_ms': round(p50 * 1000, 3),
+            'p95_ms': round(p95 * 1000, 3),
+            'p99_ms': round(p99 * 1000, 3),
+            'mean_ms': round(stats.total / stats.count * 1000, 3) if stats.count else 0.0,
+            'max_ms': round(stats.max * 1000, 3)
+        })
+    return rows
+
+
+def reset():
+    """Forget every histogram"""
+    with _histograms_lock:
+        _histograms.clear()
+
+
+class Trace:
+    """Spans of one request, in the order they finished"""
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.spans = []
+        self.depth = 0
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.profile = None
+
+    def stages(self):
+        """Stage -> (calls, total milliseconds), in first-finished order"""
+        stages = {}
+        for name, _, seconds in self.spans:
+            calls, total = stages.get(name, (0, 0.0))
+            stages[name] = (calls + 1, total + seconds * 1000)
+        return stages
+
+    def to_dict(self):
+        return {
+            'request': self.name,
+            **self.fields,
+            'total_ms': round((self.seconds or 0.0) * 1000, 3),
+            'stages': {name: {'calls': calls, 'ms': round(ms, 3)} for name, (calls, ms) in self.stages().items()}
+        }
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.trace.depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        self.trace.depth -= 1
+        self.trace.spans.append((self.name, self.trace.depth, seconds))
+        histogram(self.name).record(seconds)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name):
+    """Time a block as stage ``name`` of the current request, if it is traced"""
+    trace = _current.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name)
+
+
+def timed(name):
+    """Decorator timing every call of a function as stage ``name``"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            with _Span(trace, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def request(name, force=False, profile=False, **fields):
+    """
+    Trace one request (one page run) and log its breakdown when it ends
+
+    Args:
+        name (str): Request name, e.g. the page
+        force (bool): Trace even if NUTRIUSHER_TIMING is off
+        profile (bool): Also run cProfile; the top functions by cumulative
+            time are kept as text in ``trace.profile``
+        **fields: Extra fields for the JSON log line
+
+    Yields:
+        Trace: The request's trace, or None when it is not traced
+    """
+    if not (enabled or force or profile):
+        yield None
+        return
+
+    trace = Trace(name, fields)
+    token = _current.set(trace)
+    profiler = None
+    if profile:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            profiler = None
+    trace.start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.seconds = time.perf_counter() - trace.start
+        if profiler is not None:
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+            trace.profile = out.getvalue()
+        _current.reset(token)
+        histogram(f"request.{name}").record(trace.seconds)
+        logger.info(json.dumps(trace.to_dict(), default=str))
@@ -0,0 +1,299 @@
+"""
+Train the calorie models of Shiva_raj.ipynb as a reproducible pipeline.
+
+    python -m nutriusher.training user_nutritional_data.csv --workers 4 --promote
+
+Stages:
+
+1. Preprocessing, as in the notebook: drop missing rows, IQR outlier
+   filter on the continuous columns (IQR_COLUMNS), split stratified by Gender with a fixed seed, StandardScaler
+   fitted on the training rows. The result is cached under --cache-dir,
+   keyed by a fingerprint of the input file and the preprocessing
+   settings, so unchanged data is never preprocessed twice.
+2. Hyperparameter search over SEARCH_SPACE in a process pool. Each
+   candidate is fitted on the training split, scored on a validation
+   split carved from it and on the test split, and exported to the
+   model registry. Candidates already in the registry for the same data
+   are not retrained.
+3. Every run records training time, RMSE and R², and the inference
+   latency of the exported model served by calorie_model.CalorieModel.
+   The best model by validation RMSE can be promoted to the path the
+   app loads its calorie model from.
+
+Needs scikit-learn; the app itself does not.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from nutriusher.calorie_model import CalorieModel, export_sklearn
+from nutriusher.catalog import file_digest
+from nutriusher.model_registry import DEFAULT_REGISTRY, ModelRegistry, model_id
+
+# Inputs the plan generator collects (see CalorieModel.user_features). The
+# notebook also used Carbs, Proteins and Fats, which are fractions of the
+# calorie target itself.
+FEATURES = ['Gender', 'Age', 'Height', 'Weight', 'BMR', 'Physical exercise']
+TARGET = 'Calories'
+
+# Columns the IQR filter looks at. Gender and the ordinal 'Physical
+# exercise' code are left out: their quartiles would drop every Heavy and
+# Very Heavy Exercise row.
+IQR_COLUMNS = ['Age', 'Weight', 'Height', 'Calories']
+
+# Bump when preprocessing changes, so cached results are not reused
+PREPROCESS_VERSION = 2
+
+# Model name -> parameter sets to try
+SEARCH_SPACE = {
+    'LinearRegression': [{}],
+    'Ridge': [{'alpha': alpha} for alpha in (0.1, 1.0, 10.0)],
+    'MLPRegressor': [
+        {'hidden_layer_sizes': sizes, 'alpha': alpha, 'max_iter': 1000, 'learning_rate_init': 0.01}
+        for sizes in ((64, 32), (100, 50))
+        for alpha in (1e-4, 1e-2)
+    ]
+}
+
+# Per-process state set up by _init_worker
+_data = None
+_options = None
+
+
+def fingerprint(path, features, target, settings):
+    """Key of the preprocessed data: input contents plus preprocessing settings"""
+    encoded = json.dumps({
+        'data': file_digest(path),
+        'features': list(features),
+        'target': target,
+        'settings': settings,
+        'version': PREPROCESS_VERSION
+    }, sort_keys=True)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def iqr_filter(frame, factor=1.5, columns=None):
+    """Rows without a value outside [Q1 - factor*IQR, Q3 + factor*IQR] in any of ``columns`` (default all)"""
+    values = frame[list(columns)] if columns is not None else frame
+    q1, q3 = values.quantile(0.25), values.quantile(0.75)
+    iqr = q3 - q1
+    outside = (values < q1 - factor * iqr) | (values > q3 + factor * iqr)
+    return frame[~outside.any(axis=1)]
+
+
+def preprocess(path, features=FEATURES, target=TARGET, cache_dir='.cache/training',
+               test_size=0.2, val_size=0.2, iqr_factor=1.5, seed=42):
+    """
+    Preprocessed splits, from the cache when the data and settings are unchanged
+
+    Returns:
+        tuple: (path of the cached ``.npz``, fingerprint, whether it was cached)
+    """
+    settings = {'test_size': test_size, 'val_size': val_size, 'iqr_factor': iqr_factor, 'seed': seed}
+    key = fingerprint(path, features, target, settings)
+    cache_path = os.path.join(cache_dir, f"{key}.npz")
+    if os.path.exists(cache_path):
+        return cache_path, key, True
+
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+
+    data = iqr_filter(pd.read_csv(path).dropna(), iqr_factor, IQR_COLUMNS)
+    X = data[list(features)].to_numpy(dtype=float)
+    y = data[target].to_numpy(dtype=float)
+    strata = data['Gender'].to_numpy() if 'Gender' in data else None
+    rows = np.arange(len(data))
+    train_rows, test_rows = train_test_split(rows, test_size=test_size, random_state=seed, stratify=strata)
+    train_rows, val_rows = train_test_split(
+        train_rows, test_size=val_size, random_state=seed,
+        stratify=strata[train_rows] if strata is not None else None)
+    X_train, X_val, X_test = X[train_rows], X[val_rows], X[test_rows]
+    y_train, y_val, y_test = y[train_rows], y[val_rows], y[test_rows]
+
+    mean = X_train.mean(axis=0)
+    scale = X_train.std(axis=0)
+    scale[scale == 0] = 1.0  # as StandardScaler does for constant columns
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = os.path.join(cache_dir, f"{key}.tmp.npz")
+    np.savez(tmp_path, features=np.asarray(features, dtype=str), mean=mean, scale=scale,
+             X_train=X_train, y_train=y_train, X_val=X_val, y_val=y_val, X_test=X_test, y_test=y_test)
+    os.replace(tmp_path, cache_path)
+    return cache_path, key, False
+
+
+def make_model(name, params, seed):
+    from sklearn.linear_model import LinearRegression, Ridge
+    from sklearn.neural_network import MLPRegressor
+
+    models = {'LinearRegression': LinearRegression, 'Ridge': Ridge, 'MLPRegressor': MLPRegressor}
+    params = dict(params)
+    if name == 'MLPRegressor':
+        params['random_state'] = seed
+        params['hidden_layer_sizes'] = tuple(params['hidden_layer_sizes'])
+    return models[name](**params)
+
+
+def regression_metrics(y_true, y_pred):
+    residual = y_true - y_pred
+    return {
+        'rmse': float(np.sqrt(np.mean(residual ** 2))),
+        'r2': float(1 - np.sum(residual ** 2) / np.sum((y_true - y_true.mean()) ** 2))
+    }
+
+
+def serving_latency(path, X, single=200):
+    """Per-row latency of the exported model, batched and one row at a time, in microseconds"""
+    model = CalorieModel(path)
+    model.predict(X[:10])
+    start = time.perf_counter()
+    model.predict(X)
+    batch_us = (time.perf_counter() - start) / len(X) * 1e6
+    rows = X[:single]
+    start = time.perf_counter()
+    for row in rows:
+        model.predict(row)
+    return batch_us, (time.perf_counter() - start) / len(rows) * 1e6
+
+
+def _init_worker(cache_path, options):
+    global _data, _options
+    # One BLAS thread per process; the pool provides the parallelism
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+    with np.load(cache_path) as data:
+        _data = {name: data[name] for name in data.files}
+    _options = options
+
+
+def train_candidate(name, params):
+    """Fit, score, export and register one candidate; runs in a pool worker"""
+    registry = ModelRegistry(_options['registry'])
+    candidate_id = model_id(name, params, _options['fingerprint'])
+    existing = registry.get(candidate_id)
+    if existing is not None:
+        return {**existing, 'cached': True}
+
+    import warnings
+    from sklearn.exceptions import ConvergenceWarning
+
+    features = _data['features'].tolist()
+    X_train = (_data['X_train'] - _data['mean']) / _data['scale']
+    model = make_model(name, params, _options['seed'])
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        model.fit(X_train, _data['y_train'])
+    train_seconds = time.perf_counter() - start
+
+    metrics = {}
+    for split in ('train', 'val', 'test'):
+        X = (_data[f'X_{split}'] - _data['mean']) / _data['scale']
+        for metric, value in regression_metrics(_data[f'y_{split}'], model.predict(X)).items():
+            metrics[f'{split}_{metric}'] = value
+
+    scaler = type('Scaler', (), {'mean_': _data['mean'], 'scale_': _data['scale']})
+    os.makedirs(registry.model_dir(candidate_id), exist_ok=True)
+    export_sklearn(model, scaler, features, registry.weights_path(candidate_id))
+
+    return {**registry.register(candidate_id, {
+        'kind': name,
+        'params': params,
+        'features': features,
+        'fingerprint': _options['fingerprint'],
+        'seed': _options['seed'],
+        'train_seconds': train_seconds,
+        'metrics': metrics,
+        'size_bytes': os.path.getsize(registry.weights_path(candidate_id)),
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'versions': versions()
+    }), 'cached': False}
+
+
+def versions():
+    import sklearn
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'sklearn': sklearn.__version__}
+
+
+def search(cache_path, key, registry, space=SEARCH_SPACE, workers=None, seed=42):
+    """
+    Train every candidate of ``space`` in a process pool
+
+    Serving latency is measured afterwards, one model at a time in this
+    process, so it is not skewed by the fits still running in the pool;
+    also for models registered by an earlier run that stopped before
+    measuring theirs.
+    """
+    options = {'registry': registry, 'fingerprint': key, 'seed': seed}
+    candidates = [(name, params) for name, param_sets in space.items() for params in param_sets]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             initializer=_init_worker, initargs=(cache_path, options)) as pool:
+        futures = [pool.submit(train_candidate, name, params) for name, params in candidates]
+        results = [future.result() for future in as_completed(futures)]
+
+    models = ModelRegistry(registry)
+    with np.load(cache_path) as data:
+        X_test = data['X_test']
+    for i, result in enumerate(results):
+        if 'latency_us' not in result:
+            batch_us, single_us = serving_latency(models.weights_path(result['model_id']), X_test)
+            meta = {key: value for key, value in result.items() if key != 'cached'}
+            meta['latency_us'] = {'batch_per_row': batch_us, 'single': single_us}
+            results[i] = {**models.register(result['model_id'], meta), 'cached': result['cached']}
+    return sorted(results, key=lambda result: result['metrics']['val_rmse'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('data', nargs='?', default='user_nutritional_data.csv')
+    parser.add_argument('--features', nargs='*', default=FEATURES)
+    parser.add_argument('--target', default=TARGET)
+    parser.add_argument('--cache-dir', default='.cache/training')
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', nargs='*', help="Search only these model types")
+    parser.add_argument('--promote', action='store_true',
+                        help="Copy the best model to the app's calorie model path")
+    parser.add_argument('-o', '--output', help="Write the run's results to this JSON file")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    cache_path, key, cached = preprocess(args.data, args.features, args.target, args.cache_dir, seed=args.seed)
+    print(f"preprocess  {key[:12]}  {'cached' if cached else 'computed'}  "
+          f"{time.perf_counter() - start:.2f} s", file=sys.stderr)
+
+    space = {name: params for name, params in SEARCH_SPACE.items() if not args.only or name in args.only}
+    results = []
+    for result in search(cache_path, key, args.registry, space, args.workers, args.seed):
+        results.append(result)
+        metrics = result['metrics']
+        print(f"{result['model_id']:<44} {'cached' if result['cached'] else 'trained'}  "
+              f"fit {result['train_seconds']:6.2f} s  val rmse {metrics['val_rmse']:8.2f}  "
+              f"test rmse {metrics['test_rmse']:8.2f}  r2 {metrics['test_r2']:.4f}  "
+              f"{result['latency_us']['batch_per_row']:6.2f} us/row  "
+              f"{result['latency_us']['single']:6.1f} us/user", file=sys.stderr)
+    print(f"search      {len(results)} models  {time.perf_counter() - start:.2f} s", file=sys.stderr)
+
+    registry = ModelRegistry(args.registry)
+    best = registry.best('val_rmse', fingerprint=key)
+    if best is not None:
+        print(f"best        {best['model_id']}  val rmse {best['metrics']['val_rmse']:.2f}", file=sys.stderr)
+        if args.promote:
+            print(f"promoted to {registry.promote(best['model_id'])}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'fingerprint': key, 'best': best and best['model_id'], 'results': results},
+                      f, indent=2, default=str)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Streamlit helpers shared by the pages.
+
+The rest of the package does not import Streamlit; what the pages have in
+common and that needs ``st`` lives here.
+"""
+import os
+
+import streamlit as st
+
+from nutriusher import bootstrap, timing
+from nutriusher.sessions import active_user
+
+
+def save_plan(plan_data, user_metrics):
+    """
+    Queue a plan for the background save worker
+
+    Returns without waiting for Firestore; the plan's ID is appended to
+    ``st.session_state.plan_saves`` so pages can show its progress.
+
+    Returns:
+        bool: True if the plan was queued
+    """
+    user = active_user(st.session_state)
+    if user is None:
+        st.warning("Please log in to save your plan")
+        return False
+
+    from nutriusher.save_worker import SaveQueueFull
+
+    try:
+        plan_id = bootstrap.plan_saver().submit({
+            'id': bootstrap.plan_repository().new_id(),
+            'user_id': user['uid'],
+            'plan_data': plan_data,
+            'user_metrics': user_metrics
+        })
+        st.session_state.setdefault('plan_saves', []).append(plan_id)
+        st.session_state.pop('saved_plans', None)
+        return True
+    except (SaveQueueFull, OSError) as e:
+        st.error(f"Failed to save plan: {e}")
+        return False
+
+
+def firebase_api_key():
+    """bootstrap.firebase_api_key, else firebase_api_key in secrets.toml"""
+    api_key = bootstrap.firebase_api_key()
+    if api_key:
+        return api_key
+    try:
+        return st.secrets['firebase_api_key']
+    except (KeyError, FileNotFoundError):
+        return None
+
+
+def debug_mode():
+    """
+    True when the page URL has ?debug=1 and the deployment allows it
+
+    The hidden timing panel profiles the run and shows latencies from every
+    session, so ?debug=1 only works where NUTRIUSHER_DEBUG=1 is set.
+    """
+    return os.environ.get('NUTRIUSHER_DEBUG') == '1' and st.query_params.get('debug') == '1'
+
+
+def debug_panel(trace):
+    """This session's last runs, broken down by stage, and the process-wide latencies"""
+    traces = st.session_state.setdefault('timing_traces', [])
+    if trace is not None:
+        traces.append(trace.to_dict())
+        del traces[:-10]
+        if trace.profile:
+            st.session_state.timing_profile = trace.profile
+    with st.sidebar.expander("Debug: timings"):
+        st.checkbox("Profile each run (cProfile)", key='profile_runs')
+        if traces:
+            st.caption(f"Last run: {traces[-1]['total_ms']:.1f} ms")
+            st.dataframe([{'stage': name, **stage} for name, stage in traces[-1]['stages'].items()],
+                         hide_index=True)
+        st.caption("This process, all sessions")
+        st.dataframe(timing.histogram_rows(), hide_index=True)
+        if st.session_state.get('timing_profile'):
+            st.code(st.session_state.timing_profile)
+
+
+def run_page(name, main):
+    """
+    Run a page's ``main`` as one timed request
+
+    The request is traced when NUTRIUSHER_TIMING=1 or in debug_mode; the
+    latter also draws debug_panel in the sidebar.
+    """
+    debug = debug_mode()
+    with timing.request(name, force=debug, profile=debug and st.session_state.get('profile_runs', False),
+                        uid=(st.session_state.get('user') or {}).get('uid')) as trace:
+        main()
+    if debug:
+        debug_panel(trace)
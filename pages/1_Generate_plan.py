@@ -1,9 +1,20 @@
 import streamlit as st
-import pandas as pd
-import random
-import firebase_admin
-from firebase_admin import credentials, firestore
 import datetime
+import logging
+import os
+import time
+from nutriusher import bootstrap, timing, ui
+from nutriusher.calorie_model import CalorieModel, model_path as calorie_model_path
+from nutriusher.catalog import catalog_version, load_food_catalog, plan_sampler
+from nutriusher.sessions import active_user
+from nutriusher.planner import build_user_requirements
+from nutriusher.plan_cache import plan_cache
+from nutriusher.plan_edit import PlanEditor
+from nutriusher.plan_table import parse_day_id
+from nutriusher.sampler import MEALS
+from nutriusher.tables import plan_hash, plan_summary, refresh_summary
+
+logger = logging.getLogger('nutriusher.pages.generate_plan')
 
 # Sidebar Styling
 st.sidebar.markdown(
@@ -21,359 +32,205 @@ st.sidebar.markdown(
     unsafe_allow_html=True
 )
 
-# Firebase initialization
-if not firebase_admin._apps:
-    try:
-        cred = credentials.Certificate('firebase-adminsdk.json')
-        firebase_admin.initialize_app(cred)
-        st.write("Firebase initialized successfully.")
-    except Exception as e:
-        st.error(f"Firebase initialization failed: {e}")
-
-# Initialize Firestore
-db = firestore.client()
-
 # Function to check login
 def check_login():
-    if 'user' not in st.session_state:
+    if active_user(st.session_state) is None:
         st.error("You must be logged in to view your diet plans.")
         return False
     return True
 
-# Load data
+# Load data from the process-wide catalog cache
 def load_data():
-    food_data = pd.read_csv('food.csv')
-    user_data = pd.read_csv('user_nutritional_data.csv')
-    return food_data, user_data
-
-# Generate meal plan
-def generate_meal_plan(user_requirements, food_data):
-    breakfast_items = food_data[food_data['Breakfast'] == 1]
-    lunch_items = food_data[food_data['Lunch'] == 1]
-    dinner_items = food_data[food_data['Dinner'] == 1]
-
-    daily_plan = {
-        'Breakfast': [],
-        'Lunch': [],
-        'Dinner': []
-    }
-
-    # Target values from user requirements
-    target_calories = user_requirements['Calories']
-    target_proteins = user_requirements['Proteins']
-    target_carbs = user_requirements['Carbs']
-    target_fats = user_requirements['Fats']
-
-    # Select items for each meal
-    for meal, items in daily_plan.items():
-        if meal == 'Breakfast':
-            meal_items = breakfast_items
-        elif meal == 'Lunch':
-            meal_items = lunch_items
+    with timing.span('load_data'):
+        return load_food_catalog('food.csv')
+
+# Totals for a plan, computed once per plan hash so reruns triggered by
+# other widgets reuse them
+@st.cache_data(max_entries=32)
+def summarize_plan(plan_key, _four_week_plan):
+    return plan_summary(_four_week_plan)
+
+# Exported calorie model, if there is one; its weights are only read on
+# the first prediction
+@st.cache_resource
+def get_calorie_model(path):
+    return CalorieModel(path) if os.path.exists(path) else None
+
+# Nearest-neighbour substitution index per catalog version; its trees are
+# built on first use
+@st.cache_resource(max_entries=4)
+def get_substitution_index(version):
+    from nutriusher.substitutes import SubstitutionIndex
+    return SubstitutionIndex(load_data())
+
+def edit_plan_controls(generated):
+    """Regenerate one item, meal, day or week of the generated plan in place"""
+    plan = generated['plan']
+    with st.expander("Change part of the plan"):
+        scope = st.radio("Regenerate", ["One item", "One meal", "One day", "One week"], horizontal=True)
+        if scope == "One week":
+            week = st.selectbox("Week", sorted({parse_day_id(day_id)[0] for day_id in plan}))
         else:
-            meal_items = dinner_items
-
-        # Select 2-3 items per meal
-        num_items = random.randint(2, 3)
-        selected_items = meal_items.sample(n=min(num_items, len(meal_items)))
-        daily_plan[meal] = selected_items
-
-    return daily_plan
-
-def generate_four_week_plan(user_input, food_data):
-    weeks = 4
-    days_per_week = 7
-    meals = ['Breakfast', 'Lunch', 'Dinner']
-    full_plan = {}
-    
-    # Track used meals to ensure variety
-    used_meals = {meal: set() for meal in meals}
-    
-    for week in range(1, weeks + 1):
-        for day in range(1, days_per_week + 1):
-            day_menu = {}
-            day_id = f"Week {week} Day {day}"
-            
-            for meal in meals:
-                meal_recommendations = recommend_food(user_input, food_data, meal)
-                
-                if not meal_recommendations.empty:
-                    # Filter out recently used meals
-                    available_meals = meal_recommendations[
-                        ~meal_recommendations['Food_items'].isin(used_meals[meal])
-                    ]
-                    
-                    # If too few options, reset the used meals tracking
-                    if len(available_meals) < 3:
-                        used_meals[meal].clear()
-                        available_meals = meal_recommendations
-                    
-                    # Select meals
-                    selected_meals = available_meals.sample(
-                        n=min(3, len(available_meals)),
-                        random_state=week*100 + day
-                    )
-                    
-                    # Track used meals
-                    used_meals[meal].update(selected_meals['Food_items'].tolist())
-                    
-                    # Keep only last 7 days of used meals
-                    if len(used_meals[meal]) > 21:  # 7 days * 3 meals
-                        used_meals[meal] = set(list(used_meals[meal])[-21:])
-                    
-                    day_menu[meal] = [
-                        {
-                            'Food': meal_item['Food_items'],
-                            'Calories': meal_item['Calories'],
-                            'Proteins': meal_item['Proteins'],
-                            'Carbs': meal_item['Carbohydrates'],
-                            'Fats': meal_item['Fats'],
-                            'Sugars': meal_item['Sugars'],
-                            'Sodium': meal_item['Sodium']
-                        }
-                        for _, meal_item in selected_meals.iterrows()
-                    ]
-                else:
-                    day_menu[meal] = 'No suitable meal found'
-            
-            full_plan[day_id] = day_menu
-    
-    return full_plan
-
-def create_plan_dataframe(meal_plan):
-    rows = []
-    for day, meals in meal_plan.items():
-        for meal_type, items in meals.items():
-            if isinstance(items, list):
-                for item in items:
-                    rows.append({
-                        'Day': day,
-                        'Meal': meal_type,
-                        'Food': item['Food'],
-                        'Calories': item['Calories'],
-                        'Proteins': item['Proteins'],
-                        'Carbs': item['Carbs'],
-                        'Fats': item['Fats'],
-                        'Sugars': item['Sugars'],
-                        'Sodium': item['Sodium']
-                    })
-    return pd.DataFrame(rows)
+            day_id = st.selectbox("Day", list(plan))
+        if scope in ("One item", "One meal"):
+            meal = st.selectbox("Meal", MEALS)
+        if scope == "One item":
+            items = plan[day_id][meal]
+            foods = [item['Food'] for item in items] if isinstance(items, list) else []
+            item_index = st.selectbox("Item", range(len(foods)), format_func=lambda i: foods[i])
+            replace_with = st.radio("Replace with", ["Any suitable food", "A similar food"], horizontal=True)
+
+        version = catalog_version(load_data())
+        editor = PlanEditor(plan_sampler(load_data()), generated['requirements'],
+                            optimize=generated['optimize'])
+        similar = []
+        if scope == "One item" and item_index is not None and replace_with == "A similar food":
+            try:
+                rows = editor.similar_items(plan, day_id, meal, item_index, get_substitution_index(version))
+            except ImportError:
+                st.error("Similar food suggestions need scipy")
+                rows = []
+            similar = [item['Food'] for item in editor.sampler.items(rows)] if len(rows) else []
+            if similar:
+                choice = st.selectbox("Similar food", range(len(similar)), format_func=lambda i: similar[i])
+            else:
+                st.info("No similar food fits this meal")
+
+        if st.button("Regenerate"):
+            start = time.perf_counter()
+            if scope == "One week":
+                changed = editor.regenerate_week(plan, week)
+            elif scope == "One day":
+                changed = editor.regenerate_day(plan, day_id)
+            elif scope == "One meal":
+                changed = editor.regenerate_slot(plan, day_id, meal)
+            elif item_index is not None and replace_with == "A similar food":
+                changed = editor.substitute_item(plan, day_id, meal, item_index,
+                                                 get_substitution_index(version), choice) if similar else []
+            elif item_index is not None:
+                changed = editor.swap_item(plan, day_id, meal, item_index)
+            else:
+                changed = []
+            generated['summary'] = refresh_summary(generated['summary'], plan, changed)
+            generated['key'] = plan_hash(plan)
+            logger.info("edit scope=%s days=%d ms=%.1f", scope, len(changed), (time.perf_counter() - start) * 1000)
+
+def download_controls(generated):
+    """Download the plan in the create_meal_plan_table layout"""
+    from nutriusher.export import MIME_TYPES, export_file
+
+    labels = {'csv': "CSV", 'xlsx': "Excel", 'jsonl': "JSON Lines"}
+    fmt = st.selectbox("Download format", list(labels), format_func=labels.get)
+    plan = generated['plan']
+    # Written only when the button is clicked, off the script thread
+    st.download_button(
+        label="Download 4-Week Plan",
+        data=lambda: export_file(plan, fmt),
+        file_name=f"four_week_diet_plan.{fmt}",
+        mime=MIME_TYPES[fmt]
+    )
+
+# How each save state is shown while the plan is written in the background
+SAVE_STATES = {
+    'queued': "⏳ Waiting to save",
+    'saving': "⏳ Saving",
+    'retrying': "🔁 Saving failed, retrying",
+    'saved': "✅ Saved to My Plans",
+    'failed': "❌ Could not save"
+}
+
+def save_plan_controls(generated):
+    """Queue the plan for saving; the write happens in the background"""
+    if st.button("💾 Save Plan"):
+        ui.save_plan(generated['plan'], generated['metrics'])
+    if st.session_state.get('plan_saves'):
+        save_status()
+
+# Redrawn every few seconds on its own, so the status follows the worker
+@st.fragment(run_every=2)
+def save_status():
+    saver = bootstrap.plan_saver()
+    for plan_id in st.session_state.get('plan_saves', [])[-3:]:
+        status = saver.status(plan_id)
+        if status is None:
+            continue
+        message = SAVE_STATES[status['state']]
+        if status['error'] and status['state'] in ('retrying', 'failed'):
+            message += f" ({status['attempts']} attempts): {status['error']}"
+        st.caption(message)
+    metrics = saver.metrics()
+    if metrics['queue_depth'] or metrics['failures']:
+        st.caption(f"Save queue: {metrics['queue_depth']} waiting, {metrics['failures']} failed")
+
+def display_four_week_plan(summary):
+    meals = summary['meals']
+    week_labels = list(summary['weeks'].index)
+
+    # Style for the table, emitted once for all tabs
+    st.markdown("""
+        <style>
+        .meal-table {
+            border-collapse: collapse;
+            width: 100%;
+            margin: 10px 0;
+        }
+        .meal-table th, .meal-table td {
+            border: 1px solid #ddd;
+            padding: 8px;
+            text-align: left;
+        }
+        .meal-table th {
+            background-color: #0066cc;
+            color: white;
+        }
+        </style>
+    """, unsafe_allow_html=True)
 
-def display_four_week_plan(four_week_plan):
     # Create tabs for each week
-    week_tabs = st.tabs([f"Week {i}" for i in range(1, 5)])
+    week_tabs = st.tabs(week_labels)
     
-    for week_num, week_tab in enumerate(week_tabs, 1):
+    for week, week_tab in zip(week_labels, week_tabs):
         with week_tab:
-            week_data = four_week_plan[f'Week {week_num}']
-            
-            # Style for the table
-            st.markdown("""
-                <style>
-                .meal-table {
-                    border-collapse: collapse;
-                    width: 100%;
-                    margin: 10px 0;
-                }
-                .meal-table th, .meal-table td {
-                    border: 1px solid #ddd;
-                    padding: 8px;
-                    text-align: left;
-                }
-                .meal-table th {
-                    background-color: #0066cc;
-                    color: white;
-                }
-                </style>
-            """, unsafe_allow_html=True)
+            week_meals = meals[meals['Week'] == week]
+            days = list(dict.fromkeys(week_meals['Day']))
             
             # Create columns for days
-            cols = st.columns(7)
+            cols = st.columns(len(days))
             
             # Display days as headers
-            for col, day in zip(cols, week_data.keys()):
+            for col, day in zip(cols, days):
                 with col:
                     st.markdown(f"**{day}**")
                     
                     # Display meals in expandable sections
-                    for meal_type, items in week_data[day].items():
-                        with st.expander(meal_type):
-                            total_calories = 0
-                            total_proteins = 0
-                            total_carbs = 0
-                            total_fats = 0
-                            
-                            for _, item in items.iterrows():
-                                st.write(f"• {item['Food_items']}")
-                                total_calories += item['Calories']
-                                total_proteins += item['Proteins']
-                                total_carbs += item['Carbohydrates']
-                                total_fats += item['Fats']
-                            
+                    for meal in week_meals[week_meals['Day'] == day].to_dict('records'):
+                        with st.expander(meal['Meal']):
+                            st.markdown(meal['Foods'])
                             st.markdown(f"""
                                 **Totals:**
-                                - Cal: {total_calories:.0f}
-                                - Pro: {total_proteins:.1f}g
-                                - Carb: {total_carbs:.1f}g
-                                - Fat: {total_fats:.1f}g
+                                - Cal: {meal['Calories']:.0f}
+                                - Pro: {meal['Proteins (g)']:.1f}g
+                                - Carb: {meal['Carbs (g)']:.1f}g
+                                - Fat: {meal['Fats (g)']:.1f}g
                             """)
 
             # Display daily totals
             st.markdown("### Daily Totals")
-            daily_totals = {}
-            
-            for day, meals in week_data.items():
-                day_total = {'Calories': 0, 'Proteins': 0, 'Carbs': 0, 'Fats': 0}
-                for meal_type, items in meals.items():
-                    for _, item in items.iterrows():
-                        day_total['Calories'] += item['Calories']
-                        day_total['Proteins'] += item['Proteins']
-                        day_total['Carbs'] += item['Carbohydrates']
-                        day_total['Fats'] += item['Fats']
-                daily_totals[day] = day_total
-            
-            # Create totals dataframe
-            totals_df = pd.DataFrame(daily_totals).T
-            st.dataframe(totals_df.round(1), use_container_width=True)
+            st.dataframe(summary['days'].loc[week].round(1), use_container_width=True)
 
-def calculate_nutrition(meal_plan):
-    total_nutrition = {
-        'Calories': 0,
-        'Proteins': 0,
-        'Carbs': 0,
-        'Fats': 0
-    }
-    
-    for meal, items in meal_plan.items():
-        for _, item in items.iterrows():
-            total_nutrition['Calories'] += item['Calories']
-            total_nutrition['Proteins'] += item['Proteins']
-            total_nutrition['Carbs'] += item['Carbohydrates']
-            total_nutrition['Fats'] += item['Fats']
-    
-    return total_nutrition
-
-def calculate_bmr(weight, height, age, gender):
-    """Calculate Basal Metabolic Rate using Mifflin-St Jeor Equation"""
-    if gender == 'Male':
-        bmr = 10 * weight + 6.25 * height - 5 * age + 5
-    else:
-        bmr = 10 * weight + 6.25 * height - 5 * age - 161
-    return bmr
-
-def calculate_calories(bmr, activity_level):
-    """Calculate daily calorie needs based on activity level"""
-    activity_multipliers = {
-        'Sedentary': 1.2,
-        'Light Exercise': 1.375,
-        'Moderate Exercise': 1.55,
-        'Heavy Exercise': 1.725
-    }
-    return bmr * activity_multipliers.get(activity_level, 1.2)
-
-def recommend_food(user_input, food_data, meal):
-    # Calculate meal-specific calorie targets
-    daily_calories = user_input['Calories']
-    meal_calories = {
-        'Breakfast': daily_calories * 0.3,
-        'Lunch': daily_calories * 0.4,
-        'Dinner': daily_calories * 0.3
-    }
-
-    # Filter by meal timing (using meal column from food data)
-    filtered_foods = food_data[food_data[meal] == 1]
-
-    # Apply dietary preference filter
-    if user_input['Diet'] != 'All':
-        filtered_foods = filtered_foods[filtered_foods['Diet'] == (1 if user_input['Diet'] == 'Non-Veg' else 0)]
-
-    # Apply health condition filters
-    if user_input['Condition']:
-        for condition in user_input['Condition']:
-            if condition == 'Diabetes':
-                filtered_foods = filtered_foods[filtered_foods['Sugars'] < 5]
-            elif condition == 'Heart Disease':
-                filtered_foods = filtered_foods[filtered_foods['Fats'] < 10]
-            elif condition == 'Hypertension':
-                filtered_foods = filtered_foods[filtered_foods['Sodium'] < 500]
-
-    # Filter by meal calories
-    filtered_foods = filtered_foods[filtered_foods['Calories'] <= meal_calories[meal]]
-
-    return filtered_foods
-
-def recommend_weekly_meals(user_input, food_data):
-    meals = {'Breakfast': [], 'Lunch': [], 'Dinner': []}
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    weekly_plan = {}
-
-    for day in days:
-        daily_meals = {}
-        for meal in meals:
-            recommendations = recommend_food(user_input, food_data, meal)
-            if not recommendations.empty:
-                # Select 2-3 items per meal
-                meal_items = recommendations.sample(n=min(3, len(recommendations)))
-                daily_meals[meal] = [{
-                    'Food': item['Food_items'],
-                    'Calories': item['Calories'],
-                    'Proteins': item['Proteins'],
-                    'Carbs': item['Carbohydrates'],
-                    'Fats': item['Fats'],
-                    'Sugars': item['Sugars'],
-                    'Sodium': item['Sodium']
-                } for _, item in meal_items.iterrows()]
-            else:
-                daily_meals[meal] = "No suitable options found"
-        weekly_plan[day] = daily_meals
-
-    return weekly_plan
-
-def create_meal_plan_table(four_week_plan):
-    # Create lists to store data
-    records = []
-    
-    for day_id, day_meals in four_week_plan.items():
-        week_num = day_id.split()[1]
-        day_num = day_id.split()[3]
-        
-        for meal_type, items in day_meals.items():
-            if isinstance(items, list):
-                # Join multiple food items with newlines
-                foods = "\n".join([f"• {item['Food']}" for item in items])
-                # Calculate meal totals
-                total_calories = sum(item['Calories'] for item in items)
-                total_proteins = sum(item['Proteins'] for item in items)
-                total_carbs = sum(item['Carbs'] for item in items)
-                total_fats = sum(item['Fats'] for item in items)
-                
-                records.append({
-                    'Week': f"Week {week_num}",
-                    'Day': f"Day {day_num}",
-                    'Meal': meal_type,
-                    'Foods': foods,
-                    'Calories': f"{total_calories:.0f}",
-                    'Proteins (g)': f"{total_proteins:.1f}",
-                    'Carbs (g)': f"{total_carbs:.1f}",
-                    'Fats (g)': f"{total_fats:.1f}"
-                })
-    
-    return pd.DataFrame(records)
-
-def display_meal_plan(four_week_plan):
-    df = create_meal_plan_table(four_week_plan)
+def display_meal_plan(summary):
+    meals = summary['meals']
+    week_labels = list(summary['weeks'].index)
     
     # Create tabs for each week
-    week_tabs = st.tabs(["Week 1", "Week 2", "Week 3", "Week 4"])
+    week_tabs = st.tabs(week_labels)
     
     # Display data in each tab
-    for week_num, tab in enumerate(week_tabs, 1):
+    for week, tab in zip(week_labels, week_tabs):
         with tab:
-            week_data = df[df['Week'] == f"Week {week_num}"]
-            
             try:
                 # Reset index and format table
-                display_df = week_data.reset_index(drop=True)
+                display_df = meals[meals['Week'] == week].reset_index(drop=True)
                 
                 # Display table
                 st.dataframe(
@@ -406,23 +263,18 @@ def display_meal_plan(four_week_plan):
                 )
                 
                 # Weekly totals
-                weekly_totals = display_df.agg({
-                    'Calories': lambda x: f"{x.astype(float).sum():.0f}",
-                    'Proteins (g)': lambda x: f"{x.astype(float).sum():.1f}",
-                    'Carbs (g)': lambda x: f"{x.astype(float).sum():.1f}",
-                    'Fats (g)': lambda x: f"{x.astype(float).sum():.1f}"
-                })
+                weekly_totals = summary['weeks'].loc[week]
                 
                 st.markdown(f"""
                 **Weekly Totals:**
-                - Calories: {weekly_totals['Calories']}
-                - Proteins: {weekly_totals['Proteins (g)']}g
-                - Carbs: {weekly_totals['Carbs (g)']}g
-                - Fats: {weekly_totals['Fats (g)']}g
+                - Calories: {weekly_totals['Calories']:.0f}
+                - Proteins: {weekly_totals['Proteins (g)']:.1f}g
+                - Carbs: {weekly_totals['Carbs (g)']:.1f}g
+                - Fats: {weekly_totals['Fats (g)']:.1f}g
                 """)
                 
             except Exception as e:
-                st.error(f"Error displaying table for Week {week_num}: {str(e)}")
+                st.error(f"Error displaying table for {week}: {str(e)}")
 
 # Main function
 def main():
@@ -437,47 +289,74 @@ def main():
     activity_level = st.selectbox("Activity Level", 
         ['Sedentary', 'Light Exercise', 'Moderate Exercise', 'Heavy Exercise'])
 
-    food_data, user_data = load_data()
+    food_data = load_data()
 
     if food_data is not None:
         # Use 'Diet' column instead of 'Dietary Preference'
         dietary_pref = st.selectbox("Dietary Preference", ['All'] + list(food_data['Diet'].unique()))
         health_conditions = st.multiselect("Health Conditions", 
             ['None', 'Diabetes', 'Hypertension', 'Heart Disease'])
+        match_macros = st.checkbox("Balance meals to my calorie and macro targets")
     else:
-        dietary_pref, health_conditions = None, []
+        dietary_pref, health_conditions, match_macros = None, [], False
+
+    calorie_model = get_calorie_model(calorie_model_path())
+    use_model = calorie_model is not None and st.radio(
+        "Calorie estimate", ["Activity level", "Trained model"], horizontal=True) == "Trained model"
 
     if st.button("Generate 4-Week Plan"):
         if name and age and weight and height:
-            bmr = calculate_bmr(weight, height, age, gender)
-            daily_calories = calculate_calories(bmr, activity_level)
+            try:
+                user_requirements = build_user_requirements(
+                    weight, height, age, gender, activity_level,
+                    diet=dietary_pref, conditions=health_conditions,
+                    calorie_model=calorie_model if use_model else None
+                )
+            except (OSError, ValueError) as e:
+                st.warning(f"Calorie model unavailable, using activity level instead: {str(e)}")
+                user_requirements = build_user_requirements(
+                    weight, height, age, gender, activity_level,
+                    diet=dietary_pref, conditions=health_conditions
+                )
             
-            user_requirements = {
-                'Calories': daily_calories,
-                'BMR': bmr,
-                'Proteins': int(daily_calories * 0.15 / 4),
-                'Carbs': int(daily_calories * 0.55 / 4),
-                'Fats': int(daily_calories * 0.30 / 9),
-                'Diet': dietary_pref,
-                'Condition': health_conditions
+            # Users in the same calorie band, diet and conditions share a
+            # plan; it is summarized from its numeric table and only turned
+            # into item dicts for editing
+            plan_table = plan_cache.table(user_requirements, food_data, optimize=match_macros)
+            four_week_plan = plan_table.to_plan()
+            plan_key = plan_hash(four_week_plan)
+            st.session_state.generated_plan = {
+                'key': plan_key,
+                'plan': four_week_plan,
+                'summary': summarize_plan(plan_key, plan_table),
+                'requirements': user_requirements,
+                'optimize': match_macros,
+                # Stored with a saved plan; Firestore needs plain Python values
+                'metrics': {
+                    'weight': float(weight),
+                    'height': float(height),
+                    'age': int(age),
+                    'gender': gender,
+                    'activity_level': activity_level,
+                    'Calories': float(user_requirements['Calories']),
+                    'Diet': dietary_pref.item() if hasattr(dietary_pref, 'item') else dietary_pref,
+                    'Conditions': list(health_conditions)
+                }
             }
-            
-            four_week_plan = generate_four_week_plan(user_requirements, food_data)
-            display_meal_plan(four_week_plan)
-            
-            # # Create downloadable CSV
-            # plan_df = create_meal_plan_table(four_week_plan)
-            # csv = plan_df.to_csv(index=False)
-            # st.download_button(
-            #     label="Download 4-Week Plan",
-            #     data=csv,
-            #     file_name="four_week_diet_plan.csv",
-            #     mime="text/csv"
-            # )
+
         else:
             st.error("Please fill all the required fields.")
-    else:
-        return
+
+    # Keep showing the last generated plan across reruns
+    if 'generated_plan' in st.session_state:
+        generated = st.session_state.generated_plan
+        edit_plan_controls(generated)
+        save_plan_controls(generated)
+        download_controls(generated)
+        start = time.perf_counter()
+        with timing.span('display_meal_plan'):
+            display_meal_plan(generated['summary'])
+        logger.info("render plan=%s ms=%.1f", generated['key'][:12], (time.perf_counter() - start) * 1000)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ui.run_page('generate_plan', main)
\ No newline at end of file
@@ -1,8 +1,8 @@
 import streamlit as st
-import firebase_admin
-from firebase_admin import credentials, firestore
 from datetime import datetime
-import pandas as pd
+from functools import lru_cache
+from nutriusher import bootstrap, timing, ui
+from nutriusher.sessions import active_user
 
 # Must be the first Streamlit command
 st.set_page_config(
@@ -11,11 +11,16 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialize Firebase
-if not firebase_admin._apps:
-    cred = credentials.Certificate('firebase-adminsdk.json')
-    firebase_admin.initialize_app(cred)
-db = firestore.client()
+# Firestore, pandas and the catalog are loaded on first use, so the
+# login prompt and plan list render without them
+
+def get_plan_repository():
+    # Shared by every session in this process, so cached reads and
+    # queued writes are too
+    return bootstrap.plan_repository()
+
+# Saved plans listed per page
+PAGE_SIZE = 10
 
 class MealPlanTracker:
     def __init__(self):
@@ -34,7 +39,7 @@ class MealPlanTracker:
 
     def check_authentication(self):
         """Validate user authentication"""
-        if 'user' not in st.session_state:
+        if active_user(st.session_state) is None:
             st.warning("Please log in to access Meal Plan Tracker")
             return False
         return True
@@ -50,43 +55,83 @@ class MealPlanTracker:
             bool: Success status of deletion
         """
         try:
-            db.collection('meal_plans').document(plan_id).delete()
+            get_plan_repository().delete(plan_id)
+            st.session_state.pop('saved_plans', None)
             st.success("Meal plan deleted successfully!")
             return True
         except Exception as e:
             st.error(f"Failed to delete meal plan: {e}")
             return False
 
+@lru_cache(maxsize=8)
+def load_plan_catalog(version):
+    """Catalog a compact plan was encoded against; LookupError if its snapshot is missing"""
+    from nutriusher.catalog import catalog_version, load_food_catalog
+    from nutriusher.plan_codec import load_catalog_snapshot
+
+    food_data = load_food_catalog('food.csv')
+    if catalog_version(food_data) == version:
+        return food_data
+    food_data = load_catalog_snapshot(bootstrap.firestore_client(), version)
+    if food_data is None:
+        # Raised rather than returned, so lru_cache does not keep the miss
+        raise LookupError(f"No snapshot of catalog {version}")
+    return food_data
+
 def save_generated_plan(plan_data, user_metrics):
-    if 'user' not in st.session_state:
-        st.warning("Please log in to save your plan")
-        return False
-    
+    """Queue a plan for the background save worker; returns without waiting for Firestore"""
+    return ui.save_plan(plan_data, user_metrics)
+
+def display_pending_saves():
+    """Plans this session saved that are not in Firestore yet"""
+    saver = bootstrap.plan_saver()
+    statuses = [saver.status(plan_id) for plan_id in st.session_state.get('plan_saves', [])]
+    waiting = sum(1 for status in statuses if status and status['state'] in ('queued', 'saving', 'retrying'))
+    failed = [status for status in statuses if status and status['state'] == 'failed']
+    if waiting:
+        st.info(f"{waiting} plan(s) still saving; they will appear here shortly")
+        # List again once they are written
+        st.session_state.pop('saved_plans', None)
+    for status in failed:
+        st.error(f"A plan could not be saved after {status['attempts']} attempts: {status['error']}")
+
+def get_user_plans(cursor=None):
+    """One page of plan summaries (created_at and user_metrics only)"""
     try:
-        plan_ref = db.collection('meal_plans').document()
-        plan_ref.set({
-            'user_id': st.session_state.user['uid'],
-            'created_at': firestore.SERVER_TIMESTAMP,
-            'plan_data': plan_data,
-            'user_metrics': user_metrics
-        })
-        return True
+        return get_plan_repository().list_summaries(st.session_state.user['uid'], PAGE_SIZE, cursor)
     except Exception as e:
-        st.error(f"Failed to save plan: {e}")
-        return False
+        st.error(f"Error fetching plans: {e}")
+        return [], None
 
-def get_user_plans():
+def get_plan_data(plan_id):
+    """Full plan_data of one plan, served from the repository cache"""
     try:
-        plans = db.collection('meal_plans')\
-            .where('user_id', '==', st.session_state.user['uid'])\
-            .get()
-        return [{'id': plan.id, **plan.to_dict()} for plan in plans]
+        return get_plan_repository().get_plan_data(plan_id)
     except Exception as e:
-        st.error(f"Error fetching plans: {e}")
-        return []
+        st.error(f"Error fetching plan: {e}")
+        return None
+
+def load_plan_data(plan_data):
+    """Plan dict of a stored plan, decoding the compact format"""
+    from nutriusher.plan_codec import decode_plan, is_compact
+
+    if is_compact(plan_data):
+        try:
+            food_data = load_plan_catalog(plan_data['catalog_version'])
+        except LookupError:
+            st.error("This plan refers to a food catalog that is no longer stored, so it cannot be shown")
+            return {}
+        with timing.span('decode_plan'):
+            return decode_plan(plan_data, food_data)
+    return plan_data or {}
 
 def display_saved_plans():
-    plans = get_user_plans()
+    if 'saved_plans' not in st.session_state:
+        plans, cursor = get_user_plans()
+        st.session_state.saved_plans = plans
+        st.session_state.saved_plans_cursor = cursor
+
+    plans = st.session_state.saved_plans
     if not plans:
         st.info("No saved meal plans found")
         return
@@ -100,23 +145,31 @@ def display_saved_plans():
                 st.write(f"- Height: {metrics.get('height')} cm")
                 st.write(f"- Daily Calories: {metrics.get('Calories', 0):.0f}")
             
-            st.write("### Meal Plan")
-            for week, meals in plan.get('plan_data', {}).items():
-                st.write(f"#### {week}")
-                for day, day_meals in meals.items():
+            # plan_data is only fetched once the user asks for it
+            if st.toggle("Show meal plan", key=f"show_plan_{plan['id']}"):
+                st.write("### Meal Plan")
+                for day, day_meals in load_plan_data(get_plan_data(plan['id'])).items():
+                    st.write(f"#### {day}")
                     for meal_type, items in day_meals.items():
                         if isinstance(items, list):
                             st.write(f"*{meal_type}*")
                             for item in items:
                                 st.write(f"• {item['Food']}")
 
+    if st.session_state.saved_plans_cursor is not None and st.button("Load more plans"):
+        more_plans, cursor = get_user_plans(st.session_state.saved_plans_cursor)
+        st.session_state.saved_plans = plans + more_plans
+        st.session_state.saved_plans_cursor = cursor
+        st.rerun()
+
 def main():
     st.title("My Saved Meal Plans")
     
-    if 'user' not in st.session_state:
+    if active_user(st.session_state) is None:
         st.warning("Please log in to view your plans")
         return
         
+    display_pending_saves()
     display_saved_plans()
 
 if st.button("Generate 4-Week Meal Plan"):
@@ -143,4 +196,4 @@ if st.button("Generate 4-Week Meal Plan"):
             save_generated_plan(four_week_plan, user_metrics)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ui.run_page('my_plans', main)
\ No newline at end of file
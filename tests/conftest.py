@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+from nutriusher.catalog import load_food_catalog
+from nutriusher.planner import generate_four_week_plan
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+USER_INPUT = {'Calories': 2000, 'Diet': 'All', 'Condition': []}
+
+
+@pytest.fixture(scope='session')
+def food_data():
+    return load_food_catalog(os.path.join(ROOT, 'food.csv'))
+
+
+@pytest.fixture
+def plan(food_data):
+    return generate_four_week_plan(USER_INPUT, food_data, seed=1)
@@ -0,0 +1,71 @@
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nutriusher.calorie_model import CalorieModel, export_sklearn
+
+from conftest import ROOT
+
+# Exporting needs scikit-learn; serving does not
+ConvergenceWarning = pytest.importorskip('sklearn.exceptions').ConvergenceWarning
+LinearRegression = pytest.importorskip('sklearn.linear_model').LinearRegression
+MLPRegressor = pytest.importorskip('sklearn.neural_network').MLPRegressor
+StandardScaler = pytest.importorskip('sklearn.preprocessing').StandardScaler
+
+FEATURES = ['Gender', 'Age', 'Height', 'Weight', 'BMR', 'Physical exercise']
+
+
+@pytest.fixture(scope='module')
+def training_data():
+    frame = pd.read_csv(os.path.join(ROOT, 'user_nutritional_data.csv'))
+    return frame[FEATURES], frame['Calories'].to_numpy()
+
+
+def fit(model, X, y):
+    scaler = StandardScaler().fit(X)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        model.fit(scaler.transform(X), y)
+    return scaler, model
+
+
+@pytest.mark.parametrize('model', [
+    LinearRegression(),
+    MLPRegressor(hidden_layer_sizes=(16, 8), max_iter=50, random_state=0),
+    MLPRegressor(hidden_layer_sizes=(8,), activation='tanh', max_iter=50, random_state=0)
+], ids=['linear', 'mlp-relu', 'mlp-tanh'])
+def test_predictions_match_sklearn(tmp_path, training_data, model):
+    X, y = training_data
+    scaler, model = fit(model, X, y)
+    path = str(tmp_path / 'model.npz')
+    export_sklearn(model, scaler, FEATURES, path)
+
+    served = CalorieModel(path)
+    assert served.features == FEATURES
+    assert served.kind == type(model).__name__
+    expected = model.predict(scaler.transform(X))
+    assert np.allclose(served.predict(X), expected, rtol=1e-9, atol=1e-6)
+    # Plain arrays in feature order, and a single row
+    assert np.allclose(served.predict(X.to_numpy()), expected, rtol=1e-9, atol=1e-6)
+    assert np.isclose(served.predict(X.to_numpy()[0])[0], expected[0])
+
+    fast = CalorieModel(path, dtype=np.float32)
+    assert np.allclose(fast.predict(X), expected, rtol=1e-3)
+
+
+def test_predict_user_builds_the_feature_row(tmp_path, training_data):
+    X, y = training_data
+    scaler, model = fit(LinearRegression(), X, y)
+    path = str(tmp_path / 'model.npz')
+    export_sklearn(model, scaler, FEATURES, path)
+
+    served = CalorieModel(path)
+    # Female, 'Moderate Exercise' -> codes 1 and 2
+    row = pd.DataFrame([[1, 30, 165.0, 60.0, 1400.0, 2]], columns=FEATURES)
+    expected = model.predict(scaler.transform(row))[0]
+    assert np.isclose(served.predict_user(60.0, 165.0, 30, 'Female', 'Moderate Exercise', 1400.0), expected)
+    with pytest.raises(ValueError):
+        served.predict(X.to_numpy()[:, :3])
@@ -0,0 +1,63 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+from nutriusher.candidates import CandidateIndex
+
+CONDITIONS = ['Diabetes', 'Heart Disease', 'Hypertension']
+
+
+def filter_catalog(user_input, food_data, meal):
+    """recommend_food as it was before the index: one mask per filter"""
+    meal_calories = user_input['Calories'] * {'Breakfast': 0.3, 'Lunch': 0.4, 'Dinner': 0.3}[meal]
+    filtered = food_data[food_data[meal] == 1]
+    if user_input['Diet'] != 'All':
+        filtered = filtered[filtered['Diet'] == (1 if user_input['Diet'] == 'Non-Veg' else 0)]
+    for condition in user_input['Condition']:
+        if condition == 'Diabetes':
+            filtered = filtered[filtered['Sugars'] < 5]
+        elif condition == 'Heart Disease':
+            filtered = filtered[filtered['Fats'] < 10]
+        elif condition == 'Hypertension':
+            filtered = filtered[filtered['Sodium'] < 500]
+    return filtered[filtered['Calories'] <= meal_calories]
+
+
+def condition_sets():
+    for size in range(len(CONDITIONS) + 1):
+        yield from (list(combination) for combination in itertools.combinations(CONDITIONS, size))
+
+
+@pytest.mark.parametrize('calories', [300, 1200, 2000, 3500])
+@pytest.mark.parametrize('diet', ['All', 'Veg', 'Non-Veg'])
+def test_recommend_matches_the_unindexed_filter(food_data, calories, diet):
+    index = CandidateIndex(food_data)
+    for meal in ('Breakfast', 'Lunch', 'Dinner'):
+        for conditions in condition_sets():
+            user_input = {'Calories': calories, 'Diet': diet, 'Condition': conditions}
+            pd.testing.assert_frame_equal(index.recommend(user_input, meal),
+                                          filter_catalog(user_input, food_data, meal))
+
+
+def test_calorie_ceiling_is_inclusive(food_data):
+    index = CandidateIndex(food_data)
+    # A ceiling exactly on a food's calories keeps that food
+    calories = float(food_data.loc[food_data['Lunch'] == 1, 'Calories'].iloc[0])
+    positions = index.lookup('Lunch', 'All', [], calories)
+    assert (food_data['Calories'].to_numpy()[positions] == calories).any()
+    assert (food_data['Calories'].to_numpy()[positions] <= calories).all()
+
+
+def test_recommend_food_on_an_unversioned_frame_builds_no_sampler(food_data, monkeypatch):
+    from nutriusher import catalog, planner
+
+    def no_sampler(food_data):
+        raise AssertionError('plan_sampler called for an unversioned frame')
+
+    monkeypatch.setattr(catalog, 'plan_sampler', no_sampler)
+    frame = food_data.copy()
+    frame.attrs = {}
+    user_input = {'Calories': 2000, 'Diet': 'Veg', 'Condition': ['Diabetes']}
+    pd.testing.assert_frame_equal(planner.recommend_food(user_input, frame, 'Lunch'),
+                                  filter_catalog(user_input, frame, 'Lunch'))
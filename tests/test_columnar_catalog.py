@@ -0,0 +1,69 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nutriusher.candidates import CandidateIndex
+from nutriusher.catalog import catalog_version
+from nutriusher.columnar_catalog import ColumnarCatalog, ingest, open_catalog
+from nutriusher.sampler import PlanSampler, item_matrix
+
+from conftest import ROOT, USER_INPUT
+
+
+@pytest.fixture(scope='module')
+def catalog_dir(tmp_path_factory):
+    out_dir = str(tmp_path_factory.mktemp('columnar') / 'catalog')
+    # Small chunks, so ingestion and scans cross chunk boundaries
+    ingest(os.path.join(ROOT, 'food.csv'), out_dir, chunk_rows=40)
+    return out_dir
+
+
+def test_round_trip_matches_the_csv_catalog(catalog_dir, food_data):
+    catalog = ColumnarCatalog(catalog_dir)
+    assert len(catalog) == len(food_data)
+    assert catalog.attrs['catalog_version'] == catalog_version(food_data)
+    frame = catalog.frame(np.arange(len(catalog)))
+    pd.testing.assert_frame_equal(frame.reset_index(drop=True), food_data, check_dtype=False,
+                                  check_categorical=False)
+    assert catalog.names.tolist() == food_data['Food_items'].tolist()
+    assert catalog.names[5] == food_data['Food_items'].iloc[5]
+
+
+def test_item_matrix_matches_the_dataframe(catalog_dir, food_data):
+    names, nutrients = ColumnarCatalog(catalog_dir).item_matrix()
+    expected_names, expected_nutrients = item_matrix(food_data)
+    assert names.tolist() == expected_names.tolist()
+    assert np.array_equal(nutrients, expected_nutrients)
+
+
+@pytest.mark.parametrize('diet, conditions', [('All', []), ('Veg', ['Diabetes']),
+                                              ('Non-Veg', ['Heart Disease', 'Hypertension'])])
+def test_scans_match_the_candidate_index(catalog_dir, food_data, diet, conditions):
+    catalog = ColumnarCatalog(catalog_dir)
+    index = CandidateIndex(food_data)
+    for meal in ('Breakfast', 'Lunch', 'Dinner'):
+        for max_calories in (150, 600.5, 1e9):
+            assert np.array_equal(catalog.scan(meal, diet, conditions, max_calories, chunk_rows=32),
+                                  index.lookup(meal, diet, conditions, max_calories))
+
+
+def test_sampler_plans_are_the_same_from_either_catalog(catalog_dir, food_data):
+    catalog = ColumnarCatalog(catalog_dir)
+    assert (PlanSampler(catalog).generate(USER_INPUT, seed=2) ==
+            PlanSampler(food_data).generate(USER_INPUT, seed=2))
+
+
+def test_catalogs_pickle_by_path_and_reopen_after_ingest(catalog_dir, tmp_path):
+    catalog = open_catalog(catalog_dir)
+    assert open_catalog(catalog_dir) is catalog
+    restored = pickle.loads(pickle.dumps(catalog))
+    assert restored.path == catalog.path and len(restored) == len(catalog)
+
+    out_dir = str(tmp_path / 'catalog')
+    ingest(os.path.join(ROOT, 'food.csv'), out_dir)
+    first = open_catalog(out_dir)
+    os.utime(os.path.join(out_dir, 'meta.json'), ns=(0, 0))
+    assert open_catalog(out_dir) is not first
@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+import zipfile
+
+from nutriusher import export
+from nutriusher.memory_firestore import SERVER_TIMESTAMP, MemoryFirestore
+from nutriusher.plan_codec import encode_plan
+from nutriusher.plan_store import PlanRepository
+from nutriusher.save_worker import PlanWriter
+from nutriusher.sampler import NO_MEAL_FOUND
+from nutriusher.tables import create_meal_plan_table
+
+
+def test_csv_matches_create_meal_plan_table(plan):
+    plan['Week 1 Day 2']['Dinner'] = NO_MEAL_FOUND
+    out = io.BytesIO()
+    rows = export.export_plan(plan, out, 'csv')
+    expected = create_meal_plan_table(plan).to_csv(index=False)
+    assert out.getvalue().decode('utf-8') == expected
+    assert rows == 4 * 7 * 3 - 1
+
+
+def test_compact_rows_match_plan_rows(plan, food_data):
+    names, nutrients = export.item_matrix(food_data)
+    compact = list(export.compact_rows(encode_plan(plan, food_data), names, nutrients))
+    nested = list(export.plan_rows(plan))
+    assert [row[:4] for row in compact] == [row[:4] for row in nested]
+    for compact_row, nested_row in zip(compact, nested):
+        assert [round(value, 6) for value in compact_row[4:]] == [round(value, 6) for value in nested_row[4:]]
+
+
+def test_jsonl_has_one_object_per_meal(plan):
+    out = io.BytesIO()
+    export.export_plan(plan, out, 'jsonl')
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert len(lines) == 84
+    assert list(lines[0]) == export.PLAN_COLUMNS
+    assert lines[0]['Week'] == 'Week 1' and lines[0]['Meal'] == 'Breakfast'
+
+
+def test_export_all_splits_xlsx_at_the_sheet_limit(plan, food_data, monkeypatch):
+    db = MemoryFirestore()
+    write = PlanWriter(PlanRepository(db, SERVER_TIMESTAMP), db)
+    # Compact and legacy plans, written by the save worker's writer
+    for i in range(3):
+        write({'id': f"plan{i}", 'user_id': 'u', 'plan_data': plan, 'user_metrics': {}})
+    db.collection('meal_plans').document('legacy').set({'user_id': 'u', 'plan_data': plan})
+
+    # Room for two plans per sheet, header included
+    monkeypatch.setattr(export.XlsxWriter, 'MAX_ROWS', 2 * 84 + 1)
+    out = io.BytesIO()
+    stats = export.export_all(db, food_data, out, 'xlsx', page_size=3)
+    assert stats == {'plans': 4, 'rows': 4 * 84, 'files': 2, 'skipped': 0}
+    with zipfile.ZipFile(out) as archive:
+        assert archive.namelist() == ['meal_plans.xlsx', 'meal_plans-2.xlsx']
+
+    out = io.BytesIO()
+    stats = export.export_all(db, food_data, out, 'csv')
+    assert stats['files'] == 1
+    with zipfile.ZipFile(out) as archive:
+        assert archive.namelist() == ['meal_plans.csv']
+        rows = list(csv.reader(io.StringIO(archive.read('meal_plans.csv').decode('utf-8'))))
+    assert len(rows) == 4 * 84 + 1
+
+
+def test_export_file_returns_bytes_in_every_format(plan):
+    for fmt in ('csv', 'jsonl', 'xlsx'):
+        out = io.BytesIO()
+        export.export_plan(plan, out, fmt)
+        data = export.export_file(plan, fmt)
+        # st.download_button rejects anything but str, bytes and a few stream types
+        assert type(data) is bytes
+        if fmt != 'xlsx':
+            # Zip entries carry their write time
+            assert data == out.getvalue()
+    with zipfile.ZipFile(io.BytesIO(export.export_file(plan, 'xlsx'))) as workbook:
+        assert 'xl/worksheets/sheet1.xml' in workbook.namelist()
@@ -0,0 +1,63 @@
+import itertools
+import time
+
+import numpy as np
+
+from nutriusher.optimizer import MacroSelector, macro_targets
+from nutriusher.sampler import MEALS, PlanSampler
+
+USER_INPUT = {'Calories': 2000, 'Diet': 'All', 'Condition': []}
+
+
+def random_nutrients(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # Calories, proteins, carbs, fats
+    return rng.uniform([20, 0, 0, 0], [600, 40, 80, 40], size=(n, 4))
+
+
+def test_select_returns_within_its_deadline():
+    # Shortlist large enough that the search over triples cannot finish
+    selector = MacroSelector(random_nutrients(3000), shortlist=400)
+    target = macro_targets(USER_INPUT, 'Lunch')
+    start = time.perf_counter()
+    chosen = selector.select(np.arange(3000), target, deadline=start + 0.01)
+    elapsed = time.perf_counter() - start
+    # One chunk of triples may run past the deadline
+    assert elapsed < 0.25
+    assert selector.stats == {'exact': 0, 'greedy': 1}
+    assert 2 <= len(chosen) <= 3
+    assert len(set(chosen.tolist())) == len(chosen)
+
+
+def test_select_falls_back_to_greedy_after_the_deadline():
+    selector = MacroSelector(random_nutrients(50))
+    chosen = selector.select(np.arange(50), macro_targets(USER_INPUT, 'Dinner'),
+                             deadline=time.perf_counter() - 1)
+    assert 2 <= len(chosen) <= 3
+    assert selector.stats['greedy'] == 1
+
+
+def test_select_finds_the_best_combination_when_time_allows():
+    nutrients = random_nutrients(25, seed=3)
+    selector = MacroSelector(nutrients, time_budget=10)
+    target = macro_targets(USER_INPUT, 'Breakfast')
+    candidates = np.arange(5, 25)
+    chosen = candidates[selector.select(candidates, target)]
+    assert selector.stats == {'exact': 1, 'greedy': 0}
+
+    def cost(items):
+        totals = nutrients[list(items)].sum(axis=0)
+        return (((totals - target) / target) ** 2).sum()
+
+    best = min((combination for size in (2, 3) for combination in itertools.combinations(candidates, size)),
+               key=cost)
+    assert np.isclose(cost(chosen), cost(best))
+
+
+def test_optimized_plans_stay_within_the_time_budget(food_data):
+    sampler = PlanSampler(food_data)
+    start = time.perf_counter()
+    picks = sampler.sample_positions(USER_INPUT, seed=1, optimize=True, time_budget=0.05)
+    assert time.perf_counter() - start < 1.0
+    for meal in MEALS:
+        assert all(2 <= len(positions) <= 3 for positions in picks[meal])
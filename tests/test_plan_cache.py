@@ -0,0 +1,56 @@
+from nutriusher.plan_cache import PlanCache
+from nutriusher.planner import generate_four_week_plan
+
+
+def user(calories, diet='All', conditions=()):
+    return {'Calories': calories, 'Diet': diet, 'Condition': list(conditions)}
+
+
+def test_users_in_one_bucket_share_the_plan_for_its_bottom(food_data):
+    cache = PlanCache(bucket_width=50)
+    first = cache.table(user(2010), food_data)
+    assert cache.table(user(2049.9), food_data) is first
+    assert cache.stats()['hits'] == 1
+    # Generated for the bottom of the band, so within every user's limits
+    assert cache.generate(user(2030), food_data) == generate_four_week_plan(user(2000), food_data)
+    assert cache.table(user(2050), food_data) is not first
+
+
+def test_key_normalizes_diet_and_conditions(food_data):
+    cache = PlanCache()
+    assert (cache.key(user(1800, conditions=['Hypertension', 'Diabetes']), food_data) ==
+            cache.key(user(1820, conditions=['Diabetes', 'Hypertension', 'Unknown']), food_data))
+    assert cache.key(user(1800, 'Veg'), food_data) != cache.key(user(1800, 'Non-Veg'), food_data)
+    assert cache.key(user(1800), food_data) != cache.key(user(1800), food_data, optimize=True)
+
+
+def test_generated_plans_are_copies(food_data):
+    cache = PlanCache()
+    plan = cache.generate(user(2000), food_data)
+    plan['Week 1 Day 1']['Lunch'] = []
+    assert cache.generate(user(2000), food_data)['Week 1 Day 1']['Lunch'] != []
+
+
+def test_least_recently_used_plans_are_evicted_past_max_bytes(food_data):
+    size = PlanCache().table(user(2000), food_data).nbytes
+    cache = PlanCache(max_bytes=2 * size)
+    a = cache.table(user(2000), food_data)
+    cache.table(user(2100), food_data)
+    # Touch the first bucket so the second is the least recently used
+    assert cache.table(user(2000), food_data) is a
+    cache.table(user(2200), food_data)
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['evictions'] == 1
+    assert stats['size'] <= 2 * size
+    assert cache.table(user(2000), food_data) is a
+    misses = cache.stats()['misses']
+    cache.table(user(2100), food_data)
+    assert cache.stats()['misses'] == misses + 1
+
+
+def test_catalogs_without_a_version_are_not_cached(food_data):
+    cache = PlanCache()
+    unversioned = food_data.copy()
+    unversioned.attrs.pop('catalog_version', None)
+    cache.generate(user(2000), unversioned)
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from nutriusher.catalog import catalog_version
+from nutriusher.memory_firestore import MemoryFirestore
+from nutriusher.plan_codec import (
+    CATALOGS, decode_plan, encode_plan, is_compact, load_catalog_snapshot,
+    migrate_plan_data, plan_totals, store_catalog_snapshot
+)
+from nutriusher.sampler import NO_MEAL_FOUND, item_matrix
+
+
+def test_encode_decode_round_trip(plan, food_data):
+    encoded = encode_plan(plan, food_data)
+    assert is_compact(encoded)
+    assert encoded['catalog_version'] == catalog_version(food_data)
+    assert decode_plan(encoded, food_data) == plan
+
+
+def test_round_trip_keeps_meals_without_items(plan, food_data):
+    plan['Week 1 Day 1']['Lunch'] = NO_MEAL_FOUND
+    assert decode_plan(encode_plan(plan, food_data), food_data) == plan
+
+
+def test_totals_match_the_items(plan, food_data):
+    meal_totals, day_totals = plan_totals(encode_plan(plan, food_data))
+    lunch = plan['Week 2 Day 3']['Lunch']
+    expected = [sum(item[field] for item in lunch) for field in ('Calories', 'Proteins', 'Carbs', 'Fats')]
+    assert np.allclose(meal_totals[9, 1], expected, rtol=1e-5)
+    assert np.allclose(day_totals, meal_totals.sum(axis=1), rtol=1e-5)
+
+
+def test_encode_rejects_foods_not_in_the_catalog(plan, food_data):
+    plan['Week 1 Day 1']['Breakfast'][0]['Food'] = 'Not a food'
+    with pytest.raises(ValueError):
+        encode_plan(plan, food_data)
+    assert migrate_plan_data(plan, food_data) is None
+
+
+def test_legacy_plans_pass_through(plan, food_data):
+    assert not is_compact(plan)
+    assert decode_plan(plan, food_data) is plan
+
+
+def test_decode_checks_the_catalog_version(plan, food_data):
+    encoded = encode_plan(plan, food_data)
+    encoded['catalog_version'] = 'other'
+    with pytest.raises(ValueError):
+        decode_plan(encoded, food_data)
+
+
+def test_catalog_snapshot_round_trip_in_chunks(plan, food_data):
+    db = MemoryFirestore()
+    store_catalog_snapshot(db, food_data, chunk_rows=100)
+    version = catalog_version(food_data)
+    header = db.collection(CATALOGS).document(version).get().to_dict()
+    assert header['chunks'] == -(-len(food_data) // 100)
+    assert 'Food_items' not in header
+
+    restored = load_catalog_snapshot(db, version)
+    assert catalog_version(restored) == version
+    names, nutrients = item_matrix(food_data)
+    restored_names, restored_nutrients = item_matrix(restored)
+    assert restored_names.tolist() == names.tolist()
+    assert np.array_equal(restored_nutrients, nutrients)
+    assert decode_plan(encode_plan(plan, food_data), restored) == plan
+
+
+def test_missing_or_incomplete_snapshots_load_as_none(food_data):
+    db = MemoryFirestore()
+    assert load_catalog_snapshot(db, 'missing') is None
+
+    store_catalog_snapshot(db, food_data, chunk_rows=100)
+    version = catalog_version(food_data)
+    db.collection(CATALOGS).document(version).collection('chunks').document('00001').delete()
+    assert load_catalog_snapshot(db, version) is None
+
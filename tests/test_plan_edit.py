@@ -0,0 +1,61 @@
+import copy
+
+import pytest
+
+from nutriusher.catalog import plan_sampler
+from nutriusher.plan_edit import PlanEditor
+from nutriusher.sampler import MEALS
+
+from conftest import USER_INPUT
+
+
+@pytest.fixture
+def editor(food_data):
+    return PlanEditor(plan_sampler(food_data), USER_INPUT)
+
+
+def changed_slots(before, after):
+    return {(day_id, meal) for day_id in before for meal in MEALS
+            if before[day_id][meal] != after[day_id][meal]}
+
+
+def foods(plan, day_id, meal):
+    return {item['Food'] for item in plan[day_id][meal]}
+
+
+def test_regenerate_slot_changes_only_that_meal(editor, plan):
+    before = copy.deepcopy(plan)
+    assert editor.regenerate_slot(plan, 'Week 2 Day 3', 'Lunch', seed=1) == ['Week 2 Day 3']
+    assert changed_slots(before, plan) == {('Week 2 Day 3', 'Lunch')}
+    # Nothing the slot had, nor anything nearby, comes back
+    day_ids = list(plan)
+    slot = day_ids.index('Week 2 Day 3')
+    nearby = set().union(*(foods(before, day_id, 'Lunch') for day_id in day_ids[slot - 7:slot + 8]))
+    assert not foods(plan, 'Week 2 Day 3', 'Lunch') & nearby
+
+
+def test_swap_item_changes_only_that_item(editor, plan):
+    before = copy.deepcopy(plan)
+    editor.swap_item(plan, 'Week 1 Day 1', 'Dinner', 1, seed=2)
+    assert changed_slots(before, plan) == {('Week 1 Day 1', 'Dinner')}
+    old, new = before['Week 1 Day 1']['Dinner'], plan['Week 1 Day 1']['Dinner']
+    assert [old[0], old[2]] == [new[0], new[2]]
+    assert old[1] != new[1]
+    with pytest.raises(IndexError):
+        editor.swap_item(plan, 'Week 1 Day 1', 'Dinner', 3)
+
+
+def test_regenerate_day_changes_only_that_day(editor, plan):
+    before = copy.deepcopy(plan)
+    assert editor.regenerate_day(plan, 'Week 4 Day 7', seed=3) == ['Week 4 Day 7']
+    assert {day_id for day_id, _ in changed_slots(before, plan)} == {'Week 4 Day 7'}
+
+
+def test_regenerate_week_changes_only_that_week(editor, plan):
+    before = copy.deepcopy(plan)
+    changed = editor.regenerate_week(plan, 3, seed=4)
+    assert changed == [f"Week 3 Day {day}" for day in range(1, 8)]
+    assert {day_id for day_id, _ in changed_slots(before, plan)} <= set(changed)
+    for day_id in before:
+        if day_id not in changed:
+            assert plan[day_id] == before[day_id]
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta, timezone
+
+from nutriusher.memory_firestore import SERVER_TIMESTAMP, MemoryFirestore
+from nutriusher.plan_store import CachedPlanRepository, PlanRepository
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_repository(plans=10, others=3):
+    repository = PlanRepository(MemoryFirestore(), SERVER_TIMESTAMP)
+    for i in range(plans):
+        repository.put('alice', f"plan{i}", {
+            'user_id': 'alice',
+            'created_at': START + timedelta(minutes=i),
+            'plan_data': {'i': i},
+            'user_metrics': {'weight': 60.0 + i}
+        })
+    for i in range(others):
+        repository.put('bob', f"other{i}", {
+            'user_id': 'bob',
+            'created_at': START + timedelta(minutes=i),
+            'plan_data': {},
+            'user_metrics': {}
+        })
+    return repository
+
+
+def list_all(repository, user_id, page_size):
+    pages = []
+    cursor = None
+    while True:
+        page, cursor = repository.list_summaries(user_id, page_size, cursor)
+        pages.append([summary['id'] for summary in page])
+        if cursor is None:
+            return pages
+
+
+def test_list_summaries_pages_newest_first():
+    pages = list_all(make_repository(), 'alice', 4)
+    assert pages == [
+        ['plan9', 'plan8', 'plan7', 'plan6'],
+        ['plan5', 'plan4', 'plan3', 'plan2'],
+        ['plan1', 'plan0']
+    ]
+
+
+def test_list_summaries_has_no_cursor_after_a_full_last_page():
+    repository = make_repository(plans=8)
+    first, cursor = repository.list_summaries('alice', 4)
+    second, cursor = repository.list_summaries('alice', 4, cursor)
+    assert [summary['id'] for summary in second] == ['plan3', 'plan2', 'plan1', 'plan0']
+    assert cursor is None
+
+
+def test_list_summaries_leaves_out_plan_data_and_other_users():
+    page, cursor = make_repository().list_summaries('bob', 10)
+    assert cursor is None
+    assert [summary['id'] for summary in page] == ['other2', 'other1', 'other0']
+    assert all(set(summary) == {'id', 'created_at', 'user_metrics'} for summary in page)
+
+
+def test_cached_repository_reads_its_own_writes():
+    repository = CachedPlanRepository(make_repository(plans=2), flush_interval=None)
+    assert [summary['id'] for summary in repository.list_summaries('alice', 10)[0]] == ['plan1', 'plan0']
+
+    plan_id = repository.save('alice', {'new': True}, {})
+    # Queued, not committed yet, but readable
+    assert repository.pending() == 1
+    assert repository.get_plan_data(plan_id) == {'new': True}
+    assert plan_id in [summary['id'] for summary in repository.list_summaries('alice', 10)[0]]
+    assert repository.pending() == 0
+
+    repository.delete(plan_id)
+    assert plan_id not in [summary['id'] for summary in repository.list_summaries('alice', 10)[0]]
+    assert repository.get_plan_data(plan_id) is None
+
+
+def test_cached_repository_keeps_writes_queued_when_a_commit_fails():
+    backend = make_repository(plans=0)
+    repository = CachedPlanRepository(backend, flush_interval=None)
+    commit = backend.commit
+
+    def failing_commit(operations):
+        raise ConnectionError("offline")
+
+    backend.commit = failing_commit
+    plan_id = repository.save('alice', {'i': 1}, {})
+    try:
+        repository.flush()
+    except ConnectionError:
+        pass
+    assert repository.pending() == 1
+
+    backend.commit = commit
+    repository.flush()
+    assert repository.pending() == 0
+    assert backend.get_plan_data(plan_id) == {'i': 1}
+
+
+def test_put_commits_at_once_with_the_queued_writes():
+    backend = make_repository(plans=0)
+    repository = CachedPlanRepository(backend, flush_interval=60)
+    queued = repository.save('alice', {'i': 1}, {})
+    repository.put('alice', 'put', {'user_id': 'alice', 'plan_data': {'i': 2}})
+    assert repository.pending() == 0
+    assert repository.commits == 1
+    assert backend.get_plan_data(queued) == {'i': 1}
+    assert backend.get_plan_data('put') == {'i': 2}
+
+
+def test_a_write_during_a_backend_read_is_not_cached():
+    backend = make_repository(plans=1)
+    repository = CachedPlanRepository(backend, flush_interval=None)
+    list_summaries = backend.list_summaries
+    get_plan_data = backend.get_plan_data
+    written = []
+
+    def list_then_save(*args):
+        result = list_summaries(*args)
+        written.append(repository.save('alice', {'new': True}, {}))
+        return result
+
+    def read_then_put(plan_id):
+        plan_data = get_plan_data(plan_id)
+        repository.put('alice', plan_id, {'user_id': 'alice', 'plan_data': {'i': 'updated'}})
+        return plan_data
+
+    backend.list_summaries = list_then_save
+    assert [summary['id'] for summary in repository.list_summaries('alice', 10)[0]] == ['plan0']
+    backend.list_summaries = list_summaries
+    assert written[0] in [summary['id'] for summary in repository.list_summaries('alice', 10)[0]]
+
+    backend.get_plan_data = read_then_put
+    assert repository.get_plan_data('plan0') == {'i': 0}
+    backend.get_plan_data = get_plan_data
+    assert repository.get_plan_data('plan0') == {'i': 'updated'}
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from nutriusher.catalog import plan_sampler
+from nutriusher.plan_table import PlanTable
+from nutriusher.sampler import NO_MEAL_FOUND
+from nutriusher.tables import calculate_nutrition
+
+from conftest import USER_INPUT
+
+MACROS = ['Calories', 'Proteins', 'Carbs', 'Fats']
+
+
+def daily_plan(plan, day_id, food_data):
+    """calculate_nutrition input for one plan day: meal -> catalog rows"""
+    by_name = food_data.set_index('Food_items')
+    return {meal: by_name.loc[[item['Food'] for item in items]].reset_index()
+            for meal, items in plan[day_id].items() if isinstance(items, list)}
+
+
+def test_day_rollups_match_calculate_nutrition(plan, food_data):
+    plan['Week 1 Day 3']['Dinner'] = NO_MEAL_FOUND
+    days = PlanTable.from_plan(plan).rollup('day')
+    for row, day_id in zip(days.itertuples(index=False), plan):
+        expected = calculate_nutrition(daily_plan(plan, day_id, food_data))
+        assert f"Week {row.week} Day {row.day}" == day_id
+        assert np.allclose([getattr(row, column) for column in MACROS],
+                           [expected[column] for column in MACROS], rtol=1e-5)
+
+
+def test_meal_rollups_match_calculate_nutrition(plan, food_data):
+    meals = PlanTable.from_plan(plan).rollup('meal')
+    assert len(meals) == 84
+    for row in meals.head(9).itertuples(index=False):
+        day_id = f"Week {row.week} Day {row.day}"
+        meal = ['Breakfast', 'Lunch', 'Dinner'][row.meal]
+        expected = calculate_nutrition({meal: daily_plan(plan, day_id, food_data)[meal]})
+        assert np.allclose([getattr(row, column) for column in MACROS],
+                           [expected[column] for column in MACROS], rtol=1e-5)
+
+
+def test_week_and_plan_rollups_add_up(plan):
+    table = PlanTable.from_plan(plan)
+    days = table.rollup('day')
+    weeks = table.rollup('week')
+    assert weeks['week'].tolist() == [1, 2, 3, 4]
+    assert np.allclose(weeks[MACROS].to_numpy(), days.groupby('week')[MACROS].sum().to_numpy())
+    totals = table.totals()
+    assert np.allclose([totals[column] for column in MACROS], days[MACROS].sum().to_numpy())
+    with pytest.raises(ValueError):
+        table.rollup('month')
+
+
+def test_sampled_tables_match_item_dict_plans(food_data):
+    sampler = plan_sampler(food_data)
+    picks = sampler.sample_positions(USER_INPUT, seed=5)
+    table = sampler.to_table(picks)
+    plan = sampler.to_plan(picks)
+    assert table.to_plan() == plan
+    assert np.allclose(table.rollup('day')[MACROS].to_numpy(),
+                       PlanTable.from_plan(plan).rollup('day')[MACROS].to_numpy())
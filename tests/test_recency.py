@@ -0,0 +1,69 @@
+from collections import Counter
+
+import numpy as np
+
+from nutriusher.catalog import plan_sampler
+from nutriusher.plan_edit import PlanEditor
+from nutriusher.planner import generate_four_week_plan
+from nutriusher.recency import RecencyWindow
+
+
+def test_available_leaves_out_the_last_history_picks():
+    window = RecencyWindow(10, history=4)
+    window.push([0, 1, 2])
+    window.push([3, 4])
+    # 0 fell out of the window, 1..4 are in it
+    assert window.available().tolist() == [0, 5, 6, 7, 8, 9]
+    assert window.ages().tolist() == [5, 4, 3, 2, 1, 5, 5, 5, 5, 5]
+
+
+def test_least_recent_puts_never_used_first():
+    window = RecencyWindow(5, history=10)
+    window.push([3, 1, 4])
+    assert window.least_recent(3).tolist() == [0, 2, 3]
+
+
+def test_sample_is_weighted_towards_the_least_recently_used():
+    window = RecencyWindow(4, history=8)
+    window.push([0, 1, 2, 3, 3, 2, 1])
+    # Ages 7, 1, 2, 3: item 0 is drawn far more often than item 1
+    rng = np.random.default_rng(0)
+    counts = Counter(window.sample(rng, 1)[0] for _ in range(2000))
+    assert counts[0] > counts[3] > counts[2] > counts[1]
+    # Without replacement, and never more items than exist
+    assert sorted(window.sample(rng, 10).tolist()) == [0, 1, 2, 3]
+
+
+def test_editor_falls_back_to_the_foods_used_furthest_away(food_data):
+    user_input = {'Calories': 2500, 'Diet': 'Non-Veg', 'Condition': []}
+    sampler = plan_sampler(food_data)
+    editor = PlanEditor(sampler, user_input)
+    plan = generate_four_week_plan(user_input, food_data, seed=1)
+    day_ids = list(plan)
+    recent, near, far, unused = editor.candidates('Breakfast')
+    # Only four breakfasts fit; place them 0, 1 and 6 days from Week 3 Day 1
+    for slot, day_id in enumerate(day_ids):
+        distance = abs(slot - 14)
+        food = near if distance == 1 else far if distance == 6 else recent
+        plan[day_id]['Breakfast'] = sampler.items([food])
+
+    picks = Counter()
+    for seed in range(300):
+        editor.regenerate_slot(plan, 'Week 3 Day 1', 'Breakfast', seed=seed)
+        items = plan['Week 3 Day 1']['Breakfast']
+        # Never fewer items because the window ran out
+        assert len(items) == 3
+        picks.update(editor.positions[item['Food']] for item in items)
+        plan['Week 3 Day 1']['Breakfast'] = sampler.items([recent])
+    assert picks[unused] > picks[far] > picks[near] > picks[recent]
+
+
+def test_swapped_item_is_not_one_the_meal_keeps(food_data):
+    user_input = {'Calories': 2500, 'Diet': 'Non-Veg', 'Condition': []}
+    sampler = plan_sampler(food_data)
+    editor = PlanEditor(sampler, user_input)
+    plan = generate_four_week_plan(user_input, food_data, seed=1)
+    for seed in range(50):
+        editor.swap_item(plan, 'Week 2 Day 2', 'Breakfast', 0, seed=seed)
+        foods = [item['Food'] for item in plan['Week 2 Day 2']['Breakfast']]
+        assert len(set(foods)) == 3
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nutriusher.planner import generate_four_week_plan
+from nutriusher.sampler import MEALS, NO_MEAL_FOUND, PlanSampler
+
+from conftest import ROOT
+
+
+@pytest.fixture(scope='module')
+def raw_food_data():
+    # As the pages read it before the catalog loader stripped names and
+    # narrowed the columns
+    return pd.read_csv(os.path.join(ROOT, 'food.csv'))
+
+
+def sample_with_pandas(user_input, food_data):
+    """
+    The original DataFrame.sample/iterrows generator
+
+    Returns the plan and, per meal, the number of leading slots the legacy
+    sampler must reproduce: the original trims its used-meal set in set
+    order, which depends on string hashing, and clears it when it runs out
+    of unused candidates; slots after either are not comparable.
+    """
+    shares = {'Breakfast': 0.3, 'Lunch': 0.4, 'Dinner': 0.3}
+    used_meals = {meal: set() for meal in MEALS}
+    comparable = {meal: None for meal in MEALS}
+    full_plan = {}
+    for week in range(1, 5):
+        for day in range(1, 8):
+            slot = (week - 1) * 7 + day - 1
+            day_menu = {}
+            for meal in MEALS:
+                recommendations = food_data[(food_data[meal] == 1) &
+                                            (food_data['Calories'] <= user_input['Calories'] * shares[meal])]
+                if user_input['Diet'] != 'All':
+                    recommendations = recommendations[
+                        recommendations['Diet'] == (1 if user_input['Diet'] == 'Non-Veg' else 0)]
+                if recommendations.empty:
+                    day_menu[meal] = NO_MEAL_FOUND
+                    continue
+                available = recommendations[~recommendations['Food_items'].isin(used_meals[meal])]
+                if len(available) < 3:
+                    if comparable[meal] is None:
+                        comparable[meal] = slot
+                    used_meals[meal].clear()
+                    available = recommendations
+                selected = available.sample(n=min(3, len(available)), random_state=week * 100 + day)
+                used_meals[meal].update(selected['Food_items'].tolist())
+                if len(used_meals[meal]) > 21:
+                    if comparable[meal] is None:
+                        comparable[meal] = slot + 1
+                    used_meals[meal] = set(list(used_meals[meal])[-21:])
+                day_menu[meal] = [
+                    {'Food': item['Food_items'], 'Calories': item['Calories'], 'Proteins': item['Proteins'],
+                     'Carbs': item['Carbohydrates'], 'Fats': item['Fats'], 'Sugars': item['Sugars'],
+                     'Sodium': item['Sodium']}
+                    for _, item in selected.iterrows()
+                ]
+            full_plan[f"Week {week} Day {day}"] = day_menu
+    return full_plan, {meal: 28 if slots is None else slots for meal, slots in comparable.items()}
+
+
+@pytest.mark.parametrize('user_input', [
+    {'Calories': 2000, 'Diet': 'All', 'Condition': []},
+    {'Calories': 1800, 'Diet': 'Veg', 'Condition': []},
+    {'Calories': 2500, 'Diet': 'Non-Veg', 'Condition': []},
+    {'Calories': 100, 'Diet': 'All', 'Condition': []}
+])
+def test_legacy_mode_matches_dataframe_sample(raw_food_data, user_input):
+    expected, comparable = sample_with_pandas(user_input, raw_food_data)
+    plan = PlanSampler(raw_food_data).generate(user_input)
+    assert list(plan) == list(expected)
+    days = list(plan)
+    for meal in MEALS:
+        for day_id in days[:comparable[meal]]:
+            assert plan[day_id][meal] == expected[day_id][meal], (day_id, meal)
+
+
+def test_legacy_mode_keeps_the_seed_per_day_up_to_the_first_trim(raw_food_data):
+    # Rich enough that all of week 1 and the first day of week 2 compare
+    _, comparable = sample_with_pandas({'Calories': 2000, 'Diet': 'All', 'Condition': []}, raw_food_data)
+    assert min(comparable.values()) >= 8
+
+
+def test_no_item_repeats_within_the_window(food_data):
+    sampler = PlanSampler(food_data)
+    picks = sampler.sample_positions({'Calories': 2000, 'Diet': 'All', 'Condition': []}, seed=7)
+    for meal in MEALS:
+        flat = np.concatenate(picks[meal])
+        for end in range(21, len(flat) + 1):
+            assert len(set(flat[end - 21:end].tolist())) == 21
+
+
+def test_seeded_plans_are_reproducible(food_data):
+    user_input = {'Calories': 1500, 'Diet': 'Veg', 'Condition': ['Diabetes']}
+    assert (generate_four_week_plan(user_input, food_data, seed=3) ==
+            generate_four_week_plan(user_input, food_data, seed=3))
+    assert (generate_four_week_plan(user_input, food_data, seed=3) !=
+            generate_four_week_plan(user_input, food_data, seed=4))
@@ -0,0 +1,184 @@
+import os
+import threading
+
+import pytest
+
+from nutriusher.save_worker import SaveQueueFull, SaveWorker
+
+
+class FlakyWrite:
+    """Fails the first ``failures`` calls, then records the saved jobs"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.saved = []
+
+    def __call__(self, job):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError(f"attempt {self.calls} failed")
+        self.saved.append(job['id'])
+
+
+def spooled(spool):
+    return sorted(name for name in os.listdir(spool) if name.endswith('.pkl'))
+
+
+def failed(spool):
+    return sorted(os.listdir(os.path.join(spool, 'failed')))
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return str(tmp_path / 'spool')
+
+
+def test_failed_writes_are_retried(spool):
+    write = FlakyWrite(failures=2)
+    worker = SaveWorker(write, spool, base_delay=0.001, max_delay=0.01)
+    try:
+        worker.submit({'id': 'a'})
+        assert worker.drain(timeout=5)
+        assert write.saved == ['a']
+        assert worker.status('a') == {'state': 'saved', 'attempts': 3, 'error': None}
+        assert worker.metrics()['retries'] == 2
+        assert spooled(spool) == []
+    finally:
+        worker.stop(timeout=5)
+
+
+def test_jobs_that_keep_failing_move_to_failed_and_can_be_retried(spool):
+    write = FlakyWrite(failures=3)
+    worker = SaveWorker(write, spool, max_attempts=3, base_delay=0.001, max_delay=0.01)
+    try:
+        worker.submit({'id': 'a'})
+        assert worker.drain(timeout=5)
+        status = worker.status('a')
+        assert status['state'] == 'failed'
+        assert status['attempts'] == 3
+        assert 'attempt 3 failed' in status['error']
+        assert spooled(spool) == []
+        assert failed(spool) == ['a.pkl']
+
+        assert worker.retry_failed() == 1
+        assert worker.drain(timeout=5)
+        assert worker.status('a')['state'] == 'saved'
+        assert write.saved == ['a']
+        assert failed(spool) == []
+    finally:
+        worker.stop(timeout=5)
+
+
+def test_a_fresh_worker_retries_failed_jobs_from_an_earlier_process(spool):
+    first = SaveWorker(FlakyWrite(failures=100), spool, max_attempts=1)
+    first.submit({'id': 'a'})
+    assert first.drain(timeout=5)
+    first.stop(timeout=5)
+    assert failed(spool) == ['a.pkl']
+    with open(os.path.join(spool, 'failed', 'broken.pkl'), 'wb') as f:
+        f.write(b'not a pickle')
+
+    write = FlakyWrite()
+    worker = SaveWorker(write, spool)
+    try:
+        assert worker.status('a') is None
+        assert worker.retry_failed() == 1
+        assert worker.drain(timeout=5)
+        assert write.saved == ['a']
+        assert worker.status('a')['state'] == 'saved'
+        # Unreadable jobs stay in failed/ for a look by hand
+        assert failed(spool) == ['broken.pkl']
+        assert spooled(spool) == []
+    finally:
+        worker.stop(timeout=5)
+
+def test_spooled_jobs_are_recovered_by_the_next_worker(spool):
+    # The first process stops while its save waits for a retry
+    stopped = SaveWorker(FlakyWrite(failures=100), spool, base_delay=60, max_delay=60)
+    stopped.submit({'id': 'a', 'plan_data': {'Week 1 Day 1': {}}})
+    stopped.submit({'id': 'b'})
+    stopped.stop(timeout=5)
+    assert spooled(spool) == ['a.pkl', 'b.pkl']
+
+    write = FlakyWrite()
+    worker = SaveWorker(write, spool)
+    try:
+        assert worker.drain(timeout=5)
+        assert sorted(write.saved) == ['a', 'b']
+        assert worker.metrics()['recovered'] == 2
+        assert spooled(spool) == []
+    finally:
+        worker.stop(timeout=5)
+
+
+def test_submit_refuses_jobs_beyond_max_pending(spool):
+    worker = SaveWorker(FlakyWrite(failures=100), spool, max_pending=2, base_delay=60, max_delay=60)
+    try:
+        worker.submit({'id': 'a'})
+        worker.submit({'id': 'b'})
+        with pytest.raises(SaveQueueFull):
+            worker.submit({'id': 'c'})
+    finally:
+        worker.stop(timeout=5)
+
+
+def test_concurrent_submits_stay_within_max_pending(spool):
+    worker = SaveWorker(FlakyWrite(failures=10 ** 6), spool, max_pending=5, base_delay=60, max_delay=60)
+    start = threading.Barrier(20)
+    refused = []
+
+    def submit(i):
+        start.wait()
+        try:
+            worker.submit({'id': f"job{i}", 'plan_data': list(range(10000))})
+        except SaveQueueFull:
+            refused.append(i)
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(20)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert worker.depth() == 5
+        assert len(refused) == 15
+        assert len(spooled(spool)) == 5
+    finally:
+        worker.stop(timeout=5)
+
+
+def test_failed_spool_write_frees_the_slot(spool):
+    worker = SaveWorker(FlakyWrite(), spool, max_pending=1)
+    try:
+        with pytest.raises(Exception):
+            # Not picklable
+            worker.submit({'id': 'a', 'plan_data': lambda: None})
+        assert worker.depth() == 0
+        assert worker.status('a') is None
+        assert os.listdir(spool) == ['failed']
+        worker.submit({'id': 'b'})
+        assert worker.drain(timeout=5)
+        assert worker.status('b')['state'] == 'saved'
+    finally:
+        worker.stop(timeout=5)
+
+
+def test_later_edits_to_a_submitted_plan_are_not_saved(spool):
+    saved = []
+    release = threading.Event()
+
+    def write(job):
+        release.wait(5)
+        saved.append(job['plan_data'])
+
+    worker = SaveWorker(write, spool)
+    try:
+        plan = {'Week 1 Day 1': {'Breakfast': [{'Food': 'Oats'}]}}
+        worker.submit({'id': 'a', 'plan_data': plan})
+        plan['Week 1 Day 1']['Breakfast'][0]['Food'] = 'Eggs'
+        release.set()
+        assert worker.drain(timeout=5)
+        assert saved == [{'Week 1 Day 1': {'Breakfast': [{'Food': 'Oats'}]}}]
+    finally:
+        worker.stop(timeout=5)
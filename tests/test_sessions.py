@@ -0,0 +1,92 @@
+import time
+
+import jwt
+import pytest
+
+from nutriusher.local_auth import LocalKeyPair
+from nutriusher.sessions import SessionError, SessionManager, SigningKeyCache, TokenVerifier, active_user
+
+
+@pytest.fixture(scope='module')
+def provider():
+    provider = LocalKeyPair()
+    provider.add_user('a@example.com', 'secret', uid='uid-a')
+    return provider
+
+
+@pytest.fixture
+def verifier(provider):
+    keys = SigningKeyCache(provider.fetch_keys)
+    yield TokenVerifier(provider.project_id, keys, leeway=0)
+    keys.close()
+
+
+def test_valid_token_is_accepted(provider, verifier):
+    claims = verifier.verify(provider.mint_token('uid-a', 'a@example.com'))
+    assert claims['sub'] == 'uid-a'
+    assert claims['email'] == 'a@example.com'
+
+
+def test_expired_token_is_rejected(provider, verifier):
+    token = provider.mint_token('uid-a', issued_at=time.time() - 7200, lifetime=3600)
+    with pytest.raises(SessionError, match="expired"):
+        verifier.verify(token)
+
+
+def test_tampered_claims_are_rejected(provider, verifier):
+    header, payload, signature = provider.mint_token('uid-a').split('.')
+    forged = jwt.utils.base64url_encode(
+        jwt.utils.base64url_decode(payload).replace(b'uid-a', b'uid-b')).decode()
+    with pytest.raises(SessionError):
+        verifier.verify('.'.join([header, forged, signature]))
+
+
+def test_token_signed_with_another_key_is_rejected(provider, verifier):
+    other = LocalKeyPair(project_id=provider.project_id, kid=provider.kid)
+    with pytest.raises(SessionError):
+        verifier.verify(other.mint_token('uid-a'))
+
+
+def test_token_for_another_project_is_rejected(provider, verifier):
+    with pytest.raises(SessionError):
+        verifier.verify(provider.mint_token('uid-a', aud='someone-else'))
+
+
+def test_unsigned_and_malformed_tokens_are_rejected(provider, verifier):
+    unsigned = jwt.encode({'sub': 'uid-a'}, key=None, algorithm='none', headers={'kid': provider.kid})
+    for token in (unsigned, 'not.a.token', ''):
+        with pytest.raises(SessionError):
+            verifier.verify(token)
+
+
+def test_login_and_session_expiry(provider, verifier):
+    manager = SessionManager(verifier, provider.sign_in)
+    session = manager.login('a@example.com', 'secret')
+    assert session['uid'] == 'uid-a'
+    with pytest.raises(SessionError):
+        manager.login('a@example.com', 'wrong')
+    assert manager.latency_stats()['failures'] == 1
+
+    state = {'user': session}
+    assert active_user(state) is session
+    assert active_user(state, clock=lambda: session['expires_at'] + 1) is None
+    assert 'user' not in state
+
+
+def test_bootstrap_session_manager_keeps_its_api_key(monkeypatch):
+    from types import SimpleNamespace
+
+    from nutriusher import bootstrap
+
+    monkeypatch.setattr(bootstrap, '_resources', {'firebase_app': SimpleNamespace(project_id='demo')})
+    monkeypatch.setattr(bootstrap, '_session_api_key', None)
+    monkeypatch.setattr(bootstrap, 'timings', {})
+    manager = bootstrap.session_manager('key')
+    assert bootstrap.session_manager('key') is manager
+    assert manager.sign_in.args == ('key',)
+    with pytest.raises(ValueError):
+        bootstrap.session_manager('other')
+
+    installed = SessionManager(None, None)
+    bootstrap.install('session_manager', installed)
+    assert bootstrap.session_manager('other') is installed
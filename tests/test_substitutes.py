@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from nutriusher.candidates import CandidateIndex
+from nutriusher.substitutes import SubstitutionIndex
+
+pytest.importorskip('scipy')
+
+FILTERS = [
+    ('Lunch', 'All', [], None),
+    ('Breakfast', 'Veg', ['Diabetes'], 400),
+    ('Dinner', 'Non-Veg', ['Hypertension', 'Heart Disease'], 250)
+]
+
+
+@pytest.fixture(scope='module')
+def index(food_data):
+    return SubstitutionIndex(food_data)
+
+
+@pytest.mark.parametrize('meal, diet, conditions, max_calories', FILTERS)
+def test_substitutes_pass_the_filters(index, food_data, meal, diet, conditions, max_calories):
+    allowed = set(CandidateIndex(food_data).lookup(meal, diet, conditions,
+                                                   np.inf if max_calories is None else max_calories).tolist())
+    exclude = sorted(allowed)[:3]
+    for position in range(0, len(food_data), 7):
+        rows, distances = index.query(position, meal, diet, conditions, k=5,
+                                      max_calories=max_calories, exclude=exclude)
+        assert set(rows.tolist()) <= allowed - set(exclude) - {position}
+        assert len(rows) == min(5, len(allowed - set(exclude) - {position}))
+        assert np.all(np.diff(distances) >= 0)
+
+
+@pytest.mark.parametrize('meal, diet, conditions, max_calories', FILTERS)
+def test_substitutes_are_the_nearest_allowed_foods(index, food_data, meal, diet, conditions, max_calories):
+    allowed = CandidateIndex(food_data).lookup(meal, diet, conditions,
+                                               np.inf if max_calories is None else max_calories)
+    for position in (0, 40, 100):
+        rows, distances = index.query(position, meal, diet, conditions, k=4, max_calories=max_calories)
+        others = allowed[allowed != position]
+        brute = np.linalg.norm(index.features[others] - index.features[position], axis=1)
+        assert np.allclose(distances, np.sort(brute)[:4])
+
+
+def test_too_few_foods_returns_what_passes(index, food_data):
+    allowed = CandidateIndex(food_data).lookup('Breakfast', 'Non-Veg', [], 750)
+    rows, _ = index.query(int(allowed[0]), 'Breakfast', 'Non-Veg', k=50, max_calories=750)
+    assert sorted(rows.tolist()) == sorted(allowed[1:].tolist())
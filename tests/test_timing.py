@@ -0,0 +1,112 @@
+import threading
+
+import numpy as np
+import pytest
+
+from nutriusher import timing
+from nutriusher.timing import LatencyHistogram
+
+
+@pytest.fixture(autouse=True)
+def fresh_histograms():
+    timing.reset()
+    yield
+    timing.reset()
+
+
+def test_percentiles_are_within_one_bucket():
+    samples = np.random.default_rng(0).lognormal(mean=np.log(0.005), sigma=1.0, size=20000)
+    histogram = LatencyHistogram()
+    for seconds in samples:
+        histogram.record(seconds)
+    assert histogram.count == len(samples)
+    assert np.isclose(histogram.total, samples.sum())
+    assert histogram.max == samples.max()
+    for estimate, exact in zip(histogram.percentiles(), np.quantile(samples, [0.5, 0.95, 0.99])):
+        assert abs(estimate / exact - 1) < LatencyHistogram.GROWTH - 1
+
+
+def test_percentiles_of_an_empty_or_constant_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentiles() == [0.0, 0.0, 0.0]
+    for _ in range(10):
+        histogram.record(0.002)
+    # Never above the largest sample
+    assert histogram.percentiles((0.5, 1.0)) == pytest.approx([0.002, 0.002], rel=0.05)
+    assert max(histogram.percentiles()) <= 0.002
+    histogram.record(0)
+    assert histogram.count == 11
+
+
+def test_spans_are_recorded_only_inside_a_traced_request():
+    with timing.span('outside'):
+        pass
+    with timing.request('page', force=True, uid='u') as trace:
+        with timing.span('load'):
+            with timing.span('parse'):
+                pass
+        with timing.span('load'):
+            pass
+    with timing.request('untraced') as untraced:
+        with timing.span('ignored'):
+            pass
+    assert untraced is None
+    assert [row['stage'] for row in timing.histogram_rows()] == ['load', 'parse', 'request.page']
+    stages = trace.to_dict()['stages']
+    assert list(stages) == ['parse', 'load']
+    assert stages['load']['calls'] == 2
+    assert trace.to_dict()['uid'] == 'u'
+
+
+def test_histogram_rows_while_other_threads_add_stages():
+    stop = threading.Event()
+    errors = []
+
+    def add_stages():
+        # At most 50 stages at a time, so histogram_rows stays cheap
+        i = 0
+        while not stop.is_set():
+            timing.histogram(f"stage{i}").record(0.001)
+            i = (i + 1) % 50
+            if i == 0:
+                timing.reset()
+
+    writer = threading.Thread(target=add_stages)
+    writer.start()
+    try:
+        for _ in range(200):
+            try:
+                timing.histogram_rows()
+            except RuntimeError as e:
+                errors.append(e)
+    finally:
+        stop.set()
+        writer.join()
+    assert errors == []
+
+
+DEBUG_PAGE = '''
+import streamlit as st
+from nutriusher import ui
+st.write(f"debug={ui.debug_mode()}")
+'''
+
+
+@pytest.mark.parametrize('env, query, expected', [
+    (None, '1', False),
+    ('1', None, False),
+    ('1', '1', True)
+])
+def test_debug_mode_needs_the_env_var_and_the_query_param(monkeypatch, env, query, expected):
+    from streamlit.testing.v1 import AppTest
+
+    if env is None:
+        monkeypatch.delenv('NUTRIUSHER_DEBUG', raising=False)
+    else:
+        monkeypatch.setenv('NUTRIUSHER_DEBUG', env)
+    at = AppTest.from_string(DEBUG_PAGE)
+    if query is not None:
+        at.query_params['debug'] = query
+    at.run()
+    assert not at.exception
+    assert at.markdown[0].value == f"debug={expected}"
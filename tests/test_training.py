@@ -0,0 +1,23 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nutriusher import training
+
+from conftest import ROOT
+
+pytest.importorskip('sklearn')
+
+DATA_PATH = os.path.join(ROOT, 'user_nutritional_data.csv')
+
+
+def test_preprocessing_keeps_every_activity_level(tmp_path):
+    cache_path, _, cached = training.preprocess(DATA_PATH, cache_dir=str(tmp_path))
+    assert not cached
+    splits = np.load(cache_path)
+    column = training.FEATURES.index('Physical exercise')
+    kept = np.concatenate([splits[name][:, column] for name in ('X_train', 'X_val', 'X_test')])
+    levels = pd.read_csv(DATA_PATH)['Physical exercise'].dropna().unique()
+    assert set(kept.tolist()) == set(levels.astype(float).tolist())